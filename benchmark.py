@@ -0,0 +1,930 @@
+"""Benchmarks for the Hamlet simulation.
+
+Usage:
+    python benchmark.py turn-modes [--sizes 50 200 800] [--turns 20] [--workers N]
+    python benchmark.py ensemble [--worlds 2000] [--turns 50] [--compiled]
+    python benchmark.py sharded [--size 2000] [--turns 5] [--shards 1 2 4]
+    python benchmark.py import-time [--repeat 20]
+    python benchmark.py sqlite [--events 1000000] [--size 200] [--turns 20]
+    python benchmark.py locations [--sizes 200 800 2000] [--turns 10] [--room-size 20]
+    python benchmark.py utility [--worlds 200] [--turns 30] [--sizes 7 50 200]
+    python benchmark.py alias [--samples 200000] [--sizes 7 50 200]
+    python benchmark.py planner [--sizes 7 50 200] [--depths 1 3] [--games 20] [--rollouts 100]
+    python benchmark.py checkpoint [--sizes 200 500 1000] [--every 10]
+    python benchmark.py scheduler [--worlds 200] [--delay 0.1] [--seconds 5] [--cpu-limit 0.5]
+    python benchmark.py pipeline [--size 400] [--delay 0.1] [--turns 30] [--lookaheads 1 4]
+    python benchmark.py cache [--runs 2000] [--turns 50] [--workers 0] [--max-kb 256]
+    python benchmark.py aggregate [--runs 500 2000] [--turns 30] [--workers 0]
+    python benchmark.py memory [--worlds 500] [--turns 50]
+
+turn-modes compares sequential turns with simultaneous turns, decided in the
+calling thread and on a worker pool. Policies are pure Python, so the pool
+mainly pays off once decisions release the GIL; simultaneous mode itself is
+what makes the decision phase order-independent.
+
+ensemble runs the same replicates once through SimulationLoop and once
+through EnsembleEngine, and prints throughput and outcome statistics for both.
+Loop world k is seeded like ensemble world k, so the two must end every
+world with identical health and relationship values; it reports how many do.
+With --compiled both sides decide through CompiledPolicy alias tables.
+
+sharded plays one large court with 1..cores shard processes (the default
+shard counts are the powers of two up to the CPU count) and reports the
+scaling curve, and the relationship cells held by the largest shard's
+replica against the whole matrix.
+
+import-time measures the start-up of a fresh interpreter (as paid by every
+spawned process-pool worker) importing the headless core, compared with
+also importing the Flask web UI.
+
+sqlite measures the SQLite export: sustained insert throughput of synthetic
+events through SQLiteSink, the timing of typical indexed queries over them,
+and the overhead of exporting a live simulation (events plus snapshots).
+
+locations compares turns where every agent considers the whole court with
+turns where agents only consider the occupants of their room.
+
+utility compares the utility policy with the hand-written archetype
+policies: the action mix of each character over many standard-cast worlds
+(failing if any share differs by more than SHARE_TOLERANCE), then decisions
+per second on a settled court (a few turns in) for hand-written
+decide_action(), per-agent UtilityPolicy.decide() and the batched
+UtilityPolicy.decide_all(). Repeated decisions on one world reuse
+the policy's grouped rows, so it also times whole simultaneous turns, where
+rows change every turn, with either kind of policy.
+
+alias checks that the alias-table compiled policies reproduce the
+hand-written ones: in several world states (including ones where dead
+characters are still offered as candidates, are revived, or where
+characters remember what others did to them) it samples every living
+character's decision both ways and runs a chi-square test of each against
+the exact compiled distribution, then compares decisions per second.
+
+planner measures the rollout planner: rollouts per second for one decision
+by court size and rollout depth, in this process and on a worker pool, then
+how often a planning Claudius survives standard-cast games compared with
+the hand-written one (same seeds), and his mean final value.
+
+checkpoint measures checkpoints of large courts: the time the simulation
+thread spends capturing a full checkpoint and a delta (after `every` turns),
+the background write time and file size of each, the time to load them
+back, and turn times with and without checkpointing.
+
+scheduler auto-runs many standard-cast worlds at `delay` seconds per turn
+next to one fast-forwarding world (no delay), once with a thread per world
+(sleeping between turns, as the web UI used to) and once through the
+Scheduler, with and without a CPU cap. It reports the threads used, the
+paced worlds' turn rate against their target, the fast world's turn rate
+and the CPU share taken by the process.
+
+pipeline plays a large court back at `delay` seconds per turn, once
+computing each turn when it is due and once through a TurnPipeline per
+look-ahead depth, and reports the time between turns as a viewer sees it
+(mean, 95th percentile and worst against the target), the releases that had
+to wait for the producer, and whether the played turns match.
+
+cache replays a headless batch through the on-disk RunCache: cold (every
+run played and stored), warm (every run read back), a batch half of whose
+seeds are new, and the warm batch with event traces. It reports the time
+and hit rate of each pass, that cached summaries equal freshly played ones,
+and then how a cache capped at `max-kb` evicts.
+
+aggregate compares collecting every run summary of a batch before computing
+outcome statistics with folding them into streaming aggregators on the
+workers: wall time and peak traced memory of this process per batch size,
+and whether both give the same statistics (to 9 significant digits; merge
+order changes the last bits of means). Memory is traced with tracemalloc,
+which forked pool workers inherit, so compare times between modes only.
+
+memory checks that the archetypes act on their memories: over many
+standard-cast worlds it splits each memory-driven rule's decisions by
+whether the agent held the memory at the start of the turn, and prints the
+rule's action share with and without it.
+"""
+
+import argparse
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from hamlet_sim.agents import (
+    Hamlet, Claudius, Gertrude, Ophelia, Horatio, Laertes, Polonius, UtilityPolicy
+)
+from hamlet_sim.agents.base_agent import ActionType
+from hamlet_sim.agents.compiled import CompiledPolicy
+from hamlet_sim.events import Event, EventLog, SQLiteSink
+from hamlet_sim.main import create_agents, initialize_relationships
+from hamlet_sim.simulation import (
+    SimulationLoop, RolloutPlanner, Checkpointer, load_checkpoint, Scheduler, TurnPipeline
+)
+from hamlet_sim.simulation.planner import standing_value
+from hamlet_sim.core import run_batch, aggregate_batch, OutcomeAggregator
+from hamlet_sim.run_cache import RunCache
+from hamlet_sim.world import LocationMap
+from hamlet_sim.world.relationship_matrix import CHANNELS
+from hamlet_sim.simulation.ensemble import EnsembleEngine
+from hamlet_sim.simulation.sharded import ShardedSimulation
+
+
+ARCHETYPES = [Hamlet, Claudius, Gertrude, Ophelia, Horatio, Laertes, Polonius]
+
+
+def build_court(size: int):
+    """Create `size` agents: the original cast, then numbered copies of it."""
+    agents = []
+    for i in range(size):
+        agent = ARCHETYPES[i % len(ARCHETYPES)]()
+        if i >= len(ARCHETYPES):
+            agent.name = f"{agent.name} {i // len(ARCHETYPES)}"
+        agents.append(agent)
+    return agents
+
+
+def quiet_simulation(agents, **kwargs) -> SimulationLoop:
+    """Create a simulation that neither prints nor writes a history file."""
+    return SimulationLoop(agents, event_log=EventLog(os.devnull), verbose=False, **kwargs)
+
+
+def bench_turn_modes(args):
+    """Compare sequential and simultaneous turn throughput."""
+    print(f"{'agents':>8} {'mode':>14} {'workers':>8} {'turns/s':>10} {'decisions/s':>12}")
+    for size in args.sizes:
+        for mode, workers in [("sequential", 0), ("simultaneous", 0), ("simultaneous", args.workers)]:
+            random.seed(args.seed)
+            simulation = quiet_simulation(build_court(size), turn_mode=mode, decision_workers=workers)
+            decisions = 0
+            start = time.perf_counter()
+            for _ in range(args.turns):
+                decisions += len(simulation.world_state.get_living_agents())
+                simulation.step()
+            elapsed = time.perf_counter() - start
+            simulation.close()
+            print(f"{size:>8} {mode:>14} {workers:>8} "
+                  f"{args.turns / elapsed:>10.1f} {decisions / elapsed:>12.0f}")
+
+
+def bench_ensemble(args):
+    """Compare per-world simulation with the lock-step ensemble engine."""
+    survivors = {}
+    actions = {}
+    total_turns = 0
+    # Final health and relationship values per world, in EnsembleEngine's layout
+    finals = []
+    policy = CompiledPolicy() if args.compiled else None
+    start = time.perf_counter()
+    for k in range(args.worlds):
+        # Ensemble world k draws from Random(seed + k)
+        random.seed(args.seed + k)
+        simulation = quiet_simulation(create_agents())
+        initialize_relationships(simulation.world_state)
+        if policy is not None:
+            policy.attach(simulation.world_state.agents)
+        while simulation.world_state.turn_number < args.turns:
+            for event in simulation.step():
+                per_agent = actions.setdefault(event.agent.name, {})
+                per_agent[event.action.value] = per_agent.get(event.action.value, 0) + 1
+            if len(simulation.world_state.get_living_agents()) < 2:
+                break
+        total_turns += simulation.world_state.turn_number
+        for agent in simulation.world_state.get_living_agents():
+            survivors[agent.name] = survivors.get(agent.name, 0) + 1
+        finals.append(simulation.world_state)
+    loop_elapsed = time.perf_counter() - start
+    
+    template = quiet_simulation(create_agents())
+    initialize_relationships(template.world_state)
+    if args.compiled:
+        CompiledPolicy().attach(template.world_state.agents)
+    start = time.perf_counter()
+    ensemble = EnsembleEngine(template.world_state, worlds=args.worlds, seed=args.seed, max_turns=args.turns)
+    stats = ensemble.run()
+    ensemble_elapsed = time.perf_counter() - start
+    
+    n = ensemble.num_agents
+    cells = n * n * len(CHANNELS)
+    identical = 0
+    for k, world in enumerate(finals):
+        agents = world.agents
+        matrix = world.relationship_matrix
+        relationships = [
+            matrix.get_relationship(agent, other)[channel] if agent is not other else 0.0
+            for agent in agents for other in agents for channel in CHANNELS
+        ]
+        identical += (
+            [agent.state.health for agent in agents] == list(ensemble.health[k * n:(k + 1) * n])
+            and relationships == list(ensemble.relationships[k * cells:(k + 1) * cells])
+        )
+    
+    print(f"{args.worlds} worlds x {args.turns} turns")
+    print(f"  SimulationLoop: {loop_elapsed:.2f}s ({args.worlds / loop_elapsed:.0f} worlds/s), "
+          f"mean turns {total_turns / args.worlds:.1f}")
+    print(f"  EnsembleEngine: {ensemble_elapsed:.2f}s ({args.worlds / ensemble_elapsed:.0f} worlds/s), "
+          f"mean turns {stats['mean_turns']:.1f}")
+    print(f"  identical worlds: {identical}/{args.worlds}")
+    print(f"\n{'agent':>10} {'survival (loop/ensemble)':>26}   top action shares (loop/ensemble)")
+    for name in ensemble.names:
+        counts = actions.get(name, {})
+        total = sum(counts.values()) or 1
+        mix = stats["action_mix"][name]
+        top = sorted(mix, key=mix.get, reverse=True)[:3]
+        shares = ", ".join(f"{a} {counts.get(a, 0) / total:.2f}/{mix[a]:.2f}" for a in top)
+        print(f"{name:>10} {survivors.get(name, 0) / args.worlds:>12.3f} / {stats['survival_rate'][name]:<11.3f}   {shares}")
+
+
+def bench_sharded(args):
+    """Measure the scaling curve of the sharded world over shard processes."""
+    cores = os.cpu_count() or 1
+    shard_counts = args.shards or sorted({1 << i for i in range(cores.bit_length())} | {cores})
+    print(f"{args.size} agents, {args.turns} turns, {cores} CPU(s)")
+    print(f"{'shards':>8} {'turns/s':>10} {'speedup':>9} {'replica cells':>14}")
+    baseline = None
+    for shards in shard_counts:
+        with ShardedSimulation(build_court(args.size), num_shards=shards, seed=args.seed,
+                               event_log=EventLog(os.devnull)) as simulation:
+            simulation.step()  # start the workers outside the timed region
+            start = time.perf_counter()
+            for _ in range(args.turns):
+                simulation.step()
+            elapsed = time.perf_counter() - start
+            cells = max(simulation.replica_cells)
+            total = simulation.world_state.relationship_matrix.cell_count()
+        rate = args.turns / elapsed
+        baseline = baseline or rate
+        print(f"{shards:>8} {rate:>10.2f} {rate / baseline:>8.2f}x {cells / total:>13.0%}")
+
+
+def bench_import_time(args):
+    """Compare interpreter start-up with the headless core and with the web UI."""
+    targets = [
+        ("python only", "pass"),
+        ("hamlet_sim.core", "import hamlet_sim.core"),
+        ("core + web UI (Flask)", "import hamlet_sim.core, hamlet_sim.ui.web_ui"),
+    ]
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'import':>24} {'median ms':>10} {'min ms':>8}")
+    for label, code in targets:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True)
+            timings.append((time.perf_counter() - start) * 1000)
+            if result.returncode != 0:
+                break
+        if result.returncode != 0:
+            print(f"{label:>24} {'unavailable':>10}")
+            continue
+        print(f"{label:>24} {statistics.median(timings):>10.1f} {min(timings):>8.1f}")
+
+
+def bench_sqlite(args):
+    """Measure SQLite export throughput and indexed query latency."""
+    with tempfile.TemporaryDirectory() as directory:
+        sink = SQLiteSink(os.path.join(directory, "events.db"))
+        agents = build_court(50)
+        actions = list(ActionType)
+        rng = random.Random(args.seed)
+        now = datetime.now()
+        start = time.perf_counter()
+        for i in range(args.events):
+            agent, target = rng.sample(agents, 2)
+            sink.write_event(Event(i // 100, agent, rng.choice(actions), target, "benchmark", now))
+        sink.flush()
+        elapsed = time.perf_counter() - start
+        print(f"insert: {args.events} events in {elapsed:.2f}s ({args.events / elapsed:,.0f} events/s)")
+        
+        run = sink.run_id
+        queries = [
+            ("events of one turn", "SELECT COUNT(*) FROM events WHERE run_id = ? AND turn = ?",
+             (run, args.events // 200)),
+            ("agent x action count", "SELECT COUNT(*) FROM events "
+             "WHERE run_id = ? AND agent = ? AND action = ?", (run, "Claudius", "attack")),
+            ("agent x action x target", "SELECT COUNT(*) FROM events "
+             "WHERE run_id = ? AND agent = ? AND action = ? AND target = ?",
+             (run, "Claudius", "attack", "Hamlet")),
+            ("attacks on one target", "SELECT agent, COUNT(*) FROM events "
+             "WHERE run_id = ? AND target = ? AND action = ? GROUP BY agent", (run, "Hamlet", "attack")),
+        ]
+        for label, sql, params in queries:
+            start = time.perf_counter()
+            sink.query(sql, params)
+            print(f"  {label:>24}: {(time.perf_counter() - start) * 1000:.2f} ms")
+        sink.close()
+        
+        for export in (False, True):
+            random.seed(args.seed)
+            event_log = EventLog(None)
+            if export:
+                event_log.add_sink(SQLiteSink(os.path.join(directory, "run.db")))
+            simulation = SimulationLoop(build_court(args.size), event_log=event_log, verbose=False)
+            start = time.perf_counter()
+            for _ in range(args.turns):
+                simulation.step()
+            event_log.close()
+            elapsed = time.perf_counter() - start
+            label = "with export" if export else "without export"
+            print(f"simulation {label}: {args.size} agents, {args.turns / elapsed:.1f} turns/s")
+
+
+def bench_locations(args):
+    """Compare decision cost with and without the room occupancy index."""
+    print(f"{'agents':>8} {'rooms':>6} {'mean room':>10} {'turns/s':>10} {'decisions/s':>12}")
+    for size in args.sizes:
+        for with_rooms in (False, True):
+            random.seed(args.seed)
+            agents = build_court(size)
+            locations = LocationMap.for_population(agents, args.room_size) if with_rooms else None
+            simulation = quiet_simulation(agents, locations=locations)
+            decisions = 0
+            start = time.perf_counter()
+            for _ in range(args.turns):
+                decisions += len(simulation.world_state.get_living_agents())
+                simulation.step()
+            elapsed = time.perf_counter() - start
+            rooms = len(locations.rooms) if locations else 1
+            print(f"{size:>8} {rooms:>6} {size / rooms:>10.1f} "
+                  f"{args.turns / elapsed:>10.1f} {decisions / elapsed:>12.0f}")
+
+
+# Largest difference between a character's share of an action under the
+# archetype policy and under the utility policy that `utility` accepts
+SHARE_TOLERANCE = 0.05
+
+
+def bench_utility(args):
+    """Compare the utility policy's action mix and speed with the archetypes."""
+    mixes = {}
+    for label, policy in (("archetype", None), ("utility", UtilityPolicy())):
+        random.seed(args.seed)
+        counts = mixes[label] = {}
+        for _ in range(args.worlds):
+            simulation = quiet_simulation(create_agents())
+            initialize_relationships(simulation.world_state)
+            if policy is not None:
+                policy.attach(simulation.world_state.agents)
+            while simulation.world_state.turn_number < args.turns:
+                for event in simulation.step():
+                    per_agent = counts.setdefault(event.agent.name, {})
+                    per_agent[event.action.value] = per_agent.get(event.action.value, 0) + 1
+                if len(simulation.world_state.get_living_agents()) < 2:
+                    break
+    
+    print(f"{args.worlds} worlds x {args.turns} turns: action shares (archetype/utility)")
+    for name, counts in mixes["archetype"].items():
+        utility = mixes["utility"].get(name, {})
+        total, utility_total = sum(counts.values()), sum(utility.values()) or 1
+        top = sorted(set(counts) | set(utility), key=lambda a: -counts.get(a, 0) - utility.get(a, 0))[:4]
+        shares = ", ".join(
+            f"{a} {counts.get(a, 0) / total:.2f}/{utility.get(a, 0) / utility_total:.2f}" for a in top
+        )
+        print(f"{name:>10}  {shares}")
+    off = []
+    for name, counts in mixes["archetype"].items():
+        utility = mixes["utility"].get(name, {})
+        total, utility_total = sum(counts.values()), sum(utility.values()) or 1
+        for action in set(counts) | set(utility):
+            share, utility_share = counts.get(action, 0) / total, utility.get(action, 0) / utility_total
+            if abs(share - utility_share) > SHARE_TOLERANCE:
+                off.append(f"{name} {action} {share:.2f}/{utility_share:.2f}")
+    if off:
+        raise AssertionError(f"shares differ by more than {SHARE_TOLERANCE}: {', '.join(off)}")
+    
+    print(f"\n{'agents':>8} {'archetype/s':>12} {'decide/s':>10} {'decide_all/s':>13} "
+          f"{'turns/s (archetype/utility)':>28}")
+    for size in args.sizes:
+        random.seed(args.seed)
+        agents = build_court(size)
+        simulation = quiet_simulation(agents)
+        world_state = simulation.world_state
+        initialize_relationships(world_state)
+        for _ in range(5):
+            simulation.step()
+        agents = world_state.get_living_agents()
+        policy = UtilityPolicy()
+        rates = []
+        for mode in ("archetype", "decide", "decide_all"):
+            decisions = 0
+            start = time.perf_counter()
+            while decisions < 20000:
+                if mode == "decide_all":
+                    policy.decide_all(world_state, agents)
+                else:
+                    for agent in agents:
+                        others = [a for a in agents if a is not agent]
+                        if mode == "decide":
+                            policy.decide(agent, world_state, others)
+                        else:
+                            agent.decide_action(world_state, others)
+                decisions += size
+            rates.append(decisions / (time.perf_counter() - start))
+        
+        turn_rates = []
+        for policy in (None, UtilityPolicy()):
+            random.seed(args.seed)
+            simulation = quiet_simulation(build_court(size), turn_mode="simultaneous")
+            initialize_relationships(simulation.world_state)
+            if policy is not None:
+                policy.attach(simulation.world_state.agents)
+            start = time.perf_counter()
+            for _ in range(args.turns):
+                simulation.step()
+            turn_rates.append(args.turns / (time.perf_counter() - start))
+        print(f"{size:>8} {rates[0]:>12.0f} {rates[1]:>10.0f} {rates[2]:>13.0f} "
+              f"{turn_rates[0]:>13.1f} / {turn_rates[1]:<12.1f}")
+
+
+def chi_square(counts, probabilities, samples):
+    """Chi-square statistic, degrees of freedom and approximate p-value of counts."""
+    statistic = sum(
+        (counts.get(outcome, 0) - samples * p) ** 2 / (samples * p)
+        for outcome, p in probabilities.items()
+    )
+    dof = max(1, len(probabilities) - 1)
+    # Wilson-Hilferty approximation of the chi-square tail
+    z = ((statistic / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / math.sqrt(2 / (9 * dof))
+    return statistic, dof, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def bench_alias(args):
+    """Check and time the alias-table compiled archetype policies."""
+    policy = CompiledPolicy()
+    random.seed(args.seed)
+    simulation = quiet_simulation(create_agents())
+    initialize_relationships(simulation.world_state)
+    world_state = simulation.world_state
+    print(f"{'state':>8} {'agent':>10} {'outcomes':>9} {'original chi2/dof':>18} {'p':>6} "
+          f"{'compiled chi2/dof':>18} {'p':>6}")
+    
+    def check(label: str, candidates: list):
+        for agent in world_state.get_living_agents():
+            others = [a for a in candidates if a is not agent]
+            exact = policy.distribution(agent, world_state, others)
+            row = []
+            for decide in (agent._make_decision, lambda w, o: policy.decide(agent, w, o)):
+                counts = {}
+                for _ in range(args.samples):
+                    decision = decide(world_state, others)
+                    counts[decision] = counts.get(decision, 0) + 1
+                if set(counts) - set(exact):
+                    raise AssertionError(f"{agent.name}: outcome outside the compiled distribution")
+                row.append(chi_square(counts, exact, args.samples))
+            (s1, dof, p1), (s2, _, p2) = row
+            print(f"{label:>8} {agent.name:>10} {len(exact):>9} "
+                  f"{s1:>11.1f}/{dof:<6} {p1:>6.3f} {s2:>11.1f}/{dof:<6} {p2:>6.3f}")
+    
+    for checkpoint in (0, 3, 10):
+        while world_state.turn_number < checkpoint:
+            simulation.step()
+        check(f"turn {checkpoint}", world_state.get_living_agents())
+    # Dead characters offered as candidates, then alive again: buckets
+    # compiled for one must not serve the other
+    for alive in (False, True):
+        for name in ("Claudius", "Polonius"):
+            world_state.get_agent_by_name(name).state.is_alive = alive
+        check("revived" if alive else "dead", world_state.agents)
+    # Memories the archetype rules act on
+    turn = world_state.turn_number
+    for agent, kind, actor in (("Hamlet", "attacked_me", "Claudius"),
+                               ("Claudius", "spied_on_me", "Hamlet"),
+                               ("Polonius", "caught_me_spying", "Hamlet"),
+                               ("Horatio", "attacked_ally", "Claudius")):
+        world_state.get_agent_by_name(agent).memory.remember(turn, kind, actor, agent, 1.0)
+    check("memories", world_state.get_living_agents())
+    
+    print(f"\n{'agents':>8} {'hand-written/s':>15} {'compiled/s':>11} {'decide_all/s':>13}")
+    for size in args.sizes:
+        random.seed(args.seed)
+        agents = build_court(size)
+        world_state = quiet_simulation(agents).world_state
+        rates = []
+        for mode in ("hand-written", "compiled", "decide_all"):
+            decisions = 0
+            start = time.perf_counter()
+            while decisions < 50000:
+                if mode == "decide_all":
+                    policy.decide_all(world_state, agents)
+                else:
+                    for agent in agents:
+                        others = [a for a in agents if a is not agent]
+                        if mode == "compiled":
+                            policy.decide(agent, world_state, others)
+                        else:
+                            agent.decide_action(world_state, others)
+                decisions += size
+            rates.append(decisions / (time.perf_counter() - start))
+        print(f"{size:>8} {rates[0]:>15.0f} {rates[1]:>11.0f} {rates[2]:>13.0f}")
+
+
+def bench_planner(args):
+    """Time rollouts and compare a planning Claudius with the hand-written one."""
+    print(f"{'agents':>8} {'depth':>6} {'in-process/s':>13} {f'{args.workers} workers/s':>13}")
+    for size in args.sizes:
+        for depth in args.depths:
+            rates = []
+            for workers in (0, args.workers):
+                random.seed(args.seed)
+                agents = build_court(size)
+                world_state = quiet_simulation(agents).world_state
+                planner = RolloutPlanner(rollouts=args.rollouts, depth=depth, workers=workers)
+                claudius = agents[1]
+                planner.decide(claudius, world_state, [a for a in agents if a is not claudius])
+                planner.close()
+                rates.append(planner.rollouts_per_second())
+            print(f"{size:>8} {depth:>6} {rates[0]:>13.0f} {rates[1]:>13.0f}")
+    
+    print(f"\n{'Claudius':>12} {'survived':>9} {'mean value':>11} {'rollouts/s':>11} {'seconds':>8}")
+    for planned in (False, True):
+        survived = 0
+        values = []
+        planner = RolloutPlanner(rollouts=args.rollouts, depth=3)
+        start = time.perf_counter()
+        for game in range(args.games):
+            random.seed(args.seed + game)
+            simulation = quiet_simulation(create_agents())
+            initialize_relationships(simulation.world_state)
+            world_state = simulation.world_state
+            claudius = world_state.get_agent_by_name("Claudius")
+            if planned:
+                planner.attach([claudius])
+            while world_state.turn_number < args.turns and len(world_state.get_living_agents()) >= 2:
+                simulation.step()
+            survived += claudius.state.is_alive
+            values.append(standing_value(claudius, world_state))
+        label = "planning" if planned else "hand-written"
+        rate = f"{planner.rollouts_per_second():.0f}" if planned else "-"
+        print(f"{label:>12} {survived / args.games:>9.2f} {statistics.mean(values):>11.3f} "
+              f"{rate:>11} {time.perf_counter() - start:>8.1f}")
+
+
+def bench_checkpoint(args):
+    """Time and size full and incremental checkpoints."""
+    print(f"{'agents':>7} {'kind':>6} {'capture ms':>11} {'write ms':>9} {'KiB':>9} {'load ms':>8}")
+    for size in args.sizes:
+        random.seed(args.seed)
+        simulation = quiet_simulation(build_court(size))
+        simulation.step()
+        with tempfile.TemporaryDirectory() as directory:
+            checkpointer = Checkpointer(directory, every=args.every, event_log=simulation.event_log)
+            for kind in ("full", "delta"):
+                if kind == "delta":
+                    for _ in range(args.every):
+                        simulation.step()
+                checkpointer.checkpoint(simulation.world_state, wait=True)
+                start = time.perf_counter()
+                load_checkpoint(directory)
+                load = time.perf_counter() - start
+                print(f"{size:>7} {kind:>6} {checkpointer.last_capture_seconds * 1000:>11.1f} "
+                      f"{checkpointer.last_write_seconds * 1000:>9.1f} "
+                      f"{checkpointer.last_bytes / 1024:>9.1f} {load * 1000:>8.1f}")
+            
+            # Turn times, alternating blocks without and with checkpoints
+            simulation.event_log.add_sink(checkpointer)
+            timings = {False: [], True: []}
+            for block in range(2 * args.blocks):
+                enabled = block % 2 == 1
+                checkpointer.every = args.every if enabled else 10 ** 9
+                start = time.perf_counter()
+                for _ in range(args.every):
+                    simulation.step()
+                checkpointer.flush()
+                timings[enabled].append((time.perf_counter() - start) / args.every)
+            checkpointer.close()
+        print(f"{size:>7} turn: {statistics.mean(timings[False]) * 1000:.1f} ms without checkpoints, "
+              f"{statistics.mean(timings[True]) * 1000:.1f} ms with one every {args.every} turns")
+
+
+def bench_scheduler(args):
+    """Compare a thread per auto-running world with the Scheduler."""
+    import threading
+    
+    def world():
+        simulation = quiet_simulation(create_agents())
+        initialize_relationships(simulation.world_state)
+        return simulation
+    
+    print(f"{'driver':>22} {'threads':>8} {'paced turns/s':>14} {'min':>6} {'target':>7} "
+          f"{'fast turns/s':>13} {'cpu share':>10}")
+    for driver in ("thread per world", "scheduler", f"scheduler cap {args.cpu_limit}"):
+        random.seed(args.seed)
+        paced = [world() for _ in range(args.worlds)]
+        fast = world()
+        stop = threading.Event()
+        scheduler = None
+        
+        if driver == "thread per world":
+            def auto_run(simulation, delay, stop):
+                while not stop.is_set() and len(simulation.world_state.get_living_agents()) >= 2:
+                    simulation.step()
+                    time.sleep(delay)
+            threads = [threading.Thread(target=auto_run, args=(simulation, delay, stop), daemon=True)
+                       for simulation, delay in [(s, args.delay) for s in paced] + [(fast, 0.0)]]
+            for thread in threads:
+                thread.start()
+        else:
+            scheduler = Scheduler(workers=args.workers,
+                                  cpu_limit=args.cpu_limit if "cap" in driver else None)
+            runs = [scheduler.start(simulation, turn_delay=args.delay) for simulation in paced]
+            runs.append(scheduler.start(fast, turn_delay=0.0))
+        
+        start, cpu_start = time.perf_counter(), time.process_time()
+        turns_start = [s.world_state.turn_number for s in paced + [fast]]
+        time.sleep(args.seconds)
+        thread_count = threading.active_count()
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+        turns = [s.world_state.turn_number - t for s, t in zip(paced + [fast], turns_start)]
+        stop.set()
+        if scheduler is not None:
+            scheduler.shutdown()
+        else:
+            for thread in threads:
+                thread.join()
+        
+        # Worlds that died out stop early under both drivers
+        rates = [t / elapsed for s, t in zip(paced, turns) if len(s.world_state.get_living_agents()) >= 2]
+        print(f"{driver:>22} {thread_count:>8} {statistics.mean(rates):>14.2f} {min(rates):>6.2f} "
+              f"{1 / args.delay:>7.2f} {turns[-1] / elapsed:>13.0f} {cpu / elapsed:>10.2f}")
+
+
+def bench_pipeline(args):
+    """Compare playback pacing with and without turns computed ahead."""
+    
+    def fingerprint(simulation):
+        world = simulation.world_state
+        return (world.turn_number, [vars(agent.state) for agent in world.agents],
+                sorted(simulation.event_log.stats.to_dict().items()))
+    
+    print(f"{'playback':>16} {'mean gap':>9} {'p95 gap':>8} {'worst':>7} {'target':>7} "
+          f"{'stalls':>7} {'same turns':>11}")
+    reference = None
+    for lookahead in [0] + args.lookaheads:
+        random.seed(args.seed)
+        simulation = quiet_simulation(build_court(args.size))
+        initialize_relationships(simulation.world_state)
+        pipeline = TurnPipeline(simulation, lookahead) if lookahead else None
+        player = pipeline or simulation
+        
+        # Like a Scheduler run: each turn is due `delay` after the previous one was shown
+        shown = [time.perf_counter()]
+        for _ in range(args.turns):
+            time.sleep(max(0.0, shown[-1] + args.delay - time.perf_counter()))
+            player.step()
+            shown.append(time.perf_counter())
+        gaps = sorted(b - a for a, b in zip(shown, shown[1:]))
+        stalls = "-"
+        if pipeline is not None:
+            stalls = pipeline.stalls
+            pipeline.close()
+        
+        result = fingerprint(simulation)
+        reference = reference or result
+        name = f"lookahead {lookahead}" if lookahead else "on demand"
+        print(f"{name:>16} {statistics.mean(gaps):>9.3f} {gaps[int(0.95 * (len(gaps) - 1))]:>8.3f} "
+              f"{gaps[-1]:>7.3f} {args.delay:>7.3f} {stalls:>7} {str(result == reference):>11}")
+
+
+def bench_cache(args):
+    """Measure batch runs answered from the on-disk result cache."""
+    seeds = list(range(args.seed, args.seed + args.runs))
+    with tempfile.TemporaryDirectory() as directory:
+        cache = RunCache(directory)
+        passes = [
+            ("cold", seeds, False),
+            ("warm", seeds, False),
+            ("half new", seeds[args.runs // 2:] + [s + args.runs for s in seeds[:args.runs // 2]], False),
+            ("traces", seeds, True),
+            ("traces warm", seeds, True),
+        ]
+        print(f"{'pass':>12} {'runs':>6} {'seconds':>8} {'runs/s':>9} {'hit rate':>9}")
+        results = {}
+        for name, batch, trace in passes:
+            hits, misses = cache.hits, cache.misses
+            start = time.perf_counter()
+            results[name] = run_batch(batch, args.turns, workers=args.workers, cache=cache, trace=trace)
+            elapsed = time.perf_counter() - start
+            rate = (cache.hits - hits) / ((cache.hits - hits) + (cache.misses - misses))
+            print(f"{name:>12} {len(batch):>6} {elapsed:>8.2f} {len(batch) / elapsed:>9.0f} {rate:>9.1%}")
+        
+        fresh = run_batch(seeds[:50], args.turns, workers=0, cache=RunCache(os.path.join(directory, "fresh")))
+        print(f"cached summaries match fresh runs: {fresh == results['warm'][:50]}")
+        print(f"entries {len(cache)}, {cache.size_bytes / 1024:.0f} KiB")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        capped = RunCache(directory, max_bytes=args.max_kb * 1024)
+        run_batch(seeds, args.turns, workers=args.workers, cache=capped)
+        hits = capped.hits
+        run_batch(seeds, args.turns, workers=args.workers, cache=capped)
+        print(f"capped at {args.max_kb} KiB: {len(capped)} entries, {capped.evictions} evictions, "
+              f"hit rate of a repeated batch {(capped.hits - hits) / len(seeds):.1%}")
+
+
+def bench_aggregate(args):
+    """Compare collect-then-summarize with streaming aggregation of a batch."""
+    import tracemalloc
+    
+    def rounded(value):
+        if isinstance(value, float):
+            return float(f"{value:.9g}")
+        if isinstance(value, dict):
+            return {key: rounded(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [rounded(item) for item in value]
+        return value
+    
+    print(f"{'runs':>7} {'mode':>10} {'seconds':>8} {'peak KiB':>9} {'same stats':>11}")
+    for runs in args.runs:
+        seeds = range(args.seed, args.seed + runs)
+        tracemalloc.start()
+        start = time.perf_counter()
+        collected = OutcomeAggregator(args.turns)
+        collected.add_all(run_batch(seeds, args.turns, workers=args.workers))
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{runs:>7} {'collect':>10} {elapsed:>8.2f} {peak / 1024:>9.0f} {'-':>11}")
+        
+        tracemalloc.start()
+        start = time.perf_counter()
+        streamed = aggregate_batch(seeds, args.turns, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        same = rounded(streamed.snapshot()) == rounded(collected.snapshot())
+        print(f"{runs:>7} {'streaming':>10} {elapsed:>8.2f} {peak / 1024:>9.0f} {str(same):>11}")
+
+
+# Memory-driven archetype rules: (agent, memory, held, considered, counted)
+MEMORY_RULES = [
+    ("Hamlet", "Claudius attacked/schemed at him or ally",
+     lambda m: (m.knows("attacked_me", "Claudius") or m.knows("attacked_ally", "Claudius")
+                or m.knows("schemed_against_me", "Claudius")),
+     lambda e: e.target is not None and e.target.name == "Claudius",
+     lambda e: e.action == ActionType.ACCUSE),
+    ("Claudius", "Hamlet spied on him",
+     lambda m: m.knows("spied_on_me", "Hamlet"),
+     lambda e: e.target is not None and e.target.name == "Hamlet",
+     lambda e: e.action == ActionType.SPY_ON),
+    ("Polonius", "Hamlet caught him spying",
+     lambda m: m.knows("caught_me_spying", "Hamlet"),
+     lambda e: True,
+     lambda e: e.action == ActionType.SPY_ON and e.target.name == "Hamlet"),
+    ("Polonius", "Hamlet caught him spying",
+     lambda m: m.knows("caught_me_spying", "Hamlet"),
+     lambda e: True,
+     lambda e: e.action == ActionType.TALK_TO and e.target.name == "Claudius"),
+    ("Horatio", "Claudius attacked an ally",
+     lambda m: m.knows("attacked_ally", "Claudius"),
+     lambda e: e.target is not None and e.target.name == "Hamlet",
+     lambda e: e.action == ActionType.DEFEND),
+]
+
+MEMORY_RULE_ACTIONS = [
+    "accuses (of actions at Claudius)",
+    "spies (of actions at Hamlet)",
+    "spies on Hamlet",
+    "talks to Claudius",
+    "defends (of actions at Hamlet)",
+]
+
+
+def bench_memory(args):
+    """Compare memory-driven decisions with and without the memory."""
+    # counts[rule][held] = [considered, counted]
+    counts = [[[0, 0], [0, 0]] for _ in MEMORY_RULES]
+    for k in range(args.worlds):
+        random.seed(args.seed + k)
+        simulation = quiet_simulation(create_agents())
+        initialize_relationships(simulation.world_state)
+        agents = {agent.name: agent for agent in simulation.world_state.agents}
+        while simulation.world_state.turn_number < args.turns:
+            held = [bool(rule[2](agents[rule[0]].memory)) for rule in MEMORY_RULES]
+            for event in simulation.step():
+                for r, (name, _, _, considered, counted) in enumerate(MEMORY_RULES):
+                    if event.agent.name == name and considered(event):
+                        cell = counts[r][held[r]]
+                        cell[0] += 1
+                        cell[1] += bool(counted(event))
+            if len(simulation.world_state.get_living_agents()) < 2:
+                break
+    
+    print(f"{args.worlds} worlds x {args.turns} turns")
+    print(f"{'agent':>9}  {'memory':<42} {'share of decisions that...':<34} "
+          f"{'without':>15} {'with':>15}")
+    for (name, memory, *_), action, rule_counts in zip(MEMORY_RULES, MEMORY_RULE_ACTIONS, counts):
+        cells = [
+            f"{hits / total:.3f} ({total})" if total else "-"
+            for total, hits in rule_counts
+        ]
+        print(f"{name:>9}  {memory:<42} {action:<34} {cells[0]:>15} {cells[1]:>15}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hamlet simulation benchmarks")
+    parser.add_argument("--seed", type=int, default=0)
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    turn_modes = commands.add_parser("turn-modes", help=bench_turn_modes.__doc__)
+    turn_modes.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 800])
+    turn_modes.add_argument("--turns", type=int, default=20)
+    turn_modes.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    turn_modes.set_defaults(func=bench_turn_modes)
+    
+    ensemble = commands.add_parser("ensemble", help=bench_ensemble.__doc__)
+    ensemble.add_argument("--worlds", type=int, default=2000)
+    ensemble.add_argument("--turns", type=int, default=50)
+    ensemble.add_argument("--compiled", action="store_true",
+                          help="decide through a CompiledPolicy instead of the archetypes")
+    ensemble.set_defaults(func=bench_ensemble)
+    
+    sharded = commands.add_parser("sharded", help=bench_sharded.__doc__)
+    sharded.add_argument("--size", type=int, default=2000)
+    sharded.add_argument("--turns", type=int, default=5)
+    sharded.add_argument("--shards", type=int, nargs="+")
+    sharded.set_defaults(func=bench_sharded)
+    
+    import_time = commands.add_parser("import-time", help=bench_import_time.__doc__)
+    import_time.add_argument("--repeat", type=int, default=20)
+    import_time.set_defaults(func=bench_import_time)
+    
+    sqlite = commands.add_parser("sqlite", help=bench_sqlite.__doc__)
+    sqlite.add_argument("--events", type=int, default=1000000)
+    sqlite.add_argument("--size", type=int, default=200)
+    sqlite.add_argument("--turns", type=int, default=20)
+    sqlite.set_defaults(func=bench_sqlite)
+    
+    locations = commands.add_parser("locations", help=bench_locations.__doc__)
+    locations.add_argument("--sizes", type=int, nargs="+", default=[200, 800, 2000])
+    locations.add_argument("--turns", type=int, default=10)
+    locations.add_argument("--room-size", type=int, default=20)
+    locations.set_defaults(func=bench_locations)
+    
+    utility = commands.add_parser("utility", help=bench_utility.__doc__)
+    utility.add_argument("--worlds", type=int, default=200)
+    utility.add_argument("--turns", type=int, default=30)
+    utility.add_argument("--sizes", type=int, nargs="+", default=[7, 50, 200])
+    utility.set_defaults(func=bench_utility)
+    
+    alias = commands.add_parser("alias", help=bench_alias.__doc__)
+    alias.add_argument("--samples", type=int, default=200000)
+    alias.add_argument("--sizes", type=int, nargs="+", default=[7, 50, 200])
+    alias.set_defaults(func=bench_alias)
+    
+    planner = commands.add_parser("planner", help=bench_planner.__doc__)
+    planner.add_argument("--sizes", type=int, nargs="+", default=[7, 50, 200])
+    planner.add_argument("--depths", type=int, nargs="+", default=[1, 3])
+    planner.add_argument("--rollouts", type=int, default=100)
+    planner.add_argument("--games", type=int, default=20)
+    planner.add_argument("--turns", type=int, default=30)
+    planner.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    planner.set_defaults(func=bench_planner)
+    
+    checkpoint = commands.add_parser("checkpoint", help=bench_checkpoint.__doc__)
+    checkpoint.add_argument("--sizes", type=int, nargs="+", default=[200, 500, 1000])
+    checkpoint.add_argument("--every", type=int, default=10)
+    checkpoint.add_argument("--blocks", type=int, default=3)
+    checkpoint.set_defaults(func=bench_checkpoint)
+    
+    scheduler = commands.add_parser("scheduler", help=bench_scheduler.__doc__)
+    scheduler.add_argument("--worlds", type=int, default=200)
+    scheduler.add_argument("--delay", type=float, default=0.1)
+    scheduler.add_argument("--seconds", type=float, default=5.0)
+    scheduler.add_argument("--workers", type=int, default=2)
+    scheduler.add_argument("--cpu-limit", type=float, default=0.5)
+    scheduler.set_defaults(func=bench_scheduler)
+    
+    pipeline = commands.add_parser("pipeline", help=bench_pipeline.__doc__)
+    pipeline.add_argument("--size", type=int, default=400)
+    pipeline.add_argument("--delay", type=float, default=0.1)
+    pipeline.add_argument("--turns", type=int, default=30)
+    pipeline.add_argument("--lookaheads", type=int, nargs="+", default=[1, 4])
+    pipeline.set_defaults(func=bench_pipeline)
+    
+    cache = commands.add_parser("cache", help=bench_cache.__doc__)
+    cache.add_argument("--runs", type=int, default=2000)
+    cache.add_argument("--turns", type=int, default=50)
+    cache.add_argument("--workers", type=int, default=0)
+    cache.add_argument("--max-kb", type=int, default=256)
+    cache.set_defaults(func=bench_cache)
+    
+    aggregate = commands.add_parser("aggregate", help=bench_aggregate.__doc__)
+    aggregate.add_argument("--runs", type=int, nargs="+", default=[500, 2000])
+    aggregate.add_argument("--turns", type=int, default=30)
+    aggregate.add_argument("--workers", type=int, default=0)
+    aggregate.set_defaults(func=bench_aggregate)
+    
+    memory = commands.add_parser("memory", help=bench_memory.__doc__)
+    memory.add_argument("--worlds", type=int, default=500)
+    memory.add_argument("--turns", type=int, default=50)
+    memory.set_defaults(func=bench_memory)
+    
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 """Agent module for Hamlet simulation game."""
 
+from importlib import import_module
+
 from .base_agent import BaseAgent
 from .hamlet import Hamlet
 from .claudius import Claudius
@@ -9,6 +11,12 @@ from .horatio import Horatio
 from .laertes import Laertes
 from .polonius import Polonius
 
+# Archetype classes by name, for scenario files and checkpoints
+ARCHETYPES = {
+    cls.__name__: cls
+    for cls in (Hamlet, Claudius, Gertrude, Ophelia, Horatio, Laertes, Polonius)
+}
+
 __all__ = [
     'BaseAgent',
     'Hamlet',
@@ -18,5 +26,22 @@ __all__ = [
     'Horatio',
     'Laertes',
     'Polonius',
+    'ARCHETYPES',
+    'UtilityPolicy',
+    'UtilityProfile',
+    'CompiledPolicy',
 ]
 
+
+# Optional policies load on first use, keeping `import hamlet_sim.agents` to the archetypes
+_LAZY = {
+    'UtilityPolicy': '.utility',
+    'UtilityProfile': '.utility',
+    'CompiledPolicy': '.compiled',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
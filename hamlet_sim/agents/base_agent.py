@@ -1,8 +1,11 @@
 """Base agent class for all characters in the simulation."""
 
+import copy
+import random
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional, Tuple
 from enum import Enum
+from .memory import AgentMemory
 
 
 class ActionType(Enum):
@@ -31,6 +34,11 @@ class AgentState:
 class BaseAgent(ABC):
     """Base class for all agents in the Hamlet simulation."""
     
+    # Relationship cells outside the agent's own row that _make_decision()
+    # reads, as (agent1_name, agent2_name) pairs; sharded worlds only ship
+    # an agent's own row otherwise (see ShardedSimulation)
+    watched_pairs: Tuple[Tuple[str, str], ...] = ()
+    
     def __init__(
         self,
         name: str,
@@ -55,11 +63,16 @@ class BaseAgent(ABC):
         self.paranoia = max(0.0, min(1.0, paranoia))
         self.goals = goals or ["survive"]
         self.state = AgentState()
+        self.memory = AgentMemory()
+        # Optional policy object (e.g. UtilityPolicy) that replaces
+        # _make_decision(); see decide_action()
+        self.policy = None
         
     def decide_action(
         self,
         world_state: 'WorldState',
-        other_agents: List['BaseAgent']
+        other_agents: List['BaseAgent'],
+        rng=random
     ) -> Tuple[ActionType, Optional['BaseAgent']]:
         """
         Decide what action to take this turn.
@@ -67,6 +80,7 @@ class BaseAgent(ABC):
         Args:
             world_state: Current state of the world
             other_agents: List of other agents in the simulation
+            rng: Source of the decision's random draws (the simulation's)
             
         Returns:
             Tuple of (action_type, target_agent) where target_agent can be None
@@ -77,14 +91,18 @@ class BaseAgent(ABC):
         if not living_agents:
             return (ActionType.HIDE, None)
         
+        if self.policy is not None:
+            return self.policy.decide(self, world_state, living_agents, rng)
+        
         # Use personality-driven decision making
-        return self._make_decision(world_state, living_agents)
+        return self._make_decision(world_state, living_agents, rng)
     
     @abstractmethod
     def _make_decision(
         self,
         world_state: 'WorldState',
-        other_agents: List['BaseAgent']
+        other_agents: List['BaseAgent'],
+        rng=random
     ) -> Tuple[ActionType, Optional['BaseAgent']]:
         """
         Agent-specific decision making logic.
@@ -92,12 +110,26 @@ class BaseAgent(ABC):
         Args:
             world_state: Current state of the world
             other_agents: List of other living agents
+            rng: Source of every random draw (random() and choice()); the
+                random module unless CompiledPolicy is tracing the policy
             
         Returns:
             Tuple of (action_type, target_agent)
         """
         pass
     
+    def fork(self) -> 'BaseAgent':
+        """
+        Copy the agent for a forked world.
+        
+        The copy shares traits, goals and policy with this agent and its
+        memory copy-on-write; only the small AgentState is copied outright.
+        """
+        clone = copy.copy(self)
+        clone.state = copy.copy(self.state)
+        clone.memory = self.memory.fork()
+        return clone
+    
     def get_personality_traits(self) -> Dict[str, float]:
         """Return a dictionary of personality traits."""
         return {
@@ -23,7 +23,8 @@ class Claudius(BaseAgent):
     def _make_decision(
         self,
         world_state: WorldState,
-        other_agents: List[BaseAgent]
+        other_agents: List[BaseAgent],
+        rng=random
     ) -> Tuple[ActionType, Optional[BaseAgent]]:
         """Claudius's decision-making: paranoid, seeks to maintain power."""
         # Find Hamlet (threat to power)
@@ -31,36 +32,38 @@ class Claudius(BaseAgent):
         polonius = next((a for a in other_agents if a.name == "Polonius"), None)
         gertrude = next((a for a in other_agents if a.name == "Gertrude"), None)
         
-        # Very suspicious of Hamlet - likely to spy or scheme against him
+        # Very suspicious of Hamlet - likely to spy or scheme against him,
+        # spying less once he knows Hamlet has been spying on him
         if hamlet and hamlet.state.is_alive:
             suspicion = world_state.relationship_matrix.get_suspicion_level(
                 self, hamlet
             )
-            if suspicion > 0.4 or random.random() < 0.5:
-                if random.random() < 0.4:
+            if suspicion > 0.4 or rng.random() < 0.5:
+                watched = self.memory.knows("spied_on_me", "Hamlet")
+                if rng.random() < (0.2 if watched else 0.4):
                     return (ActionType.SPY_ON, hamlet)
-                elif random.random() < 0.3:
+                elif rng.random() < 0.3:
                     return (ActionType.SCHEME, hamlet)
                 else:
                     return (ActionType.ATTACK, hamlet)
         
         # Use Polonius as spy
         if polonius and polonius.state.is_alive:
-            if random.random() < 0.3:
+            if rng.random() < 0.3:
                 return (ActionType.TALK_TO, polonius)
         
         # Maintain relationship with Gertrude
         if gertrude and gertrude.state.is_alive:
-            if random.random() < 0.3:
+            if rng.random() < 0.3:
                 return (ActionType.TALK_TO, gertrude)
         
         # Often schemes
-        if random.random() < 0.4:
+        if rng.random() < 0.4:
             return (ActionType.SCHEME, None)
         
         # Default: talk to random agent
         if other_agents:
-            return (ActionType.TALK_TO, random.choice(other_agents))
+            return (ActionType.TALK_TO, rng.choice(other_agents))
         
         return (ActionType.HIDE, None)
 
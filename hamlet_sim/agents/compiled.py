@@ -0,0 +1,664 @@
+"""Hand-written policies compiled into alias tables.
+
+An archetype's _make_decision() is a chain of random branches, but for a
+given situation it always amounts to the same categorical distribution
+over (action, target). The compiler finds that distribution by running the
+real method once per branch combination, passing it an enumerator as
+its `rng` argument:
+
+- rng.random() returns a placeholder draw, and comparing it with a
+  probability p forks the run into a p branch and a 1 - p branch;
+- rng.choice(other_agents) stands for "any candidate", resolved when
+  sampling; a choice among other sequences forks once per element;
+- relationship values are recorded whenever they are compared with a
+  constant, and so are the agent's memory.knows() lookups. Those
+  conditions ("guards"), together with which characters of the cast are
+  present and alive, make up the state bucket (a dead character counts as
+  absent, which is how the policies treat one).
+
+Each bucket's distribution is cached as an alias table, and each guard as
+a reader of one memory fact or relationship channel by name, so a compiled
+decision costs one presence scan, a few raw lookups and a single draw.
+
+Policies that draw from anything but `rng`, compare relationship values
+with anything but constants, read the matrix other than through
+get_relationship(), get_trust_level() or get_suspicion_level(), or depend
+on other state are not supported:
+the compiler raises CompileError where it can tell and CompiledPolicy
+then falls back to the hand-written method.
+"""
+
+import copy
+import inspect
+import operator
+import random
+import threading
+from collections.abc import Sequence as SequenceABC
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+from .base_agent import ActionType, BaseAgent
+from ..world.relationship_matrix import DEFAULT_RELATIONSHIP
+
+
+class CompileError(Exception):
+    """Raised when a policy cannot be compiled into a fixed distribution."""
+
+
+# Target of outcomes drawn uniformly from the candidates (rng.choice(other_agents))
+ANY = "*"
+
+
+class _AnyCandidate:
+    """What rng.choice(other_agents) returns while compiling."""
+    
+    def __getattr__(self, name: str):
+        raise CompileError("policy inspects a randomly chosen candidate")
+
+
+_ANY_CANDIDATE = _AnyCandidate()
+
+# Stands for the deciding agent in guards, so copies of an archetype share them
+SELF = "<self>"
+
+_COMPARISONS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+}
+
+# Channel read by the matrix methods whose results guards may compare
+_CHANNEL_METHODS = {
+    "get_trust_level": "trust",
+    "get_suspicion_level": "suspicion",
+}
+
+
+class AliasTable:
+    """
+    Walker/Vose alias table: O(1) sampling from a categorical distribution.
+    
+    sample() needs one uniform draw; the part of it not used to pick the
+    outcome is returned as a second uniform, which resolves ANY targets.
+    """
+    
+    __slots__ = ("outcomes", "probabilities", "_accept", "_alias")
+    
+    def __init__(self, distribution: Dict[Any, float]):
+        """
+        Build the table.
+        
+        Args:
+            distribution: {outcome: probability} (normalized here)
+        """
+        total = sum(distribution.values())
+        self.outcomes = list(distribution)
+        self.probabilities = [distribution[outcome] / total for outcome in self.outcomes]
+        n = len(self.outcomes)
+        scaled = [p * n for p in self.probabilities]
+        self._accept = [1.0] * n
+        self._alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            i, j = small.pop(), large.pop()
+            self._accept[i] = scaled[i]
+            self._alias[i] = j
+            scaled[j] -= 1.0 - scaled[i]
+            (small if scaled[j] < 1.0 else large).append(j)
+    
+    def sample(self, u: float) -> Tuple[Any, float]:
+        """
+        Map a uniform draw to an outcome.
+        
+        Args:
+            u: Uniform draw in [0, 1)
+        
+        Returns:
+            Tuple of (outcome, a fresh uniform in [0, 1) derived from u)
+        """
+        x = u * len(self.outcomes)
+        i = int(x)
+        frac = x - i
+        accept = self._accept[i]
+        if frac < accept:
+            return self.outcomes[i], frac / accept
+        return self.outcomes[self._alias[i]], (frac - accept) / (1.0 - accept)
+
+
+class _Draw(float):
+    """Placeholder for rng.random(): comparing it with p forks the run."""
+    
+    def __new__(cls, enumerator: '_Enumerator'):
+        draw = float.__new__(cls, 0.5)
+        draw._enumerator = enumerator
+        return draw
+    
+    def _below(self, p: Any) -> bool:
+        if isinstance(p, _Traced):
+            raise CompileError("random draw compared with a relationship value")
+        p = min(1.0, max(0.0, float(p)))
+        return self._enumerator.branch([(p, True), (1.0 - p, False)])
+    
+    def __lt__(self, p):
+        return self._below(p)
+    
+    __le__ = __lt__
+    
+    def __gt__(self, p):
+        return not self._below(p)
+    
+    __ge__ = __gt__
+
+
+class _Traced(float):
+    """Relationship value that records its comparisons with constants."""
+    
+    def __new__(cls, value: float, key: Tuple, recorder: List):
+        traced = float.__new__(cls, value)
+        traced._key = key
+        traced._recorder = recorder
+        return traced
+    
+    def _compare(self, op: str, other: Any) -> bool:
+        if isinstance(other, (_Traced, _Draw)):
+            raise CompileError("relationship value compared with a non-constant")
+        result = _COMPARISONS[op](float(self), other)
+        self._recorder.append((self._key, op, float(other)))
+        return result
+    
+    def __lt__(self, other):
+        return self._compare("<", other)
+    
+    def __le__(self, other):
+        return self._compare("<=", other)
+    
+    def __gt__(self, other):
+        return self._compare(">", other)
+    
+    def __ge__(self, other):
+        return self._compare(">=", other)
+
+
+class _Enumerator:
+    """The `rng` of a traced policy: replays one branch combination per run."""
+    
+    def __init__(self, other_agents: Sequence[BaseAgent]):
+        self.other_agents = other_agents
+        self.path: List[int] = []
+        self.arity: List[int] = []
+        self.position = 0
+        self.probability = 1.0
+    
+    def branch(self, options: List[Tuple[float, Any]]) -> Any:
+        """Take this run's branch among options [(probability, value)]."""
+        options = [option for option in options if option[0] > 0.0]
+        if self.position == len(self.path):
+            self.path.append(0)
+            self.arity.append(len(options))
+        probability, value = options[self.path[self.position]]
+        self.position += 1
+        self.probability *= probability
+        return value
+    
+    def next_run(self) -> bool:
+        """Move to the next branch combination; False once all were run."""
+        while self.path and self.path[-1] + 1 >= self.arity[-1]:
+            self.path.pop()
+            self.arity.pop()
+        if not self.path:
+            return False
+        self.path[-1] += 1
+        self.position = 0
+        self.probability = 1.0
+        return True
+    
+    def random(self) -> _Draw:
+        return _Draw(self)
+    
+    def choice(self, seq: Sequence) -> Any:
+        if seq is self.other_agents:
+            return _ANY_CANDIDATE
+        if not seq:
+            raise IndexError("Cannot choose from an empty sequence")
+        return self.branch([(1.0 / len(seq), item) for item in seq])
+    
+    def __getattr__(self, name: str):
+        raise CompileError(f"rng.{name}() cannot be compiled")
+
+
+class _TracingMatrix:
+    """Relationship matrix wrapper whose float results record their comparisons."""
+    
+    def __init__(self, matrix, agent: BaseAgent, recorder: List):
+        self._matrix = matrix
+        self._agent = agent
+        self._recorder = recorder
+    
+    def __getattr__(self, name: str):
+        method = getattr(self._matrix, name)
+        if not callable(method):
+            return method
+        
+        def traced(*args):
+            key = ("matrix", name, tuple(
+                SELF if arg is self._agent else arg.name if isinstance(arg, BaseAgent) else arg
+                for arg in args
+            ))
+            result = method(*args)
+            if isinstance(result, float):
+                return _Traced(result, key + (None,), self._recorder)
+            if isinstance(result, dict):
+                return {
+                    field: _Traced(value, key + (field,), self._recorder)
+                    if isinstance(value, float) else value
+                    for field, value in result.items()
+                }
+            return result
+        return traced
+
+
+class _TracingMemory:
+    """Agent memory wrapper that records the facts a policy looks up."""
+    
+    def __init__(self, memory, recorder: List):
+        self._memory = memory
+        self._recorder = recorder
+    
+    def knows(self, kind: str, actor: str) -> bool:
+        self._recorder.append((("memory", "knows", (kind, actor), None), "==", True))
+        return self._memory.knows(kind, actor)
+    
+    def __getattr__(self, name: str):
+        raise CompileError(f"memory.{name}() cannot be compiled")
+
+
+class _TracingWorld:
+    """World state wrapper exposing a tracing relationship matrix."""
+    
+    def __init__(self, world_state, agent: BaseAgent, recorder: List):
+        self._world_state = world_state
+        self.relationship_matrix = _TracingMatrix(world_state.relationship_matrix, agent, recorder)
+    
+    def __getattr__(self, name: str):
+        return getattr(self._world_state, name)
+
+
+# Guard: (("matrix" or "memory", method, arguments (names or SELF for the
+# matrix), dict field or None), comparison, constant)
+Guard = Tuple[Tuple[str, str, Tuple, Optional[str]], str, Any]
+
+
+def _reader(guard: Guard) -> Callable[[BaseAgent, Any], bool]:
+    """
+    Compile a guard into a function of (agent, relationship matrix).
+    
+    Raises:
+        CompileError: If the guard reads the matrix through another method
+    """
+    (source, method, args, field), op, constant = guard
+    compare = _COMPARISONS[op]
+    if source == "memory":
+        kind, actor = args
+        return lambda agent, matrix: compare(agent.memory.knows(kind, actor), constant)
+    channel = field if method == "get_relationship" else _CHANNEL_METHODS.get(method)
+    if channel is None or len(args) != 2:
+        raise CompileError(f"matrix.{method}() cannot be compiled")
+    first, second = args
+    default = DEFAULT_RELATIONSHIP[channel]
+    
+    def read(agent: BaseAgent, matrix) -> bool:
+        # The matrix method would create a missing cell with default values
+        value = matrix.get_value(
+            agent.name if first == SELF else first, agent.name if second == SELF else second, channel
+        )
+        return compare(default if value is None else value, constant)
+    return read
+
+
+def compile_decision(
+    agent: BaseAgent,
+    world_state,
+    other_agents: List[BaseAgent]
+) -> Tuple[Dict[Tuple[ActionType, Any], float], List[Guard]]:
+    """
+    Enumerate every branch of an agent's _make_decision() in the current state.
+    
+    Args:
+        agent: Deciding agent
+        world_state: Current state of the world
+        other_agents: Living agents it may target
+    
+    Returns:
+        Tuple of ({(action, target): probability}, guards evaluated), where
+        target is None, a character name, or ANY
+    
+    Raises:
+        CompileError: If the policy uses randomness or state that cannot be
+            enumerated
+    """
+    if "rng" not in inspect.signature(agent._make_decision).parameters:
+        raise CompileError(f"{type(agent).__name__}._make_decision() takes no rng")
+    recorder: List = []
+    # A copy whose memory records lookups; the agent itself is untouched
+    traced = copy.copy(agent)
+    traced.memory = _TracingMemory(agent.memory, recorder)
+    tracing_world = _TracingWorld(world_state, traced, recorder)
+    enumerator = _Enumerator(other_agents)
+    distribution: Dict[Tuple[ActionType, Any], float] = {}
+    while True:
+        action, target = traced._make_decision(tracing_world, other_agents, rng=enumerator)
+        if target is _ANY_CANDIDATE:
+            target = ANY
+        elif target is not None:
+            if not target.state.is_alive:
+                raise CompileError("policy targets a dead character by name")
+            target = target.name
+        key = (action, target)
+        distribution[key] = distribution.get(key, 0.0) + enumerator.probability
+        if not enumerator.next_run():
+            break
+    
+    guards = list(dict.fromkeys(recorder))
+    return distribution, guards
+
+
+class _Excluding(SequenceABC):
+    """Read-only view of a list without one position (an agent's others)."""
+    
+    __slots__ = ("_items", "_index")
+    
+    def __init__(self, items: List[BaseAgent], index: int):
+        self._items = items
+        self._index = index
+    
+    def __len__(self) -> int:
+        return len(self._items) - 1
+    
+    def __getitem__(self, i: int) -> BaseAgent:
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._items[i + (i >= self._index)]
+    
+    def __iter__(self):
+        for i, item in enumerate(self._items):
+            if i != self._index:
+                yield item
+
+
+class _Bucket:
+    """Compiled tables of one archetype for one set of present, living characters."""
+    
+    __slots__ = ("guards", "readers", "tables")
+    
+    def __init__(self):
+        self.guards: List[Guard] = []
+        # _reader() of each guard
+        self.readers: Tuple[Callable[[BaseAgent, Any], bool], ...] = ()
+        # {guard outcomes: AliasTable}
+        self.tables: Dict[Tuple[bool, ...], AliasTable] = {}
+    
+    def outcomes(self, agent: BaseAgent, matrix) -> Tuple[bool, ...]:
+        """Outcome of each guard in the current state."""
+        return tuple([read(agent, matrix) for read in self.readers])
+
+
+class CompiledPolicy:
+    """
+    Decision policy that samples the hand-written policies from alias tables.
+    
+    Attach it with attach(); BaseAgent.decide_action() then defers to
+    decide(). Tables are compiled on first use of each state bucket. The
+    action frequencies are those of _make_decision() (`python benchmark.py
+    alias` checks this), although a seeded run takes different draws.
+    
+    The standard archetypes are short branch chains, so decide() stays
+    slower than calling them directly; decide_all(), which scans the cast
+    once per call, about matches them on the standard cast and is faster
+    in larger courts.
+    """
+    
+    def __init__(self, cast: Optional[Sequence[str]] = None):
+        """
+        Initialize the policy.
+        
+        Args:
+            cast: Names the policies look for (defaults to the archetypes'
+                own names); which of them are present and alive is part
+                of the bucket
+        """
+        if cast is None:
+            from . import ARCHETYPES
+            cast = [cls().name for cls in ARCHETYPES.values()]
+        self.cast = frozenset(cast)
+        self._buckets: Dict[Tuple[type, FrozenSet[str]], _Bucket] = {}
+        # {(present names, name): present names without it}
+        self._without: Dict[Tuple[FrozenSet[str], str], FrozenSet[str]] = {}
+        # Classes whose policy could not be compiled
+        self._fallback: Dict[type, str] = {}
+        self._lock = threading.Lock()
+    
+    def attach(self, agents: Sequence[BaseAgent]):
+        """Make this the decision policy of the given agents."""
+        for agent in agents:
+            agent.policy = self
+    
+    def __getstate__(self) -> Dict:
+        """Pickle the compiled tables without the lock (e.g. for process pools)."""
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+    
+    def __setstate__(self, state: Dict):
+        """Restore a pickled policy with a fresh lock."""
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def table(
+        self,
+        agent: BaseAgent,
+        world_state,
+        other_agents: List[BaseAgent],
+        present: FrozenSet[str]
+    ) -> Optional[AliasTable]:
+        """
+        Get the alias table of an agent's current bucket, compiling it if new.
+        
+        Args:
+            agent: Deciding agent
+            world_state: Current state of the world
+            other_agents: Living agents it may target
+            present: Names of the living cast members among other_agents
+        
+        Returns:
+            The table, or None if the agent's policy cannot be compiled
+        """
+        key = (type(agent), present)
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            table = bucket.tables.get(bucket.outcomes(agent, world_state.relationship_matrix))
+            if table is not None:
+                return table
+        
+        cls = key[0]
+        if cls in self._fallback:
+            return None
+        with self._lock:
+            try:
+                distribution, guards = compile_decision(agent, world_state, other_agents)
+                bucket = self._buckets.setdefault(key, _Bucket())
+                new_guards = [guard for guard in guards if guard not in bucket.guards]
+                if new_guards:
+                    # Existing tables are keyed on the shorter guard list
+                    readers = bucket.readers + tuple(_reader(guard) for guard in new_guards)
+                    bucket.guards = bucket.guards + new_guards
+                    bucket.readers = readers
+                    bucket.tables = {}
+            except CompileError as e:
+                self._fallback[cls] = str(e)
+                return None
+            table = bucket.tables[bucket.outcomes(agent, world_state.relationship_matrix)] = (
+                AliasTable(distribution)
+            )
+            return table
+    
+    def _present(self, agent: BaseAgent, other_agents: Sequence[BaseAgent]) -> FrozenSet[str]:
+        """
+        Names of the living cast members among an agent's candidates.
+        
+        Callers may pass dead candidates; the policies skip a character
+        they find dead just as one they do not find, so the dead count as
+        absent from the bucket. The scan stops once every cast member but
+        the agent has been seen (names are unique, as in the matrix).
+        """
+        cast = self.cast
+        remaining = len(cast) - (agent.name in cast)
+        present = []
+        for other in other_agents:
+            if other.name in cast:
+                if other.state.is_alive:
+                    present.append(other.name)
+                remaining -= 1
+                if not remaining:
+                    break
+        return frozenset(present)
+    
+    def _sample(
+        self,
+        agent: BaseAgent,
+        world_state,
+        other_agents: Sequence[BaseAgent],
+        present: FrozenSet[str],
+        named: Optional[Dict[str, BaseAgent]],
+        draw: float,
+        rng
+    ) -> Tuple[ActionType, Optional[BaseAgent]]:
+        """
+        Decide with one uniform draw (the hand-written fallback draws from rng).
+        
+        `named` maps at least the present names to their agents; if None,
+        a named target is looked up among other_agents.
+        """
+        # table() without its call overhead while the bucket's guards have a table
+        bucket = self._buckets.get((type(agent), present))
+        table = None
+        if bucket is not None:
+            matrix = world_state.relationship_matrix
+            table = bucket.tables.get(tuple([read(agent, matrix) for read in bucket.readers]))
+        if table is None:
+            table = self.table(agent, world_state, other_agents, present)
+            if table is None:
+                return agent._make_decision(world_state, other_agents, rng)
+        (action, target), u = table.sample(draw)
+        if target is None:
+            return (action, None)
+        if target == ANY:
+            return (action, other_agents[min(int(u * len(other_agents)), len(other_agents) - 1)])
+        if named is not None:
+            return (action, named[target])
+        return (action, next(other for other in other_agents if other.name == target))
+    
+    def distribution(
+        self,
+        agent: BaseAgent,
+        world_state,
+        other_agents: List[BaseAgent]
+    ) -> Dict[Tuple[ActionType, Optional[BaseAgent]], float]:
+        """
+        Get the exact distribution of an agent's decision in the current state.
+        
+        Args:
+            agent: Deciding agent
+            world_state: Current state of the world
+            other_agents: Living agents it may target
+        
+        Returns:
+            {(action_type, target_agent): probability}
+        
+        Raises:
+            CompileError: If the agent's policy cannot be compiled
+        """
+        named = {other.name: other for other in other_agents}
+        table = self.table(agent, world_state, other_agents, self._present(agent, other_agents))
+        if table is None:
+            raise CompileError(self._fallback[type(agent)])
+        result: Dict[Tuple[ActionType, Optional[BaseAgent]], float] = {}
+        for (action, target), probability in zip(table.outcomes, table.probabilities):
+            if target == ANY:
+                targets = [(other, probability / len(other_agents)) for other in other_agents]
+            else:
+                targets = [(named[target] if target is not None else None, probability)]
+            for other, share in targets:
+                result[(action, other)] = result.get((action, other), 0.0) + share
+        return result
+    
+    def decide(
+        self,
+        agent: BaseAgent,
+        world_state,
+        other_agents: List[BaseAgent],
+        rng=random
+    ) -> Tuple[ActionType, Optional[BaseAgent]]:
+        """
+        Decide one agent's action.
+        
+        Args:
+            agent: Deciding agent
+            world_state: Current state of the world
+            other_agents: Living agents it may target
+            rng: Source of the random draw
+        
+        Returns:
+            Tuple of (action_type, target_agent)
+        """
+        return self._sample(
+            agent, world_state, other_agents, self._present(agent, other_agents), None, rng.random(), rng
+        )
+    
+    def decide_all(
+        self,
+        world_state,
+        agents: List[BaseAgent],
+        candidates: Optional[List[List[BaseAgent]]] = None,
+        rng=random
+    ) -> List[Tuple[ActionType, Optional[BaseAgent]]]:
+        """
+        Decide every agent's action on the same world.
+        
+        Args:
+            world_state: Current state of the world
+            agents: Deciding agents, in turn order
+            candidates: Targets of each agent; if None, every agent may
+                target every other agent in `agents`
+            rng: Source of the random draws
+        
+        Returns:
+            One (action_type, target_agent) tuple per agent
+        """
+        draws = [rng.random() for _ in agents]
+        decisions = []
+        if candidates is None:
+            cast = self.cast
+            named = {agent.name: agent for agent in agents if agent.name in cast and agent.state.is_alive}
+            everyone = frozenset(named)
+            without = self._without
+            for j, (agent, draw) in enumerate(zip(agents, draws)):
+                others = _Excluding(agents, j)
+                if not others:
+                    decisions.append((ActionType.HIDE, None))
+                    continue
+                present = everyone
+                if agent.name in everyone:
+                    present = without.get((everyone, agent.name))
+                    if present is None:
+                        present = without[(everyone, agent.name)] = everyone - {agent.name}
+                decisions.append(self._sample(agent, world_state, others, present, named, draw, rng))
+            return decisions
+        
+        for agent, others, draw in zip(agents, candidates, draws):
+            if not others:
+                decisions.append((ActionType.HIDE, None))
+                continue
+            present = self._present(agent, others)
+            decisions.append(self._sample(agent, world_state, others, present, None, draw, rng))
+        return decisions
@@ -9,6 +9,9 @@ from ..world.world_state import WorldState
 class Gertrude(BaseAgent):
     """Gertrude - seeks stability, mediates others."""
     
+    # Mediating looks at Hamlet's suspicion of Claudius
+    watched_pairs = (("Hamlet", "Claudius"),)
+    
     def __init__(self):
         super().__init__(
             name="Gertrude",
@@ -23,7 +26,8 @@ class Gertrude(BaseAgent):
     def _make_decision(
         self,
         world_state: WorldState,
-        other_agents: List[BaseAgent]
+        other_agents: List[BaseAgent],
+        rng=random
     ) -> Tuple[ActionType, Optional[BaseAgent]]:
         """Gertrude's decision-making: mediates, seeks stability."""
         hamlet = next((a for a in other_agents if a.name == "Hamlet"), None)
@@ -34,26 +38,26 @@ class Gertrude(BaseAgent):
             conflict = world_state.relationship_matrix.get_relationship(hamlet, claudius)
             if conflict["suspicion"] > 0.5:
                 # Try to talk to both to mediate
-                if random.random() < 0.5:
+                if rng.random() < 0.5:
                     return (ActionType.TALK_TO, hamlet)
                 else:
                     return (ActionType.TALK_TO, claudius)
         
         # Protect Hamlet
         if hamlet and hamlet.state.is_alive:
-            if random.random() < 0.4:
+            if rng.random() < 0.4:
                 return (ActionType.DEFEND, hamlet)
-            elif random.random() < 0.3:
+            elif rng.random() < 0.3:
                 return (ActionType.TALK_TO, hamlet)
         
         # Maintain relationship with Claudius
         if claudius and claudius.state.is_alive:
-            if random.random() < 0.3:
+            if rng.random() < 0.3:
                 return (ActionType.TALK_TO, claudius)
         
         # Default: talk to random agent
         if other_agents:
-            return (ActionType.TALK_TO, random.choice(other_agents))
+            return (ActionType.TALK_TO, rng.choice(other_agents))
         
         return (ActionType.HIDE, None)
 
@@ -23,20 +23,26 @@ class Hamlet(BaseAgent):
     def _make_decision(
         self,
         world_state: WorldState,
-        other_agents: List[BaseAgent]
+        other_agents: List[BaseAgent],
+        rng=random
     ) -> Tuple[ActionType, Optional[BaseAgent]]:
         """Hamlet's decision-making: seeks truth, suspicious of Claudius."""
         # Find Claudius
         claudius = next((a for a in other_agents if a.name == "Claudius"), None)
         horatio = next((a for a in other_agents if a.name == "Horatio"), None)
         
-        # High suspicion of Claudius - likely to spy or accuse
+        # High suspicion of Claudius - likely to spy or accuse, and to
+        # accuse outright once he has caught Claudius attacking or
+        # scheming against him, or attacking one of his allies
         if claudius and claudius.state.is_alive:
             suspicion = world_state.relationship_matrix.get_suspicion_level(
                 self, claudius
             )
-            if suspicion > 0.5 or random.random() < 0.4:
-                if random.random() < 0.6:
+            provoked = (self.memory.knows("attacked_me", "Claudius")
+                        or self.memory.knows("attacked_ally", "Claudius")
+                        or self.memory.knows("schemed_against_me", "Claudius"))
+            if suspicion > 0.5 or rng.random() < 0.4:
+                if rng.random() < (0.3 if provoked else 0.6):
                     return (ActionType.SPY_ON, claudius)
                 else:
                     return (ActionType.ACCUSE, claudius)
@@ -44,18 +50,18 @@ class Hamlet(BaseAgent):
         # Trust Horatio - talk to him
         if horatio and horatio.state.is_alive:
             trust = world_state.relationship_matrix.get_trust_level(self, horatio)
-            if trust > 0.5 or random.random() < 0.5:
+            if trust > 0.5 or rng.random() < 0.5:
                 return (ActionType.TALK_TO, horatio)
         
         # Sometimes schemes or hides
-        if random.random() < 0.3:
+        if rng.random() < 0.3:
             return (ActionType.SCHEME, None)
-        elif random.random() < 0.2:
+        elif rng.random() < 0.2:
             return (ActionType.HIDE, None)
         
         # Default: talk to random agent
         if other_agents:
-            return (ActionType.TALK_TO, random.choice(other_agents))
+            return (ActionType.TALK_TO, rng.choice(other_agents))
         
         return (ActionType.HIDE, None)
 
@@ -23,27 +23,29 @@ class Horatio(BaseAgent):
     def _make_decision(
         self,
         world_state: WorldState,
-        other_agents: List[BaseAgent]
+        other_agents: List[BaseAgent],
+        rng=random
     ) -> Tuple[ActionType, Optional[BaseAgent]]:
         """Horatio's decision-making: extremely loyal to Hamlet."""
         hamlet = next((a for a in other_agents if a.name == "Hamlet"), None)
         
-        # Very loyal to Hamlet - often talks to or defends him
+        # Very loyal to Hamlet - often talks to or defends him, defending
+        # more once Claudius has attacked one of his allies
         if hamlet and hamlet.state.is_alive:
-            if random.random() < 0.6:
+            if rng.random() < 0.6:
                 return (ActionType.TALK_TO, hamlet)
-            elif random.random() < 0.3:
+            elif rng.random() < (0.6 if self.memory.knows("attacked_ally", "Claudius") else 0.3):
                 return (ActionType.DEFEND, hamlet)
         
         # Sometimes spies on threats to Hamlet
         claudius = next((a for a in other_agents if a.name == "Claudius"), None)
         if claudius and claudius.state.is_alive:
-            if random.random() < 0.2:
+            if rng.random() < 0.2:
                 return (ActionType.SPY_ON, claudius)
         
         # Default: talk to random agent
         if other_agents:
-            return (ActionType.TALK_TO, random.choice(other_agents))
+            return (ActionType.TALK_TO, rng.choice(other_agents))
         
         return (ActionType.HIDE, None)
 
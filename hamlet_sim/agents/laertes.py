@@ -23,7 +23,8 @@ class Laertes(BaseAgent):
     def _make_decision(
         self,
         world_state: WorldState,
-        other_agents: List[BaseAgent]
+        other_agents: List[BaseAgent],
+        rng=random
     ) -> Tuple[ActionType, Optional[BaseAgent]]:
         """Laertes's decision-making: revenge-seeking, protective."""
         hamlet = next((a for a in other_agents if a.name == "Hamlet"), None)
@@ -32,9 +33,9 @@ class Laertes(BaseAgent):
         
         # Protective of Ophelia
         if ophelia and ophelia.state.is_alive:
-            if random.random() < 0.4:
+            if rng.random() < 0.4:
                 return (ActionType.DEFEND, ophelia)
-            elif random.random() < 0.3:
+            elif rng.random() < 0.3:
                 return (ActionType.TALK_TO, ophelia)
         
         # Revenge against Hamlet (if suspicion is high)
@@ -42,20 +43,20 @@ class Laertes(BaseAgent):
             suspicion = world_state.relationship_matrix.get_suspicion_level(
                 self, hamlet
             )
-            if suspicion > 0.5 or random.random() < 0.3:
-                if random.random() < 0.5:
+            if suspicion > 0.5 or rng.random() < 0.3:
+                if rng.random() < 0.5:
                     return (ActionType.ATTACK, hamlet)
                 else:
                     return (ActionType.ACCUSE, hamlet)
         
         # Sometimes works with Claudius
         if claudius and claudius.state.is_alive:
-            if random.random() < 0.2:
+            if rng.random() < 0.2:
                 return (ActionType.TALK_TO, claudius)
         
         # Default: talk to random agent
         if other_agents:
-            return (ActionType.TALK_TO, random.choice(other_agents))
+            return (ActionType.TALK_TO, rng.choice(other_agents))
         
         return (ActionType.HIDE, None)
 
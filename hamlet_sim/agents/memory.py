@@ -0,0 +1,226 @@
+"""Bounded episodic memory of what an agent observed."""
+
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+# Kinds of memories, stored as their index (append new kinds, since
+# checkpoints store the index). "attacked_ally" means someone attacked an
+# agent the rememberer is allied with, and "caught_me_spying" that the
+# actor discovered the rememberer spying on them; the others are done to
+# the rememberer (spying and scheming only once discovered).
+KINDS = (
+    "spied_on_me",
+    "schemed_against_me",
+    "attacked_me",
+    "betrayed_me",
+    "accused_me",
+    "attacked_ally",
+    "caught_me_spying",
+)
+_KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+# Importance lost per turn of age when choosing what to forget
+DECAY = 0.01
+
+
+class Memory(NamedTuple):
+    """One remembered episode: `actor` did `kind` to `subject` on `turn`."""
+    turn: int
+    kind: str
+    actor: str
+    subject: str
+    importance: float
+
+
+class AgentMemory:
+    """
+    Fixed-capacity store of memories with importance-based eviction.
+    
+    Memories live in preallocated parallel arrays. While there is room a new
+    memory takes the next free slot; once full it replaces the memory with
+    the lowest importance after age decay, or is dropped if it matters less
+    than all of them. A count per (kind, actor) is kept alongside, so "has X
+    ever spied on me" style checks cost one dict lookup however the memory
+    is used.
+    """
+    
+    __slots__ = ("capacity", "_turns", "_kinds", "_importance", "_actors",
+                 "_subjects", "_size", "_counts", "_shared", "version")
+    
+    def __init__(self, capacity: int = 32):
+        """
+        Initialize an empty memory.
+        
+        Args:
+            capacity: Maximum number of memories kept
+        """
+        self.capacity = capacity
+        self._turns = array('i', bytes(4 * capacity))
+        self._kinds = array('B', bytes(capacity))
+        self._importance = array('f', bytes(4 * capacity))
+        self._actors: List[Optional[str]] = [None] * capacity
+        self._subjects: List[Optional[str]] = [None] * capacity
+        self._size = 0
+        # {(kind code, actor): number of stored memories}
+        self._counts: Dict[Tuple[int, str], int] = {}
+        # True while the storage is shared with a fork
+        self._shared = False
+        # Number of memories stored so far (lets checkpoints skip unchanged memories)
+        self.version = 0
+    
+    def __len__(self) -> int:
+        """Number of stored memories."""
+        return self._size
+    
+    def fork(self) -> 'AgentMemory':
+        """
+        Copy the memory copy-on-write: both copies share storage until one
+        of them remembers something new.
+        """
+        clone = AgentMemory.__new__(AgentMemory)
+        for slot in AgentMemory.__slots__:
+            setattr(clone, slot, getattr(self, slot))
+        self._shared = clone._shared = True
+        return clone
+    
+    @classmethod
+    def from_records(cls, capacity: int, records: List[Memory]) -> 'AgentMemory':
+        """
+        Rebuild a memory from its records in storage order (see records()).
+        
+        Args:
+            capacity: Maximum number of memories kept
+            records: Stored memories, at most `capacity`
+        
+        Returns:
+            AgentMemory holding the records in the same slots
+        """
+        memory = cls(capacity)
+        for slot, record in enumerate(records):
+            code = _KIND_CODES[record.kind]
+            memory._turns[slot] = record.turn
+            memory._kinds[slot] = code
+            memory._importance[slot] = record.importance
+            memory._actors[slot] = record.actor
+            memory._subjects[slot] = record.subject
+            key = (code, record.actor)
+            memory._counts[key] = memory._counts.get(key, 0) + 1
+        memory._size = len(records)
+        return memory
+    
+    def records(self) -> List[Memory]:
+        """Get every stored memory in storage order (the order eviction scans)."""
+        return [self._record(slot) for slot in range(self._size)]
+    
+    def _unshare(self):
+        """Take private copies of storage shared with a fork."""
+        self._turns = array('i', self._turns)
+        self._kinds = array('B', self._kinds)
+        self._importance = array('f', self._importance)
+        self._actors = list(self._actors)
+        self._subjects = list(self._subjects)
+        self._counts = dict(self._counts)
+        self._shared = False
+    
+    def remember(self, turn: int, kind: str, actor: str, subject: str, importance: float) -> bool:
+        """
+        Store a memory, evicting the least important one if full.
+        
+        Args:
+            turn: Turn the episode happened
+            kind: One of KINDS
+            actor: Name of the agent who acted
+            subject: Name of the agent acted upon
+            importance: How much the episode matters (0.0 to 1.0)
+        
+        Returns:
+            True if the memory was stored
+        """
+        code = _KIND_CODES[kind]
+        if self._shared:
+            self._unshare()
+        if self._size < self.capacity:
+            slot = self._size
+            self._size += 1
+        else:
+            slot = min(
+                range(self.capacity),
+                key=lambda i: self._importance[i] - DECAY * (turn - self._turns[i])
+            )
+            if self._importance[slot] - DECAY * (turn - self._turns[slot]) > importance:
+                return False
+            self._forget(slot)
+        
+        self._turns[slot] = turn
+        self._kinds[slot] = code
+        self._importance[slot] = importance
+        self._actors[slot] = actor
+        self._subjects[slot] = subject
+        key = (code, actor)
+        self._counts[key] = self._counts.get(key, 0) + 1
+        self.version += 1
+        return True
+    
+    def _forget(self, slot: int):
+        """Drop the count of the memory in a slot that is about to be reused."""
+        key = (self._kinds[slot], self._actors[slot])
+        remaining = self._counts[key] - 1
+        if remaining:
+            self._counts[key] = remaining
+        else:
+            del self._counts[key]
+    
+    def _record(self, slot: int) -> Memory:
+        """The memory stored in a slot."""
+        return Memory(
+            self._turns[slot], KINDS[self._kinds[slot]], self._actors[slot],
+            self._subjects[slot], self._importance[slot]
+        )
+    
+    def count(self, kind: str, actor: Optional[str] = None) -> int:
+        """
+        Number of remembered episodes of a kind, optionally by one actor.
+        
+        O(1) with an actor; without one, O(distinct actors of that kind).
+        """
+        code = _KIND_CODES[kind]
+        if actor is not None:
+            return self._counts.get((code, actor), 0)
+        return sum(n for (c, _), n in self._counts.items() if c == code)
+    
+    def knows(self, kind: str, actor: str) -> bool:
+        """Check whether the agent remembers `actor` doing `kind`."""
+        return (_KIND_CODES[kind], actor) in self._counts
+    
+    def recall(
+        self,
+        kind: Optional[str] = None,
+        actor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Memory]:
+        """
+        Get remembered episodes, newest first.
+        
+        Args:
+            kind: Only episodes of this kind
+            actor: Only episodes by this agent
+            limit: Maximum number of memories
+        
+        Returns:
+            Matching memories
+        """
+        code = _KIND_CODES[kind] if kind is not None else None
+        slots = [
+            i for i in range(self._size)
+            if (code is None or self._kinds[i] == code)
+            and (actor is None or self._actors[i] == actor)
+        ]
+        slots.sort(key=lambda i: -self._turns[i])
+        return [self._record(i) for i in slots[:limit]]
+    
+    def most_important(self) -> Optional[Memory]:
+        """Get the most important memory, or None if empty."""
+        if not self._size:
+            return None
+        return self._record(max(range(self._size), key=lambda i: (self._importance[i], self._turns[i])))
@@ -23,7 +23,8 @@ class Ophelia(BaseAgent):
     def _make_decision(
         self,
         world_state: WorldState,
-        other_agents: List[BaseAgent]
+        other_agents: List[BaseAgent],
+        rng=random
     ) -> Tuple[ActionType, Optional[BaseAgent]]:
         """Ophelia's decision-making: avoids conflict, loyal to family."""
         hamlet = next((a for a in other_agents if a.name == "Hamlet"), None)
@@ -32,25 +33,25 @@ class Ophelia(BaseAgent):
         
         # Loyal to family - talk to Laertes and Polonius
         if laertes and laertes.state.is_alive:
-            if random.random() < 0.4:
+            if rng.random() < 0.4:
                 return (ActionType.TALK_TO, laertes)
         
         if polonius and polonius.state.is_alive:
-            if random.random() < 0.3:
+            if rng.random() < 0.3:
                 return (ActionType.TALK_TO, polonius)
         
         # Sometimes talks to Hamlet (complex relationship)
         if hamlet and hamlet.state.is_alive:
-            if random.random() < 0.3:
+            if rng.random() < 0.3:
                 return (ActionType.TALK_TO, hamlet)
         
         # Avoids conflict - often hides
-        if random.random() < 0.4:
+        if rng.random() < 0.4:
             return (ActionType.HIDE, None)
         
         # Default: talk to random agent
         if other_agents:
-            return (ActionType.TALK_TO, random.choice(other_agents))
+            return (ActionType.TALK_TO, rng.choice(other_agents))
         
         return (ActionType.HIDE, None)
 
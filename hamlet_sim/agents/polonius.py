@@ -23,36 +23,40 @@ class Polonius(BaseAgent):
     def _make_decision(
         self,
         world_state: WorldState,
-        other_agents: List[BaseAgent]
+        other_agents: List[BaseAgent],
+        rng=random
     ) -> Tuple[ActionType, Optional[BaseAgent]]:
         """Polonius's decision-making: spies frequently."""
         hamlet = next((a for a in other_agents if a.name == "Hamlet"), None)
         claudius = next((a for a in other_agents if a.name == "Claudius"), None)
         ophelia = next((a for a in other_agents if a.name == "Ophelia"), None)
         
+        # Once caught by Hamlet, spies on him less and runs to Claudius more
+        caught = self.memory.knows("caught_me_spying", "Hamlet")
+        
         # Spies on Hamlet frequently (serves Claudius)
         if hamlet and hamlet.state.is_alive:
-            if random.random() < 0.5:
+            if rng.random() < (0.2 if caught else 0.5):
                 return (ActionType.SPY_ON, hamlet)
         
         # Reports to Claudius
         if claudius and claudius.state.is_alive:
-            if random.random() < 0.3:
+            if rng.random() < (0.5 if caught else 0.3):
                 return (ActionType.TALK_TO, claudius)
         
         # Protective of Ophelia
         if ophelia and ophelia.state.is_alive:
-            if random.random() < 0.2:
+            if rng.random() < 0.2:
                 return (ActionType.TALK_TO, ophelia)
         
         # Sometimes spies on others
-        if other_agents and random.random() < 0.3:
-            target = random.choice(other_agents)
+        if other_agents and rng.random() < 0.3:
+            target = rng.choice(other_agents)
             return (ActionType.SPY_ON, target)
         
         # Default: talk to random agent
         if other_agents:
-            return (ActionType.TALK_TO, random.choice(other_agents))
+            return (ActionType.TALK_TO, rng.choice(other_agents))
         
         return (ActionType.HIDE, None)
 
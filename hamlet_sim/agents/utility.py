@@ -0,0 +1,728 @@
+"""Utility-based decision policy: one draw from a softmax over scored (action, target) pairs.
+
+Profiles are tuned so the standard cast keeps the hand-written policies' action mix.
+"""
+
+import math
+import random
+import threading
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from .base_agent import ActionType, BaseAgent
+from ..world.relationship_matrix import CHANNELS, DEFAULT_RELATIONSHIP
+
+
+# Actions that need a target, in scoring order; HIDE is scored last
+TARGETED = tuple(action for action in ActionType if action is not ActionType.HIDE)
+
+# Values of a pair without a stored cell, in CHANNELS order
+DEFAULT_VALUES = tuple(DEFAULT_RELATIONSHIP[channel] for channel in CHANNELS)
+
+# Distinct cells whose utilities are memoized per profile before the memo is reset
+MAX_MEMOIZED_CELLS = 4096
+
+# Weight of each relationship channel (agent -> target), in CHANNELS order
+RELATIONSHIP_WEIGHTS = {
+    ActionType.TALK_TO: (1.0, -0.5, -0.5, 1.0, 0.0),
+    ActionType.SPY_ON: (-0.5, 0.0, 2.0, 0.0, 0.0),
+    ActionType.BETRAY: (-1.0, 0.5, 1.0, -1.0, 0.0),
+    ActionType.ACCUSE: (-0.5, 0.0, 2.0, 0.0, 0.0),
+    ActionType.DEFEND: (0.5, 0.0, 0.0, 1.5, 0.0),
+    ActionType.ATTACK: (-0.5, -1.0, 1.5, -1.0, 0.0),
+    ActionType.SCHEME: (-0.5, 0.0, 1.5, -0.5, 0.5),
+}
+
+# Weight of each personality trait: (aggression, loyalty, paranoia)
+TRAIT_WEIGHTS = {
+    ActionType.TALK_TO: (0.0, 0.5, -0.5),
+    ActionType.SPY_ON: (0.0, 0.0, 1.0),
+    ActionType.BETRAY: (0.5, -1.5, 0.0),
+    ActionType.ACCUSE: (0.5, 0.0, 0.5),
+    ActionType.DEFEND: (0.0, 1.0, 0.0),
+    ActionType.ATTACK: (1.5, 0.0, 0.0),
+    ActionType.SCHEME: (0.5, -0.5, 0.5),
+    ActionType.HIDE: (-0.5, 0.0, 1.0),
+}
+
+# Utility bonuses granted by goals
+GOAL_WEIGHTS = {
+    "survive": {ActionType.HIDE: 0.25},
+    "seek_truth": {ActionType.SPY_ON: 0.5},
+    "avenge_father": {ActionType.ATTACK: 0.5, ActionType.ACCUSE: 0.5},
+    "gain_power": {ActionType.SCHEME: 0.5},
+    "maintain_power": {ActionType.SCHEME: 0.5},
+    "maintain_stability": {ActionType.TALK_TO: 0.5},
+    "protect_hamlet": {ActionType.DEFEND: 0.5},
+    "protect_ophelia": {ActionType.DEFEND: 0.5},
+    "protect_family": {ActionType.DEFEND: 0.5},
+    "avoid_conflict": {ActionType.HIDE: 0.5, ActionType.ATTACK: -1.0},
+    "spy": {ActionType.SPY_ON: 1.0},
+    "serve_claudius": {ActionType.TALK_TO: 0.25},
+}
+
+
+class MemoryTerm(NamedTuple):
+    """Target bonuses that apply while an agent remembers `actor` doing any of `kinds`."""
+    kinds: Tuple[str, ...]
+    actor: str
+    # {action: {target name: utility added to the profile's bonus}}
+    targets: Dict[ActionType, Dict[str, float]]
+
+
+class UtilityProfile(NamedTuple):
+    """Archetype-specific part of the utility function."""
+    # Utility added to every pair of an action
+    bias: Dict[ActionType, float] = {}
+    # {action: {target name: utility added when targeting that character}}
+    targets: Dict[ActionType, Dict[str, float]] = {}
+    # Softmax temperature (higher is more random)
+    temperature: float = 1.0
+    # Bonuses following the memory rules of the hand-written policy
+    memories: Tuple[MemoryTerm, ...] = ()
+
+
+# Profiles of the archetypes, by class name (see ARCHETYPES). `python
+# benchmark.py utility` compares the resulting action mix with the
+# hand-written policies.
+PROFILES: Dict[str, UtilityProfile] = {
+    "Hamlet": UtilityProfile(
+        bias={
+            ActionType.TALK_TO: -1.34,
+            ActionType.SPY_ON: -0.4,
+            ActionType.BETRAY: 0.08,
+            ActionType.ACCUSE: -0.24,
+            ActionType.DEFEND: -1.64,
+            ActionType.ATTACK: -1.16,
+            ActionType.SCHEME: -0.63,
+            ActionType.HIDE: -0.56,
+        },
+        targets={
+            ActionType.SPY_ON: {"Claudius": 3.29},
+            ActionType.ACCUSE: {"Claudius": 2.92},
+            ActionType.TALK_TO: {"Horatio": -1.59},
+        },
+        memories=(
+            MemoryTerm(("attacked_me", "attacked_ally", "schemed_against_me"), "Claudius", {
+                ActionType.SPY_ON: {"Claudius": -0.69},
+                ActionType.ACCUSE: {"Claudius": 0.56},
+            }),
+        ),
+    ),
+    "Claudius": UtilityProfile(
+        bias={
+            ActionType.TALK_TO: 1.75,
+            ActionType.SPY_ON: -0.41,
+            ActionType.BETRAY: -1.05,
+            ActionType.ACCUSE: -2.07,
+            ActionType.DEFEND: -2.24,
+            ActionType.ATTACK: -0.51,
+            ActionType.SCHEME: 0.55,
+            ActionType.HIDE: -2.16,
+        },
+        targets={
+            ActionType.SPY_ON: {"Hamlet": 3.57},
+            ActionType.SCHEME: {"Hamlet": 1.65},
+            ActionType.ATTACK: {"Hamlet": 5.16},
+            ActionType.TALK_TO: {"Polonius": -0.16, "Gertrude": -0.86},
+        },
+        memories=(
+            MemoryTerm(("spied_on_me",), "Hamlet", {ActionType.SPY_ON: {"Hamlet": -0.69}}),
+        ),
+    ),
+    "Gertrude": UtilityProfile(
+        bias={
+            ActionType.TALK_TO: 1.75,
+            ActionType.SPY_ON: -1.24,
+            ActionType.BETRAY: 0.45,
+            ActionType.ACCUSE: -1.11,
+            ActionType.DEFEND: -3.66,
+            ActionType.ATTACK: -1.36,
+            ActionType.SCHEME: -0.58,
+            ActionType.HIDE: -1.39,
+        },
+        targets={
+            ActionType.TALK_TO: {"Hamlet": 0.75, "Claudius": 0.83},
+            ActionType.DEFEND: {"Hamlet": -0.87},
+        },
+    ),
+    "Ophelia": UtilityProfile(
+        bias={
+            ActionType.TALK_TO: 2.18,
+            ActionType.SPY_ON: -2.02,
+            ActionType.BETRAY: 0.36,
+            ActionType.ACCUSE: -1.85,
+            ActionType.DEFEND: -4.51,
+            ActionType.ATTACK: -0.2,
+            ActionType.SCHEME: -1.54,
+            ActionType.HIDE: 1.65,
+        },
+        targets={
+            ActionType.TALK_TO: {"Laertes": -0.53, "Polonius": -1.08, "Hamlet": -0.79},
+        },
+    ),
+    "Horatio": UtilityProfile(
+        bias={
+            ActionType.TALK_TO: 2.94,
+            ActionType.SPY_ON: -0.87,
+            ActionType.BETRAY: 0.25,
+            ActionType.ACCUSE: -1.44,
+            ActionType.DEFEND: -2.27,
+            ActionType.ATTACK: -1.73,
+            ActionType.SCHEME: -0.83,
+            ActionType.HIDE: -1.88,
+        },
+        targets={
+            ActionType.TALK_TO: {"Hamlet": -0.44},
+            ActionType.DEFEND: {"Hamlet": 2.11},
+            ActionType.SPY_ON: {"Claudius": 2.42},
+        },
+        memories=(
+            MemoryTerm(("attacked_ally",), "Claudius", {ActionType.DEFEND: {"Hamlet": 0.69}}),
+        ),
+    ),
+    "Laertes": UtilityProfile(
+        bias={
+            ActionType.TALK_TO: 3.43,
+            ActionType.SPY_ON: -1.61,
+            ActionType.BETRAY: 0.27,
+            ActionType.ACCUSE: -0.94,
+            ActionType.DEFEND: -1.28,
+            ActionType.ATTACK: -0.97,
+            ActionType.SCHEME: -1.38,
+            ActionType.HIDE: -1.46,
+        },
+        targets={
+            ActionType.DEFEND: {"Ophelia": 3.05},
+            ActionType.TALK_TO: {"Ophelia": -1.23, "Claudius": -0.98},
+            ActionType.ATTACK: {"Hamlet": 2.56},
+            ActionType.ACCUSE: {"Hamlet": 2.55},
+        },
+    ),
+    "Polonius": UtilityProfile(
+        bias={
+            ActionType.TALK_TO: 3.05,
+            ActionType.SPY_ON: 1.74,
+            ActionType.BETRAY: -0.19,
+            ActionType.ACCUSE: -1.83,
+            ActionType.DEFEND: -2.97,
+            ActionType.ATTACK: -1.65,
+            ActionType.SCHEME: -1.19,
+            ActionType.HIDE: -2.25,
+        },
+        targets={
+            ActionType.SPY_ON: {"Hamlet": 0.73},
+            ActionType.TALK_TO: {"Claudius": -0.5, "Ophelia": -1.85},
+        },
+        memories=(
+            MemoryTerm(("caught_me_spying",), "Hamlet", {
+                ActionType.SPY_ON: {"Hamlet": -0.92},
+                ActionType.TALK_TO: {"Claudius": 0.51},
+            }),
+        ),
+    ),
+}
+
+# Profile of agents whose class has none: traits, goals and relationships only
+NEUTRAL_PROFILE = UtilityProfile()
+
+
+class _Profile(NamedTuple):
+    """An agent's utility function with its target-independent part precomputed."""
+    # 1 / temperature; every utility below is already multiplied by it
+    scale: float
+    # Utility of each targeted action before relationships, in TARGETED order
+    base: Tuple[float, ...]
+    # Utility of HIDE
+    hide: float
+    # RELATIONSHIP_WEIGHTS of each targeted action
+    relationship: Tuple[Tuple[float, ...], ...]
+    # {target name: bonus per targeted action (None where the action does not
+    # single the target out)}, for the characters the profile names
+    bonuses: Dict[str, Tuple[Optional[float], ...]]
+    # exp() of each bonus (None where there is none)
+    boosts: Dict[str, Tuple[Optional[float], ...]]
+    # {cell values: exp(utility) per targeted action}, filled on demand
+    memo: Dict[Tuple[float, ...], Tuple[float, ...]]
+    # Whether the profile depends on the agent's memories
+    recalls: bool
+    
+    def utilities(self, values: Tuple[float, ...]) -> List[float]:
+        """Utility of each targeted action toward a target with these cell values."""
+        t, f, s, l, i = values
+        return [
+            b + w0 * t + w1 * f + w2 * s + w3 * l + w4 * i
+            for b, (w0, w1, w2, w3, w4) in zip(self.base, self.relationship)
+        ]
+    
+    def weights(self, values: Tuple[float, ...]) -> Tuple[float, ...]:
+        """exp() of utilities(values); raises OverflowError for extreme utilities."""
+        weights = self.memo.get(values)
+        if weights is None:
+            if len(self.memo) >= MAX_MEMOIZED_CELLS:
+                self.memo.clear()
+            weights = self.memo[values] = tuple(map(math.exp, self.utilities(values)))
+        return weights
+
+
+class _Row:
+    """
+    One agent's candidate targets, grouped for sampling.
+    
+    Targets the agent's profile names each get a column of the softmax
+    (one weight per targeted action); the others are grouped by their
+    cell values into one column per group, each group sorted by name. A
+    draw picks a column by its total weight, then an action within it.
+    The row is thus a function of the candidates and their cells alone,
+    whatever order they were added and moved in, so a cached row and a
+    fresh one make the same decisions. A change only marks the columns it
+    touches; their weights are recomputed on the next draw.
+    """
+    
+    __slots__ = ("profile", "memory", "version", "named", "groups", "keys", "values",
+                 "_columns", "_weights", "_cumulative", "_size")
+    
+    def __init__(self, profile: _Profile, cells: Dict[str, Tuple[float, ...]]):
+        """
+        Initialize a row.
+        
+        Args:
+            profile: The deciding agent's profile
+            cells: {candidate name: values of the agent's cell toward it}
+        """
+        self.profile = profile
+        # Memory (and its version) the profile was chosen under, if it recalls
+        self.memory = None
+        self.version = 0
+        self.named: Dict[str, Tuple[float, ...]] = {}
+        self.groups: Dict[Tuple[float, ...], List[str]] = {}
+        # Group values, sorted
+        self.keys: List[Tuple[float, ...]] = []
+        self.values: Dict[str, Tuple[float, ...]] = {}
+        # Target of each column: the named candidates in profile order, then
+        # the groups in key order
+        self._columns: List[object] = []
+        # Cumulative weights of each column over TARGETED (None if stale),
+        # valid for _size candidates
+        self._weights: List[Optional[List[float]]] = []
+        self._size = 0
+        # Cumulative column totals, then HIDE (None if stale)
+        self._cumulative: Optional[List[float]] = None
+        for name, values in cells.items():
+            self.add(name, values)
+    
+    def _named_column(self, name: str) -> int:
+        """Column of a named candidate (present or about to be added)."""
+        column = 0
+        for other in self.profile.bonuses:
+            if other == name:
+                return column
+            column += other in self.named
+        return column
+    
+    def add(self, name: str, values: Tuple[float, ...]):
+        """Add a candidate."""
+        self.values[name] = values
+        if name in self.profile.bonuses:
+            column = self._named_column(name)
+            self.named[name] = values
+            self._columns.insert(column, name)
+            self._weights.insert(column, None)
+        else:
+            group = self.groups.get(values)
+            if group is None:
+                group = self.groups[values] = []
+                index = bisect_left(self.keys, values)
+                self.keys.insert(index, values)
+                self._columns.insert(len(self.named) + index, group)
+                self._weights.insert(len(self.named) + index, None)
+            else:
+                self._weights[len(self.named) + bisect_left(self.keys, values)] = None
+            insort(group, name)
+        self._cumulative = None
+    
+    def remove(self, name: str):
+        """Remove a candidate, if present."""
+        values = self.values.pop(name, None)
+        if values is None:
+            return
+        if name in self.named:
+            column = self._named_column(name)
+            del self.named[name]
+            del self._columns[column]
+            del self._weights[column]
+        else:
+            group = self.groups[values]
+            del group[bisect_left(group, name)]
+            index = bisect_left(self.keys, values)
+            column = len(self.named) + index
+            if group:
+                self._weights[column] = None
+            else:
+                del self.groups[values]
+                del self.keys[index]
+                del self._columns[column]
+                del self._weights[column]
+        self._cumulative = None
+    
+    def update(self, name: str, values: Tuple[float, ...]):
+        """Change the cell values of a candidate, if present."""
+        old = self.values.get(name)
+        if old is None or old == values:
+            return
+        if name in self.named:
+            self.values[name] = self.named[name] = values
+            self._weights[self._named_column(name)] = None
+            self._cumulative = None
+        else:
+            self.remove(name)
+            self.add(name, values)
+    
+    def _build(self) -> List[float]:
+        """Recompute stale column weights and the cumulative column totals."""
+        profile = self.profile
+        weights = self._weights
+        if self._size != len(self.values):
+            # The crowd term changed: every column is stale
+            weights[:] = [None] * len(weights)
+            self._size = len(self.values)
+        crowd = profile.scale * math.log(max(1, len(self.values)))
+        try:
+            # exp(u + offset) = exp(u) * exp(offset), with exp(u) memoized per cell
+            spread = math.exp(-crowd)
+            named = len(self.named)
+            column = 0
+            while None in weights[column:]:
+                column = weights.index(None, column)
+                target = self._columns[column]
+                if column < named:
+                    weights[column] = list(accumulate(
+                        w * (f if f is not None else spread)
+                        for w, f in zip(profile.weights(self.named[target]), profile.boosts[target])
+                    ))
+                else:
+                    factor = len(target) * spread
+                    weights[column] = list(accumulate(
+                        w * factor for w in profile.weights(self.keys[column - named])
+                    ))
+            totals = [vector[-1] for vector in weights]
+            totals.append(math.exp(profile.hide))
+            cumulative = list(accumulate(totals))
+        except OverflowError:
+            cumulative = [math.inf]
+        if not 0.0 < cumulative[-1] < math.inf:
+            cumulative = self._build_stable(crowd)
+        self._cumulative = cumulative
+        return cumulative
+    
+    def _build_stable(self, crowd: float) -> List[float]:
+        """_build() for extreme utilities: exp(u - max(u)) per pair."""
+        profile = self.profile
+        utilities = [
+            [u + (b if b is not None else -crowd)
+             for u, b in zip(profile.utilities(self.named[name]), profile.bonuses[name])]
+            for name in self._columns[:len(self.named)]
+        ]
+        utilities += [
+            [u + math.log(len(self.groups[values])) - crowd for u in profile.utilities(values)]
+            for values in self.keys
+        ]
+        top = max([profile.hide] + [u for column in utilities for u in column])
+        # Not reusable once the extremes are gone, so every column stays stale
+        self._size = -1
+        self._weights[:] = [list(accumulate(math.exp(u - top) for u in column)) for column in utilities]
+        totals = [vector[-1] for vector in self._weights]
+        totals.append(math.exp(profile.hide - top))
+        return list(accumulate(totals))
+    
+    def pick(self, draw: float) -> Tuple[ActionType, Optional[str]]:
+        """Map a uniform draw to an (action, target name) pair."""
+        cumulative = self._cumulative or self._build()
+        x = draw * cumulative[-1]
+        c = min(bisect_right(cumulative, x), len(cumulative) - 1)
+        if c == len(cumulative) - 1:
+            return (ActionType.HIDE, None)
+        x -= cumulative[c - 1] if c else 0.0
+        vector = self._weights[c]
+        a = min(bisect_right(vector, x), len(vector) - 1)
+        target = self._columns[c]
+        if isinstance(target, list):
+            low = vector[a - 1] if a else 0.0
+            share = (x - low) / (vector[a] - low) if vector[a] > low else 0.0
+            target = target[max(0, min(int(share * len(target)), len(target) - 1))]
+        return (TARGETED[a], target)
+    
+    def probabilities(self) -> Dict[str, float]:
+        """Probability of each action, summed over targets."""
+        cumulative = self._cumulative or self._build()
+        total = cumulative[-1]
+        probabilities = {}
+        for a, action in enumerate(TARGETED):
+            probabilities[action.value] = sum(
+                vector[a] - (vector[a - 1] if a else 0.0) for vector in self._weights
+            ) / total
+        probabilities[ActionType.HIDE.value] = (total - (cumulative[-2] if len(cumulative) > 1 else 0.0)) / total
+        return probabilities
+
+
+class UtilityPolicy:
+    """
+    Decision policy that samples from a softmax over utilities.
+    
+    Attach it to agents with attach(); BaseAgent.decide_action() then
+    defers to decide(). decide_all() decides for a whole population at
+    once; it makes the same decisions as calling decide() for each agent
+    in order.
+    
+    The grouped rows of the last world decided on are cached while every
+    living agent is a candidate (no locations), and kept current through
+    a change tracker on its relationship matrix, and rebuilt when a new
+    memory switches an agent's memory terms. Other candidate lists, and a
+    switch to another world, build rows afresh. Anonymous targets share one
+    unit of attention (their utilities are lowered by log N), while named
+    targets keep their pull however large the court is.
+    """
+    
+    def __init__(self, profiles: Optional[Dict[str, UtilityProfile]] = None):
+        """
+        Initialize the policy.
+        
+        Args:
+            profiles: Profiles by agent class name (defaults to PROFILES)
+        """
+        self.profiles = PROFILES if profiles is None else profiles
+        # {(class name, traits, goals, active memory terms): precomputed profile}
+        self._profiles: Dict[Tuple, _Profile] = {}
+        self._lock = threading.Lock()
+        # Row cache of one matrix: its tracker, the living agents by name
+        # and the row of each agent that has decided
+        self._matrix = None
+        self._tracker = None
+        self._members: Dict[str, BaseAgent] = {}
+        self._rows: Dict[str, _Row] = {}
+    
+    def attach(self, agents: Sequence[BaseAgent]):
+        """Make this the decision policy of the given agents."""
+        for agent in agents:
+            agent.policy = self
+    
+    def __getstate__(self) -> Dict:
+        """Pickle the profiles without the lock and row cache (e.g. for process pools)."""
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state.update(_matrix=None, _tracker=None, _members={}, _rows={})
+        return state
+    
+    def __setstate__(self, state: Dict):
+        """Restore a pickled policy with a fresh lock."""
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def _profile(self, agent: BaseAgent) -> _Profile:
+        """An agent's precomputed profile."""
+        profile = self.profiles.get(type(agent).__name__, NEUTRAL_PROFILE)
+        recalled = tuple(
+            any(agent.memory.knows(kind, term.actor) for kind in term.kinds)
+            for term in profile.memories
+        )
+        key = (type(agent).__name__, agent.aggression, agent.loyalty, agent.paranoia,
+               tuple(agent.goals), recalled)
+        cached = self._profiles.get(key)
+        if cached is None:
+            scale = 1.0 / profile.temperature
+            traits = key[1:4]
+            base = {}
+            for action in ActionType:
+                utility = profile.bias.get(action, 0.0)
+                utility += sum(w * t for w, t in zip(TRAIT_WEIGHTS[action], traits))
+                for goal in agent.goals:
+                    utility += GOAL_WEIGHTS.get(goal, {}).get(action, 0.0)
+                base[action] = scale * utility
+            bonuses: Dict[str, List[Optional[float]]] = {}
+            terms = [profile.targets]
+            terms += [term.targets for term, active in zip(profile.memories, recalled) if active]
+            for a, action in enumerate(TARGETED):
+                for targets in terms:
+                    for name, bonus in targets.get(action, {}).items():
+                        column = bonuses.setdefault(name, [None] * len(TARGETED))
+                        column[a] = (column[a] or 0.0) + scale * bonus
+            cached = self._profiles[key] = _Profile(
+                scale, tuple(base[action] for action in TARGETED), base[ActionType.HIDE],
+                tuple(tuple(scale * w for w in RELATIONSHIP_WEIGHTS[action]) for action in TARGETED),
+                {name: tuple(bonus) for name, bonus in bonuses.items()},
+                {name: tuple(math.exp(b) if b is not None else None for b in bonus)
+                 for name, bonus in bonuses.items()},
+                {},
+                bool(profile.memories)
+            )
+        return cached
+    
+    def _new_row(self, agent: BaseAgent, matrix, names) -> _Row:
+        """Build an agent's row over the named candidates."""
+        cells = matrix.get_cells(((agent.name, name) for name in names), default=DEFAULT_VALUES)
+        row = _Row(self._profile(agent), {name: values for (_, name), values in cells.items()})
+        if row.profile.recalls:
+            row.memory, row.version = agent.memory, agent.memory.version
+        return row
+    
+    def _sync(self, matrix):
+        """Point the cache at a matrix and apply the cells changed since the last call."""
+        if matrix is not self._matrix:
+            if self._matrix is not None:
+                self._matrix.untrack_changes(self._tracker)
+            self._matrix = matrix
+            self._tracker = matrix.track_changes()
+            self._members = {}
+            self._rows = {}
+            return
+        tracker = self._tracker
+        if not tracker:
+            return
+        rows = self._rows
+        members = self._members
+        pairs = [
+            (name1, name2) for name1, name2 in tracker
+            if name1 in rows and name2 in members and name1 != name2
+        ]
+        tracker.clear()
+        for (name1, name2), values in matrix.get_cells(pairs).items():
+            rows[name1].update(name2, values)
+    
+    def _set_members(self, living: Sequence[BaseAgent]):
+        """Update the cached population, dropping the dead from every row."""
+        members = {agent.name: agent for agent in living}
+        if any(name not in self._members for name in members):
+            # Rows lack the newcomers; rebuild them on demand
+            self._rows = {}
+        else:
+            gone = [name for name in self._members if name not in members]
+            for name in gone:
+                self._rows.pop(name, None)
+            for row in self._rows.values():
+                for name in gone:
+                    row.remove(name)
+        self._members = members
+    
+    def _cached_row(self, agent: BaseAgent) -> _Row:
+        """An agent's row over every other cached member."""
+        row = self._rows.get(agent.name)
+        if row is not None and row.profile.recalls and (
+            row.memory is not agent.memory or row.version != agent.memory.version
+        ):
+            # New memories may switch the profile's memory terms
+            if self._profile(agent) is row.profile:
+                row.memory, row.version = agent.memory, agent.memory.version
+            else:
+                row = None
+        if row is None:
+            names = [name for name in self._members if name != agent.name]
+            row = self._rows[agent.name] = self._new_row(agent, self._matrix, names)
+        return row
+    
+    def _row(self, agent: BaseAgent, world_state, other_agents: List[BaseAgent]):
+        """
+        An agent's row over `other_agents`, and the candidates by name.
+        
+        Must be called with the lock held.
+        """
+        self._sync(world_state.relationship_matrix)
+        if len(other_agents) + 1 != len(self._members):
+            self._set_members(world_state.get_living_agents())
+        # other_agents are living, so they are every other member if the
+        # sizes match and the member list is current
+        if len(other_agents) + 1 == len(self._members) and agent.name in self._members:
+            return self._cached_row(agent), self._members
+        by_name = {other.name: other for other in other_agents}
+        return self._new_row(agent, world_state.relationship_matrix, by_name), by_name
+    
+    def decide(
+        self,
+        agent: BaseAgent,
+        world_state,
+        other_agents: List[BaseAgent],
+        rng=random
+    ) -> Tuple[ActionType, Optional[BaseAgent]]:
+        """
+        Decide one agent's action.
+        
+        Args:
+            agent: Deciding agent
+            world_state: Current state of the world
+            other_agents: Living agents it may target
+            rng: Source of the random draw
+        
+        Returns:
+            Tuple of (action_type, target_agent)
+        """
+        with self._lock:
+            row, by_name = self._row(agent, world_state, other_agents)
+            action, target = row.pick(rng.random())
+        return (action, by_name[target] if target is not None else None)
+    
+    def decide_all(
+        self,
+        world_state,
+        agents: List[BaseAgent],
+        candidates: Optional[List[List[BaseAgent]]] = None,
+        rng=random
+    ) -> List[Tuple[ActionType, Optional[BaseAgent]]]:
+        """
+        Decide every agent's action on the same world.
+        
+        Agents without a target hide without drawing from the RNG, as
+        BaseAgent.decide_action() does.
+        
+        Args:
+            world_state: Current state of the world
+            agents: Deciding agents, in turn order
+            candidates: Targets of each agent; if None, every agent may
+                target every other agent in `agents`
+            rng: Source of the random draws
+        
+        Returns:
+            One (action_type, target_agent) tuple per agent
+        """
+        matrix = world_state.relationship_matrix
+        decisions = []
+        with self._lock:
+            self._sync(matrix)
+            if candidates is None:
+                if len(agents) < 2:
+                    return [(ActionType.HIDE, None)] * len(agents)
+                members = self._members
+                if len(agents) != len(members) or any(members.get(a.name) is not a for a in agents):
+                    self._set_members(agents)
+                for agent in agents:
+                    action, target = self._cached_row(agent).pick(rng.random())
+                    decisions.append((action, self._members[target] if target is not None else None))
+                return decisions
+            
+            for agent, targets in zip(agents, candidates):
+                if not targets:
+                    decisions.append((ActionType.HIDE, None))
+                    continue
+                by_name = {target.name: target for target in targets}
+                action, target = self._new_row(agent, matrix, by_name).pick(rng.random())
+                decisions.append((action, by_name[target] if target is not None else None))
+        return decisions
+    
+    def action_probabilities(
+        self,
+        agent: BaseAgent,
+        world_state,
+        other_agents: List[BaseAgent]
+    ) -> Dict[str, float]:
+        """
+        Get the probability of each action (summed over targets).
+        
+        Args:
+            agent: Deciding agent
+            world_state: Current state of the world
+            other_agents: Living agents it may target
+        
+        Returns:
+            {action value: probability}
+        """
+        with self._lock:
+            row, _ = self._row(agent, world_state, other_agents)
+            return row.probabilities()
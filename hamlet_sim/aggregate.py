@@ -0,0 +1,262 @@
+"""Streaming, mergeable aggregation of Monte Carlo run outcomes.
+
+Aggregators fold in one run summary at a time (see core.run_headless())
+and keep only counters, so memory depends on the cast and the histogram
+bins, not on the number of runs. Two aggregators over disjoint runs merge
+into the aggregator of all of them, which lets every worker process
+aggregate its own share of a batch and send back a few kilobytes.
+"""
+
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class RunningStats:
+    """
+    Count, mean, variance, minimum and maximum of a stream of numbers.
+    
+    Uses Welford's update, and Chan et al.'s formula to merge two streams,
+    so the variance stays accurate over millions of values.
+    """
+    
+    __slots__ = ("count", "mean", "_m2", "min", "max")
+    
+    def __init__(self):
+        """Initialize empty statistics."""
+        self.count = 0
+        self.mean = 0.0
+        # Sum of squared differences from the mean
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+    
+    def add(self, value: float):
+        """Add one value."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+    
+    def merge(self, other: 'RunningStats'):
+        """Fold in the statistics of another stream."""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+    
+    @property
+    def variance(self) -> float:
+        """Sample variance (0.0 below two values)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    @property
+    def stdev(self) -> float:
+        """Sample standard deviation."""
+        return math.sqrt(self.variance)
+    
+    def to_dict(self) -> Dict:
+        """Get a JSON-ready summary (None for empty statistics)."""
+        if self.count == 0:
+            return {"count": 0, "mean": None, "stdev": None, "min": None, "max": None}
+        return {"count": self.count, "mean": self.mean, "stdev": self.stdev,
+                "min": self.min, "max": self.max}
+    
+    def __getstate__(self):
+        """Pickle as a plain tuple (slots have no __dict__)."""
+        return (self.count, self.mean, self._m2, self.min, self.max)
+    
+    def __setstate__(self, state):
+        """Restore from __getstate__()."""
+        self.count, self.mean, self._m2, self.min, self.max = state
+
+
+class Histogram:
+    """Counts of values in equal-width bins over [low, high), plus the values outside."""
+    
+    def __init__(self, low: float, high: float, bins: int):
+        """
+        Initialize empty bins.
+        
+        Args:
+            low: Lower edge of the first bin
+            high: Upper edge of the last bin
+            bins: Number of bins
+        
+        Raises:
+            ValueError: If the range is empty or bins is less than 1
+        """
+        if high <= low or bins < 1:
+            raise ValueError("Histogram needs low < high and at least one bin")
+        self.low = low
+        self.high = high
+        self.counts = [0] * bins
+        self.below = 0
+        self.above = 0
+        self._width = (high - low) / bins
+    
+    def add(self, value: float):
+        """Count one value."""
+        if value < self.low:
+            self.below += 1
+        elif value >= self.high:
+            self.above += 1
+        else:
+            self.counts[min(int((value - self.low) / self._width), len(self.counts) - 1)] += 1
+    
+    def merge(self, other: 'Histogram'):
+        """
+        Add another histogram's counts.
+        
+        Raises:
+            ValueError: If the bins differ
+        """
+        if (other.low, other.high, len(other.counts)) != (self.low, self.high, len(self.counts)):
+            raise ValueError("Cannot merge histograms with different bins")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.below += other.below
+        self.above += other.above
+    
+    def edges(self) -> List[float]:
+        """Bin edges, from low to high."""
+        return [self.low + i * self._width for i in range(len(self.counts))] + [self.high]
+    
+    def to_dict(self) -> Dict:
+        """Get a JSON-ready copy of the bins and counts."""
+        return {"edges": self.edges(), "counts": list(self.counts),
+                "below": self.below, "above": self.above}
+
+
+class OutcomeAggregator:
+    """
+    Running outcome statistics over many runs of one cast.
+    
+    Tracks run length, survival counts per agent, the turn of each death
+    (Welford statistics and a fixed-bin histogram per agent) and how often
+    each pair ends the run allied. Agents and pairs are added as they first
+    appear. add() and merge() hold a lock, so another thread can read
+    snapshot() while a batch is still being folded in.
+    """
+    
+    def __init__(self, max_turns: int = 50, bins: Optional[int] = None):
+        """
+        Initialize an empty aggregator.
+        
+        Args:
+            max_turns: Turn limit of the runs (the range of the death histograms)
+            bins: Bins per death histogram (one per turn, up to 50, if None)
+        """
+        self.max_turns = max_turns
+        self.bins = bins or min(max_turns, 50)
+        self.runs = 0
+        self.turns = RunningStats()
+        self.survivors = RunningStats()
+        # {agent: runs survived}
+        self.survived: Dict[str, int] = {}
+        # {agent: statistics of the death turn}
+        self.death_turns: Dict[str, RunningStats] = {}
+        self.death_histograms: Dict[str, Histogram] = {}
+        # {(agent1, agent2) in name order: runs ending in that alliance}
+        self.alliances: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+    
+    def _agent(self, name: str):
+        """Make sure an agent has counters (caller holds the lock)."""
+        if name not in self.survived:
+            self.survived[name] = 0
+            self.death_turns[name] = RunningStats()
+            # Deaths happen on turns 1..max_turns
+            self.death_histograms[name] = Histogram(1, self.max_turns + 1, self.bins)
+    
+    def add(self, summary: Dict):
+        """
+        Fold in one run.
+        
+        Args:
+            summary: Run summary with "turns", "survivors", "death_turns" and
+                "alliances" (as returned by run_headless())
+        """
+        with self._lock:
+            self.runs += 1
+            self.turns.add(summary["turns"])
+            self.survivors.add(len(summary["survivors"]))
+            for name in summary["survivors"]:
+                self._agent(name)
+                self.survived[name] += 1
+            for name, turn in summary["death_turns"].items():
+                self._agent(name)
+                self.death_turns[name].add(turn)
+                self.death_histograms[name].add(turn)
+            for pair in summary["alliances"]:
+                key = tuple(sorted(pair))
+                self.alliances[key] = self.alliances.get(key, 0) + 1
+    
+    def add_all(self, summaries: Iterable[Dict]):
+        """Fold in several runs."""
+        for summary in summaries:
+            self.add(summary)
+    
+    def merge(self, other: 'OutcomeAggregator'):
+        """
+        Fold in an aggregator over other runs (e.g. from a worker process).
+        
+        Raises:
+            ValueError: If the death histograms have different bins
+        """
+        with self._lock:
+            self.runs += other.runs
+            self.turns.merge(other.turns)
+            self.survivors.merge(other.survivors)
+            for name, count in other.survived.items():
+                self._agent(name)
+                self.survived[name] += count
+                self.death_turns[name].merge(other.death_turns[name])
+                self.death_histograms[name].merge(other.death_histograms[name])
+            for key, count in other.alliances.items():
+                self.alliances[key] = self.alliances.get(key, 0) + count
+    
+    def snapshot(self) -> Dict:
+        """
+        Get the statistics so far.
+        
+        Returns:
+            Dict with "runs", "turns" and "survivors" (count, mean, stdev,
+            min, max), "survival_rate" and "death_turn" ({agent: statistics
+            plus "histogram"}) per agent, and "alliance_rate" as
+            [agent1, agent2, share of runs] lists, most frequent first
+        """
+        with self._lock:
+            runs = self.runs or 1
+            death_turn = {}
+            for name, stats in self.death_turns.items():
+                death_turn[name] = stats.to_dict()
+                death_turn[name]["histogram"] = self.death_histograms[name].to_dict()
+            return {
+                "runs": self.runs,
+                "turns": self.turns.to_dict(),
+                "survivors": self.survivors.to_dict(),
+                "survival_rate": {name: count / runs for name, count in self.survived.items()},
+                "death_turn": death_turn,
+                "alliance_rate": [
+                    [a, b, count / runs]
+                    for (a, b), count in sorted(self.alliances.items(), key=lambda item: (-item[1], item[0]))
+                ],
+            }
+    
+    def __getstate__(self):
+        """Pickle without the lock, e.g. to return from a worker process."""
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+    
+    def __setstate__(self, state):
+        """Restore from __getstate__() with a new lock."""
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,252 @@
+"""Headless entry point: agents, world, events and simulation without any UI.
+
+Importing this module never loads Flask, so batch workers, tests and
+scripts only pay for the simulation itself. The web UI stays available
+through hamlet_sim.ui.web_ui for callers that actually serve HTTP.
+"""
+
+import itertools
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .agents import (
+    BaseAgent, Hamlet, Claudius, Gertrude, Ophelia, Horatio, Laertes, Polonius
+)
+from .agents.base_agent import ActionType
+from .world import WorldState, RelationshipMatrix, RelationshipHistory
+from .events import Event, EventLog
+from .simulation import SimulationLoop, DecisionEngine
+from .main import create_agents, initialize_relationships
+from .scenario import CompiledScenario, ScenarioError, load_scenario
+from .run_cache import RunCache, run_key
+from .aggregate import OutcomeAggregator
+
+__all__ = [
+    'ActionType', 'BaseAgent',
+    'Hamlet', 'Claudius', 'Gertrude', 'Ophelia', 'Horatio', 'Laertes', 'Polonius',
+    'WorldState', 'RelationshipMatrix', 'RelationshipHistory',
+    'Event', 'EventLog',
+    'SimulationLoop', 'DecisionEngine', 'EnsembleEngine', 'WhatIf',
+    'create_agents', 'initialize_relationships',
+    'CompiledScenario', 'ScenarioError', 'load_scenario',
+    'RunCache', 'OutcomeAggregator',
+    'create_simulation', 'run_headless', 'run_batch', 'aggregate_batch',
+]
+
+
+def create_simulation(scenario: Optional[str] = None, **kwargs) -> SimulationLoop:
+    """
+    Create a quiet simulation with in-memory events.
+    
+    Args:
+        scenario: Optional scenario file (the standard cast if None); the
+            compiled scenario is cached, so repeated calls only clone it
+        **kwargs: Extra SimulationLoop arguments (override the defaults)
+    
+    Returns:
+        SimulationLoop with starting relationships initialized
+    """
+    options = {"event_log": EventLog(log_file=None), "verbose": False}
+    options.update(kwargs)
+    if scenario:
+        world_state = load_scenario(scenario).instantiate()
+        return SimulationLoop(world_state.agents, world_state=world_state, **options)
+    simulation = SimulationLoop(create_agents(), **options)
+    initialize_relationships(simulation.world_state)
+    return simulation
+
+
+def run_headless(
+    seed: Optional[int] = None,
+    max_turns: int = 50,
+    scenario: Optional[str] = None,
+    trace: bool = False
+) -> Dict:
+    """
+    Play one simulation to completion without printing or writing files.
+    
+    Args:
+        seed: Seed for the module RNG (None leaves it as is)
+        max_turns: Turn limit
+        scenario: Optional scenario file (the standard cast if None)
+        trace: If True, include every event in the summary
+    
+    Returns:
+        Run summary: seed, turns played, survivors, turn of each death,
+        final alliances and action counts per agent, plus "events" as
+        [turn, agent, action, target] lists if trace is True
+    """
+    if seed is not None:
+        random.seed(seed)
+    simulation = create_simulation(scenario)
+    world_state = simulation.world_state
+    
+    death_turns: Dict[str, int] = {}
+    action_counts: Dict[str, Dict[str, int]] = {}
+    events: List[list] = []
+    while world_state.turn_number < max_turns:
+        for event in simulation.step():
+            counts = action_counts.setdefault(event.agent.name, {})
+            counts[event.action.value] = counts.get(event.action.value, 0) + 1
+            if trace:
+                events.append([event.turn, event.agent.name, event.action.value,
+                               event.target.name if event.target else None])
+        for agent in world_state.agents:
+            if not agent.state.is_alive and agent.name not in death_turns:
+                death_turns[agent.name] = world_state.turn_number
+        if len(world_state.get_living_agents()) < 2:
+            break
+    
+    summary = {
+        "seed": seed,
+        "turns": world_state.turn_number,
+        "survivors": [agent.name for agent in world_state.get_living_agents()],
+        "death_turns": death_turns,
+        "alliances": [[a1.name, a2.name] for a1, a2 in world_state.get_alliances()],
+        "action_counts": action_counts,
+    }
+    if trace:
+        summary["events"] = events
+    return summary
+
+
+def run_batch(
+    seeds: Iterable[int],
+    max_turns: int = 50,
+    workers: Optional[int] = None,
+    scenario: Optional[str] = None,
+    cache: Optional[RunCache] = None,
+    trace: bool = False
+) -> List[Dict]:
+    """
+    Run one headless simulation per seed on a process pool.
+    
+    Runs found in the cache are not played again, and new results are
+    stored in it; cache.stats() reports the hit rate.
+    
+    Args:
+        seeds: Seeds of the runs
+        max_turns: Turn limit of every run
+        workers: Pool size (defaults to the CPU count; 0 runs in this process)
+        scenario: Optional scenario file shared by every run
+        cache: Result cache (RunCache.from_env() if None, i.e. the
+            HAMLET_RUN_CACHE directory when that is set)
+        trace: If True, include every run's events (see run_headless())
+    
+    Returns:
+        Run summaries in seed order
+    """
+    seeds = list(seeds)
+    if cache is None:
+        cache = RunCache.from_env()
+    results: List[Optional[Dict]] = [None] * len(seeds)
+    keys: List[Optional[str]] = [None] * len(seeds)
+    if cache is not None:
+        for i, seed in enumerate(seeds):
+            if seed is not None:
+                keys[i] = run_key(seed, max_turns, scenario)
+                results[i] = cache.get(keys[i], trace)
+    
+    missing = [i for i, result in enumerate(results) if result is None]
+    todo = [seeds[i] for i in missing]
+    if workers == 0 or not todo:
+        played = [run_headless(seed, max_turns, scenario, trace) for seed in todo]
+    else:
+        # Imported here (it loads multiprocessing) so pool workers importing this module skip it
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            played = list(pool.map(
+                run_headless, todo, [max_turns] * len(todo), [scenario] * len(todo),
+                [trace] * len(todo), chunksize=16
+            ))
+    
+    for i, result in zip(missing, played):
+        results[i] = result
+        if cache is not None and keys[i] is not None:
+            cache.put(keys[i], result)
+    return results
+
+
+def _aggregate_chunk(
+    seeds: List[int],
+    max_turns: int,
+    scenario: Optional[str],
+    aggregator: OutcomeAggregator
+) -> OutcomeAggregator:
+    """Play a chunk of runs in a worker into an empty aggregator and return it."""
+    for seed in seeds:
+        aggregator.add(run_headless(seed, max_turns, scenario))
+    return aggregator
+
+
+def aggregate_batch(
+    seeds: Iterable[int],
+    max_turns: int = 50,
+    workers: Optional[int] = None,
+    scenario: Optional[str] = None,
+    aggregator: Optional[OutcomeAggregator] = None,
+    chunk_size: int = 100,
+    on_progress: Optional[Callable[[OutcomeAggregator], None]] = None
+) -> OutcomeAggregator:
+    """
+    Play one headless simulation per seed and aggregate the outcomes as
+    they finish, without keeping any run's summary.
+    
+    Each task plays `chunk_size` runs into its own OutcomeAggregator and
+    returns it, and it is merged into `aggregator` as soon as it is done.
+    Seeds are consumed lazily and at most two chunks per worker are in
+    flight, so memory stays flat however many seeds are given.
+    
+    Args:
+        seeds: Seeds of the runs (any iterable, e.g. a range of millions)
+        max_turns: Turn limit of every run
+        workers: Pool size (defaults to the CPU count; 0 runs in this process)
+        scenario: Optional scenario file shared by every run
+        aggregator: Aggregator to fold the runs into (a new one if None);
+            another thread may read its snapshot() meanwhile
+        chunk_size: Runs per task
+        on_progress: Called with the aggregator after every merged chunk
+    
+    Returns:
+        The aggregator
+    """
+    if aggregator is None:
+        aggregator = OutcomeAggregator(max_turns)
+    seeds = iter(seeds)
+    chunks = iter(lambda: list(itertools.islice(seeds, chunk_size)), [])
+    
+    def empty() -> OutcomeAggregator:
+        # Same histogram bins as the target, so the chunk merges into it
+        return OutcomeAggregator(aggregator.max_turns, aggregator.bins)
+    
+    if workers == 0:
+        for chunk in chunks:
+            aggregator.merge(_aggregate_chunk(chunk, max_turns, scenario, empty()))
+            if on_progress is not None:
+                on_progress(aggregator)
+        return aggregator
+    
+    from concurrent.futures import ProcessPoolExecutor
+    limit = 2 * (workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for chunk in itertools.chain(chunks, [None]):
+            if chunk is not None:
+                pending.add(pool.submit(_aggregate_chunk, chunk, max_turns, scenario, empty()))
+            while pending and (len(pending) >= limit or chunk is None):
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    aggregator.merge(future.result())
+                    if on_progress is not None:
+                        on_progress(aggregator)
+    return aggregator
+
+
+def __getattr__(name):
+    # Ensembles and what-if forks load on first use, like hamlet_sim.simulation's
+    if name in ('EnsembleEngine', 'WhatIf'):
+        from . import simulation
+        return getattr(simulation, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
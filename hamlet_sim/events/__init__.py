@@ -2,6 +2,8 @@
 
 from .event import Event
 from .event_log import EventLog
+from .event_stats import EventStats
+from .sqlite_sink import SQLiteSink
 
-__all__ = ['Event', 'EventLog']
+__all__ = ['Event', 'EventLog', 'EventStats', 'SQLiteSink']
 
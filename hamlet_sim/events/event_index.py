@@ -0,0 +1,174 @@
+"""Secondary indexes over the in-memory event log."""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+from .event import Event
+
+
+# Evicted entries are dropped from a posting list once they make up half of it
+COMPACT_MIN = 1024
+
+
+class _Posting:
+    """Events sharing one index key, in log order, as parallel lists."""
+    
+    __slots__ = ("seqs", "turns", "events", "start")
+    
+    def __init__(self):
+        """Initialize an empty posting list."""
+        self.seqs: List[int] = []
+        self.turns: List[int] = []
+        self.events: List[Event] = []
+        # Entries before this position belong to evicted events
+        self.start = 0
+    
+    def __len__(self) -> int:
+        """Number of live entries."""
+        return len(self.seqs) - self.start
+    
+    def append(self, seq: int, event: Event):
+        """Add the newest event."""
+        self.seqs.append(seq)
+        self.turns.append(event.turn)
+        self.events.append(event)
+    
+    def drop_oldest(self):
+        """Mark the oldest entry as evicted, compacting the lists now and then."""
+        self.start += 1
+        if self.start >= COMPACT_MIN and self.start * 2 >= len(self.seqs):
+            del self.seqs[:self.start]
+            del self.turns[:self.start]
+            del self.events[:self.start]
+            self.start = 0
+
+
+class EventIndex:
+    """
+    Posting lists of events by agent, target, action and agent x action.
+    
+    Every event gets a sequence number and is appended to the posting lists
+    of its keys. Events arrive in turn order, so each list is sorted by both
+    sequence number and turn: a turn range is two binary searches, and a
+    query walks only the list of its most selective key. Evicted events are
+    dropped from the front of their lists in amortized O(1).
+    """
+    
+    def __init__(self):
+        """Initialize empty indexes."""
+        self._postings: Dict[Tuple, _Posting] = {}
+        self._next_seq = 0
+        self._last_turn: Optional[int] = None
+        # False once an event arrives with a turn older than its predecessor
+        self._turn_ordered = True
+    
+    @staticmethod
+    def _keys(event: Event) -> List[Tuple]:
+        """Index keys of an event."""
+        agent = event.agent.name
+        action = event.action.value
+        keys = [("all",), ("agent", agent), ("action", action), ("agent_action", agent, action)]
+        if event.target is not None:
+            keys.append(("target", event.target.name))
+        return keys
+    
+    def add(self, event: Event) -> int:
+        """
+        Index an appended event.
+        
+        Args:
+            event: Event appended to the log
+        
+        Returns:
+            The event's sequence number
+        """
+        seq = self._next_seq
+        self._next_seq += 1
+        if self._last_turn is not None and event.turn < self._last_turn:
+            self._turn_ordered = False
+        self._last_turn = event.turn
+        for key in self._keys(event):
+            posting = self._postings.get(key)
+            if posting is None:
+                posting = self._postings[key] = _Posting()
+            posting.append(seq, event)
+        return seq
+    
+    def evict(self, event: Event):
+        """
+        Forget the oldest indexed event.
+        
+        Args:
+            event: The event being dropped from the front of the log
+        """
+        for key in self._keys(event):
+            posting = self._postings[key]
+            posting.drop_oldest()
+            if not posting:
+                del self._postings[key]
+    
+    def query(
+        self,
+        agent: Optional[str] = None,
+        target: Optional[str] = None,
+        action: Optional[str] = None,
+        start_turn: Optional[int] = None,
+        end_turn: Optional[int] = None,
+        limit: int = 100,
+        cursor: Optional[int] = None
+    ) -> Tuple[List[Event], Optional[int]]:
+        """
+        Find events matching every given filter, oldest first.
+        
+        Args:
+            agent: Acting agent's name
+            target: Target agent's name
+            action: Action value
+            start_turn: First turn to include
+            end_turn: Last turn to include
+            limit: Maximum number of events returned
+            cursor: Cursor returned by the previous page
+        
+        Returns:
+            Tuple of (events, cursor for the next page or None if done)
+        """
+        candidates = [("target", target)] if target is not None else []
+        if agent is not None and action is not None:
+            candidates.append(("agent_action", agent, action))
+        elif agent is not None:
+            candidates.append(("agent", agent))
+        elif action is not None:
+            candidates.append(("action", action))
+        if not candidates:
+            candidates.append(("all",))
+        
+        postings = [self._postings.get(key) for key in candidates]
+        if any(posting is None for posting in postings):
+            return [], None
+        posting = min(postings, key=len)
+        
+        lo, hi = posting.start, len(posting.seqs)
+        if cursor is not None:
+            lo = max(lo, bisect_right(posting.seqs, cursor, lo, hi))
+        if self._turn_ordered:
+            if start_turn is not None:
+                lo = max(lo, bisect_left(posting.turns, start_turn, lo, hi))
+            if end_turn is not None:
+                hi = bisect_right(posting.turns, end_turn, lo, hi)
+        
+        results = []
+        for i in range(lo, hi):
+            event = posting.events[i]
+            if start_turn is not None and event.turn < start_turn:
+                continue
+            if end_turn is not None and event.turn > end_turn:
+                continue
+            if agent is not None and event.agent.name != agent:
+                continue
+            if action is not None and event.action.value != action:
+                continue
+            if target is not None and (event.target is None or event.target.name != target):
+                continue
+            results.append(event)
+            if len(results) >= limit:
+                return results, posting.seqs[i] if i + 1 < hi else None
+        return results, None
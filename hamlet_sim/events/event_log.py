@@ -1,26 +1,188 @@
 """Event logging system for the simulation."""
 
-from typing import List
+from collections import deque
+from itertools import islice
+from typing import Deque, Iterator, List, NamedTuple, Optional, Tuple
 from .event import Event
+from .event_stats import EventStats
+from .event_index import EventIndex
+import gzip
 import os
+import shutil
+
+
+LOG_TITLE = "=== HAMLET SIMULATION LOG ==="
+
+
+class LogPosition(NamedTuple):
+    """A point in the log that survives rotation (see EventLog.tell())."""
+    # Generation of the file the point is in; every rotation starts a new one
+    generation: int
+    # Byte offset within that file
+    offset: int
+
+
+def log_header(generation: int) -> str:
+    """Header line of a log file, which records its generation."""
+    return f"{LOG_TITLE} segment {generation}\n\n"
+
+
+def read_generation(path: str) -> int:
+    """Generation of a live log file or compressed segment (0 if it has none)."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, 'rt') as f:
+        words = f.readline()[len(LOG_TITLE):].split()
+    if len(words) == 2 and words[0] == "segment" and words[1].isdigit():
+        return int(words[1])
+    return 0
+
+
+def segment_path(log_file: str, index: int) -> str:
+    """Path of a rotated segment; 1 is the most recent one."""
+    return f"{log_file}.{index}.gz"
+
+
+def iter_log_lines(log_file: str) -> Iterator[str]:
+    """
+    Iterate over every logged event line, oldest first.
+    
+    Reads the gzip-compressed rotated segments from oldest to newest, then
+    the live file, streaming each one and skipping the file headers.
+    
+    Args:
+        log_file: Path of the live log file
+        
+    Yields:
+        Event lines without their trailing newline
+    """
+    index = 1
+    while os.path.exists(segment_path(log_file, index)):
+        index += 1
+    paths = [segment_path(log_file, i) for i in range(index - 1, 0, -1)]
+    if os.path.exists(log_file):
+        paths.append(log_file)
+    
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, 'rt') as f:
+            for line in f:
+                line = line.rstrip("\n")
+                if line and not line.startswith(LOG_TITLE):
+                    yield line
 
 
 class EventLog:
     """Manages event logging to file and memory."""
     
-    def __init__(self, log_file: str = "history.log"):
+    def __init__(
+        self,
+        log_file: Optional[str] = "history.log",
+        max_bytes: Optional[int] = None,
+        turns_per_segment: Optional[int] = None,
+        retention: int = 5,
+        append: bool = False,
+        max_events: Optional[int] = None
+    ):
         """
         Initialize event log.
         
         Args:
-            log_file: Path to the log file
+            log_file: Path to the log file (None keeps events in memory only)
+            max_bytes: Rotate the file once it reaches this size
+            turns_per_segment: Rotate the file after this many turns
+            retention: Number of compressed segments to keep
+            append: If True, keep existing history instead of truncating it
+            max_events: Number of events kept in memory (all if None); the
+                statistics keep counting evicted events
         """
         self.log_file = log_file
-        self.events: List[Event] = []
+        self.events: Deque[Event] = deque(maxlen=max_events)
+        self.stats = EventStats()
+        self.index = EventIndex()
+        self._sinks = []
+        self.max_bytes = max_bytes
+        self.turns_per_segment = turns_per_segment
+        self.retention = retention
+        self._size = 0
+        # Generation of the live file (see LogPosition)
+        self.generation = 0
+        self._segment_first_turn: Optional[int] = None
+        self._last_turn: Optional[int] = None
+        
+        if self.log_file is None:
+            return
         
-        # Clear or create log file
+        if append and os.path.exists(self.log_file):
+            self._size = os.path.getsize(self.log_file)
+            self.generation = read_generation(self.log_file)
+        elif os.path.exists(self.log_file):
+            # Clear the log file; generations keep increasing over any
+            # segments left beside it
+            self._start_file(read_generation(self.log_file) + 1)
+        else:
+            self._start_file(0)
+    
+    def _start_file(self, generation: int):
+        """Create an empty live log file."""
+        header = log_header(generation)
         with open(self.log_file, 'w') as f:
-            f.write("=== HAMLET SIMULATION LOG ===\n\n")
+            f.write(header)
+        self._size = len(header)
+        self.generation = generation
+        self._segment_first_turn = None
+    
+    def tell(self) -> Optional[LogPosition]:
+        """Current end of the log, or None without a file."""
+        if self.log_file is None:
+            return None
+        return LogPosition(self.generation, self._size)
+    
+    def truncate(self, position: LogPosition):
+        """
+        Cut the log back to an earlier tell() position, e.g. to drop events
+        logged after the checkpoint a simulation resumes from.
+        
+        Segments rotated out after the position are deleted, and the one
+        holding it becomes the live file again. If retention has already
+        deleted that segment, the newer ones are deleted all the same and
+        logging restarts in a fresh file. Does nothing if the log is older
+        than the position.
+        """
+        if self.log_file is None or not os.path.exists(self.log_file):
+            return
+        if self.generation < position.generation:
+            return
+        
+        if self.generation > position.generation:
+            # Newest first: drop segments newer than the position and find
+            # the one holding it; older ones move up to fill the gap
+            index = 1
+            while os.path.exists(segment_path(self.log_file, index)):
+                path = segment_path(self.log_file, index)
+                generation = read_generation(path)
+                if generation < position.generation:
+                    break
+                if generation == position.generation:
+                    with gzip.open(path, 'rb') as src, open(self.log_file, 'wb') as dst:
+                        shutil.copyfileobj(src, dst, 1 << 16)
+                    self.generation = generation
+                os.remove(path)
+                index += 1
+            shift = index - 1
+            while os.path.exists(segment_path(self.log_file, index)):
+                os.replace(segment_path(self.log_file, index), segment_path(self.log_file, index - shift))
+                index += 1
+            if self.generation != position.generation:
+                self._start_file(position.generation + 1)
+                self._last_turn = None
+                return
+            self._size = os.path.getsize(self.log_file)
+        
+        if self._size > position.offset:
+            with open(self.log_file, 'r+b') as f:
+                f.truncate(position.offset)
+            self._size = position.offset
+        self._last_turn = None
     
     def add_event(self, event: Event):
         """
@@ -29,19 +191,147 @@ class EventLog:
         Args:
             event: Event to add
         """
+        if self.events.maxlen is not None and len(self.events) == self.events.maxlen:
+            self.index.evict(self.events[0])
         self.events.append(event)
+        self.index.add(event)
+        self.stats.record(event)
+        for sink in self._sinks:
+            sink.write_event(event)
         
         # Append to file
-        with open(self.log_file, 'a') as f:
-            f.write(event.to_string() + "\n")
+        if self.log_file is not None:
+            if event.turn != self._last_turn:
+                # Segments only ever end on a turn boundary
+                if self._should_rotate(event.turn):
+                    self.rotate()
+                if self._segment_first_turn is None:
+                    self._segment_first_turn = event.turn
+                self._last_turn = event.turn
+            
+            # Counted in bytes, so tell() positions can be truncated to
+            line = (event.to_string() + "\n").encode()
+            with open(self.log_file, 'ab') as f:
+                f.write(line)
+            self._size += len(line)
+    
+    def add_sink(self, sink):
+        """
+        Forward events and end-of-turn world states to an exporter.
+        
+        Args:
+            sink: Object with write_event(event), write_snapshot(world_state,
+                rng_state) and close() methods (e.g. SQLiteSink)
+        """
+        self._sinks.append(sink)
+    
+    def end_turn(self, world_state, rng_state: Optional[tuple] = None):
+        """
+        Pass the world at the end of a turn to every sink.
+        
+        Args:
+            world_state: World at the end of the turn
+            rng_state: getstate() of the simulation's RNG after the turn
+                (None: the module RNG's)
+        """
+        for sink in self._sinks:
+            sink.write_snapshot(world_state, rng_state)
+    
+    def close(self):
+        """Close every sink."""
+        for sink in self._sinks:
+            sink.close()
+    
+    def _should_rotate(self, turn: int) -> bool:
+        """Check whether the live file is due for rotation before `turn`."""
+        if self.max_bytes is not None and self._size >= self.max_bytes:
+            return True
+        if self.turns_per_segment is not None and self._segment_first_turn is not None:
+            return turn - self._segment_first_turn >= self.turns_per_segment
+        return False
+    
+    def rotate(self):
+        """
+        Compress the live file into segment 1 and start a new one.
+        
+        Older segments shift up by one; those beyond the retention count are
+        deleted. Compression streams the file in chunks.
+        """
+        if self.log_file is None:
+            return
+        
+        oldest = segment_path(self.log_file, self.retention + 1)
+        index = self.retention
+        while index >= 1:
+            path = segment_path(self.log_file, index)
+            if os.path.exists(path):
+                os.replace(path, segment_path(self.log_file, index + 1))
+            index -= 1
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for stale in range(self.retention + 2, self.retention + 64):
+            # Segments left over from a larger retention setting
+            path = segment_path(self.log_file, stale)
+            if not os.path.exists(path):
+                break
+            os.remove(path)
+        
+        if self.retention > 0 and os.path.exists(self.log_file):
+            target = segment_path(self.log_file, 1)
+            partial = target + ".tmp"
+            with open(self.log_file, 'rb') as src, gzip.open(partial, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1 << 16)
+            os.replace(partial, target)
+        
+        self._start_file(self.generation + 1)
+    
+    def iter_history(self) -> Iterator[str]:
+        """Iterate over all logged lines on disk, including rotated segments."""
+        if self.log_file is None:
+            return iter(())
+        return iter_log_lines(self.log_file)
+    
+    def query(
+        self,
+        agent: Optional[str] = None,
+        target: Optional[str] = None,
+        action: Optional[str] = None,
+        start_turn: Optional[int] = None,
+        end_turn: Optional[int] = None,
+        limit: int = 100,
+        cursor: Optional[int] = None
+    ) -> Tuple[List[Event], Optional[int]]:
+        """
+        Find retained events by agent, target, action and turn range.
+        
+        The cost is proportional to the page returned (plus any events of
+        the most selective filter that fail the other filters), not to the
+        size of the log.
+        
+        Args:
+            agent: Acting agent's name
+            target: Target agent's name
+            action: Action value
+            start_turn: First turn to include
+            end_turn: Last turn to include
+            limit: Maximum number of events returned
+            cursor: Cursor returned with the previous page
+        
+        Returns:
+            Tuple of (events oldest first, cursor for the next page or None)
+        """
+        return self.index.query(agent, target, action, start_turn, end_turn, limit, cursor)
     
     def get_events_for_turn(self, turn: int) -> List[Event]:
         """Get all events for a specific turn."""
-        return [e for e in self.events if e.turn == turn]
+        events, _ = self.index.query(start_turn=turn, end_turn=turn, limit=len(self.events) or 1)
+        return events
     
     def get_recent_events(self, count: int = 10) -> List[Event]:
         """Get the most recent N events."""
-        return self.events[-count:] if len(self.events) > count else self.events
+        recent = list(islice(reversed(self.events), max(count, 0)))
+        recent.reverse()
+        return recent
     
     def get_summary_for_turn(self, turn: int) -> str:
         """Generate a summary string for a turn."""
@@ -0,0 +1,130 @@
+"""Running counters over the event stream."""
+
+from typing import Dict, Optional, Tuple
+from .event import Event
+
+
+# Number of most recent turns whose per-turn totals are kept
+TURN_WINDOW = 1000
+
+
+class EventStats:
+    """
+    Counts events by agent, action and target as they are logged.
+    
+    Every counter is updated in O(1) per event and read in O(1), and none
+    of them refers to the events themselves, so the statistics cover the
+    whole run even when the event log only retains its most recent events.
+    Per-turn totals are the exception: only the last `turn_window` turns
+    are kept, so a long run does not grow them without bound.
+    """
+    
+    def __init__(self, turn_window: int = TURN_WINDOW):
+        """
+        Initialize empty counters.
+        
+        Args:
+            turn_window: Number of most recent turns whose totals are kept
+        """
+        self.turn_window = turn_window
+        self.total = 0
+        # {agent: {action: count}}
+        self.by_agent_action: Dict[str, Dict[str, int]] = {}
+        # {agent: {target: count}}
+        self.by_agent_target: Dict[str, Dict[str, int]] = {}
+        # {(agent, action, target): count}
+        self.by_pair_action: Dict[Tuple[str, str, Optional[str]], int] = {}
+        # {turn: {action: count}} of the last turn_window turns, oldest first
+        self.by_turn: Dict[int, Dict[str, int]] = {}
+        # {action: count}
+        self.by_action: Dict[str, int] = {}
+    
+    def record(self, event: Event):
+        """
+        Count one event.
+        
+        Args:
+            event: Event being logged
+        """
+        agent = event.agent.name
+        action = event.action.value
+        target = event.target.name if event.target else None
+        
+        self.total += 1
+        self.by_action[action] = self.by_action.get(action, 0) + 1
+        
+        actions = self.by_agent_action.setdefault(agent, {})
+        actions[action] = actions.get(action, 0) + 1
+        
+        if target is not None:
+            targets = self.by_agent_target.setdefault(agent, {})
+            targets[target] = targets.get(target, 0) + 1
+        
+        key = (agent, action, target)
+        self.by_pair_action[key] = self.by_pair_action.get(key, 0) + 1
+        
+        totals = self.by_turn.get(event.turn)
+        if totals is None:
+            totals = self.by_turn[event.turn] = {}
+            while len(self.by_turn) > self.turn_window:
+                del self.by_turn[next(iter(self.by_turn))]
+        totals[action] = totals.get(action, 0) + 1
+    
+    def count(self, agent: str, action: Optional[str] = None, target: Optional[str] = None) -> int:
+        """
+        Number of events by an agent, optionally of one action and/or at one target.
+        
+        Args:
+            agent: Acting agent's name
+            action: Action value (any action if None)
+            target: Target agent's name (any target if None)
+        
+        Returns:
+            Matching event count
+        """
+        if action is not None and target is not None:
+            return self.by_pair_action.get((agent, action, target), 0)
+        if action is not None:
+            return self.by_agent_action.get(agent, {}).get(action, 0)
+        if target is not None:
+            return self.by_agent_target.get(agent, {}).get(target, 0)
+        return sum(self.by_agent_action.get(agent, {}).values())
+    
+    def action_mix(self, agent: str) -> Dict[str, int]:
+        """Action counts of one agent."""
+        return dict(self.by_agent_action.get(agent, {}))
+    
+    def turn_totals(self, turn: int) -> Dict[str, int]:
+        """Action counts of one turn (empty once it left the window)."""
+        return dict(self.by_turn.get(turn, {}))
+    
+    def turn_range(self, start: Optional[int] = None, end: Optional[int] = None) -> Dict[int, Dict[str, int]]:
+        """
+        Action counts of the kept turns in a range.
+        
+        Args:
+            start: First turn (oldest kept if None)
+            end: Last turn, inclusive (latest if None)
+        
+        Returns:
+            {turn: {action: count}}, at most turn_window turns
+        """
+        return {
+            turn: dict(counts) for turn, counts in self.by_turn.items()
+            if (start is None or turn >= start) and (end is None or turn <= end)
+        }
+    
+    def to_dict(self) -> Dict:
+        """
+        Convert the aggregate counters to a JSON-friendly dictionary.
+        
+        Per-turn totals are left out (see turn_totals() and turn_range());
+        "turns" gives the first and last turn they are kept for.
+        """
+        return {
+            "total": self.total,
+            "by_action": dict(self.by_action),
+            "by_agent_action": {a: dict(c) for a, c in self.by_agent_action.items()},
+            "by_agent_target": {a: dict(c) for a, c in self.by_agent_target.items()},
+            "turns": [next(iter(self.by_turn)), next(reversed(self.by_turn))] if self.by_turn else None,
+        }
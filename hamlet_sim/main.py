@@ -1,10 +1,22 @@
 """Main entry point for the Hamlet simulation game."""
 
+import random
+from typing import Optional
 from .agents import (
     Hamlet, Claudius, Gertrude, Ophelia, Horatio, Laertes, Polonius
 )
 from .simulation import SimulationLoop
-from .ui import CLIUI, WebUI
+from .events import EventLog
+from .world import RelationshipHistory, LocationMap
+from .scenario import load_scenario
+
+
+# Log rotation used when the history is kept across restarts
+LOG_SEGMENT_BYTES = 10 * 1024 * 1024
+LOG_RETENTION = 5
+
+# Turns between checkpoints when checkpointing is enabled
+CHECKPOINT_EVERY = 10
 
 
 def create_agents():
@@ -89,34 +101,102 @@ def initialize_relationships(world_state):
         matrix.set_relationship_value(ophelia, hamlet, "trust", 0.4)
 
 
-def main(web_mode: bool = False, port: int = 8001):
+def main(
+    web_mode: bool = False,
+    port: int = 8001,
+    record_history: bool = False,
+    scenario: Optional[str] = None,
+    keep_log: bool = False,
+    checkpoint_dir: Optional[str] = None,
+    locations: bool = False
+):
     """
     Main entry point.
     
     Args:
         web_mode: If True, run web interface; if False, run CLI
         port: Port for web server (only used in web mode)
+        record_history: If True, record relationship values every turn
+        scenario: Optional path to a scenario file (uses the built-in cast if None)
+        keep_log: If True, append to the existing history.log and rotate it
+            into compressed segments instead of truncating it on start
+        checkpoint_dir: If set, checkpoint the simulation there every
+            CHECKPOINT_EVERY turns and resume from the newest checkpoint on
+            start (the scenario is then ignored and the log kept)
+        locations: If True, spread the agents over the rooms of Elsinore so
+            they only interact within a room (a resumed checkpoint keeps
+            its own map)
     """
     print("Initializing Hamlet Simulation...")
     
-    # Create agents
-    agents = create_agents()
-    print(f"Created {len(agents)} agents: {', '.join([a.name for a in agents])}")
+    history = RelationshipHistory() if record_history else None
+    checkpoint = None
+    if checkpoint_dir:
+        # Checkpointing is imported here so the headless core never loads it
+        from .simulation.checkpoint import load_checkpoint
+        checkpoint = load_checkpoint(checkpoint_dir)
+    if keep_log or checkpoint:
+        event_log = EventLog(max_bytes=LOG_SEGMENT_BYTES, retention=LOG_RETENTION, append=True)
+    else:
+        event_log = EventLog()
     
-    # Create simulation
-    simulation = SimulationLoop(agents, auto_mode=False)
+    if checkpoint:
+        # Continue exactly where the checkpointed simulation was
+        world_state = checkpoint.world_state
+        random.setstate(checkpoint.rng_state)
+        if checkpoint.log_position is not None:
+            event_log.truncate(checkpoint.log_position)
+        simulation = SimulationLoop(
+            world_state.agents, event_log=event_log, auto_mode=False,
+            relationship_history=history, world_state=world_state
+        )
+        print(f"Resumed from checkpoint at turn {world_state.turn_number}")
+    elif scenario:
+        # Build the world from the compiled scenario
+        compiled = load_scenario(scenario)
+        world_state = compiled.instantiate()
+        agents = world_state.agents
+        print(f"Loaded scenario '{compiled.name}' with {len(agents)} agents")
+        simulation = SimulationLoop(
+            agents, event_log=event_log, auto_mode=False,
+            relationship_history=history, world_state=world_state
+        )
+    else:
+        # Create agents
+        agents = create_agents()
+        print(f"Created {len(agents)} agents: {', '.join([a.name for a in agents])}")
+        
+        # Create simulation
+        simulation = SimulationLoop(
+            agents, event_log=event_log, auto_mode=False, relationship_history=history
+        )
+        
+        # Initialize relationships
+        initialize_relationships(simulation.world_state)
+        print("Initialized relationships between characters.")
+    
+    if locations and not checkpoint:
+        simulation.world_state.locations = LocationMap.for_population(simulation.world_state.agents)
+        print(f"Spread agents over {len(simulation.world_state.locations.rooms)} rooms.")
     
-    # Initialize relationships
-    initialize_relationships(simulation.world_state)
-    print("Initialized relationships between characters.")
+    if checkpoint_dir:
+        from .simulation.checkpoint import Checkpointer
+        event_log.add_sink(Checkpointer(checkpoint_dir, every=CHECKPOINT_EVERY, event_log=event_log))
     
     # Create UI and run
-    if web_mode:
-        ui = WebUI(simulation, port=port)
-        ui.run()
-    else:
-        ui = CLIUI(simulation)
-        ui.run_interactive()
+    # UIs are imported here so headless users of this module never load Flask
+    try:
+        if web_mode:
+            from .ui.web_ui import WebUI
+            ui = WebUI(simulation, port=port)
+            ui.run()
+        else:
+            from .ui.cli_ui import CLIUI
+            ui = CLIUI(simulation)
+            ui.run_interactive()
+    finally:
+        # Flushes sinks (e.g. a final checkpoint)
+        event_log.close()
 
 
 if __name__ == "__main__":
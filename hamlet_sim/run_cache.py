@@ -0,0 +1,238 @@
+"""Content-addressed on-disk cache of headless run summaries.
+
+A headless run is a pure function of the engine code, the scenario, the
+seed and the turn limit, so its summary can be reused instead of replayed.
+Entries are keyed by a SHA-256 over exactly those inputs:
+    
+    engine      hash of the simulation's source files (everything in the
+                package but the UI), so any change to the rules misses
+    scenario    hash of the scenario file's bytes (None for the standard cast)
+    seed, max_turns
+
+Each entry is one gzip-compressed JSON file named after its key. The cache
+is bounded in bytes and evicts the least recently used entries; use is
+tracked by file modification time, so the order survives restarts.
+
+Runs without a seed are never cached. Set HAMLET_RUN_CACHE to a directory
+to give run_batch() a cache without passing one.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from . import __version__
+
+# Bump when the entry layout changes
+CACHE_FORMAT = 1
+
+# Environment variable naming the default cache directory
+CACHE_ENV = "HAMLET_RUN_CACHE"
+
+SUFFIX = ".json.gz"
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Hash of the engine sources, computed once per process
+_engine_hash: Optional[str] = None
+
+
+def engine_version() -> str:
+    """
+    Identify the simulation code: the package version plus a hash of every
+    source file outside the UI.
+    
+    Returns:
+        "<version>+<first 16 hex digits of the hash>"
+    """
+    global _engine_hash
+    if _engine_hash is None:
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(_PACKAGE_DIR):
+            dirs[:] = sorted(d for d in dirs if d not in ("ui", "__pycache__"))
+            for name in sorted(files):
+                if name.endswith(".py"):
+                    path = os.path.join(root, name)
+                    digest.update(os.path.relpath(path, _PACKAGE_DIR).encode())
+                    with open(path, "rb") as f:
+                        digest.update(f.read())
+        _engine_hash = digest.hexdigest()[:16]
+    return f"{__version__}+{_engine_hash}"
+
+
+def scenario_digest(scenario: Optional[str]) -> Optional[str]:
+    """Hash a scenario file's contents (None for the standard cast)."""
+    if not scenario:
+        return None
+    with open(scenario, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def run_key(seed: int, max_turns: int, scenario: Optional[str] = None) -> str:
+    """
+    Compute the cache key of a headless run.
+    
+    Args:
+        seed: Seed of the run
+        max_turns: Turn limit
+        scenario: Optional scenario file (the standard cast if None)
+    
+    Returns:
+        Hex SHA-256 of the engine version, scenario contents, seed and turn limit
+    """
+    inputs = {
+        "format": CACHE_FORMAT,
+        "engine": engine_version(),
+        "scenario": scenario_digest(scenario),
+        "seed": seed,
+        "max_turns": max_turns,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+class RunCache:
+    """
+    Size-bounded LRU cache of run summaries in a directory.
+    
+    The index of entries (oldest use first) is rebuilt from the directory
+    when the cache is opened. Writes go through a temporary file and an
+    atomic rename, so readers in other processes never see a partial entry.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Open or create a cache.
+        
+        Args:
+            directory: Directory holding the entries (created if missing)
+            max_bytes: Total size of the entries kept; least recently used
+                entries are evicted beyond it
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # {key: size in bytes}, least recently used first
+        self._index: 'OrderedDict[str, int]' = OrderedDict()
+        self._bytes = 0
+        entries = []
+        for name in os.listdir(directory):
+            if name.endswith(SUFFIX):
+                try:
+                    stat = os.stat(os.path.join(directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, name[:-len(SUFFIX)], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+    
+    @classmethod
+    def from_env(cls) -> Optional['RunCache']:
+        """Open the cache named by HAMLET_RUN_CACHE, or None if it is unset."""
+        directory = os.environ.get(CACHE_ENV)
+        return cls(directory) if directory else None
+    
+    def __len__(self) -> int:
+        """Number of entries."""
+        return len(self._index)
+    
+    @property
+    def size_bytes(self) -> int:
+        """Total size of the entries."""
+        return self._bytes
+    
+    def hit_rate(self) -> float:
+        """Share of lookups answered from the cache so far."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    
+    def stats(self) -> Dict:
+        """Get lookup and size counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "entries": len(self._index),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+        }
+    
+    def _path(self, key: str) -> str:
+        """Path of an entry's file."""
+        return os.path.join(self.directory, key + SUFFIX)
+    
+    def get(self, key: str, trace: bool = False) -> Optional[Dict]:
+        """
+        Look up a run summary and mark it as recently used.
+        
+        Args:
+            key: Key from run_key()
+            trace: If True, only a summary with its event trace counts as a hit
+        
+        Returns:
+            The summary (without "events" unless trace is True), or None
+        """
+        summary = None
+        if key in self._index:
+            path = self._path(key)
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    summary = json.load(f)
+                os.utime(path)
+            except (OSError, ValueError):
+                # Evicted by another process, or damaged
+                self._drop(key)
+                summary = None
+        if summary is None or (trace and "events" not in summary):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._index.move_to_end(key)
+        if not trace:
+            summary.pop("events", None)
+        return summary
+    
+    def put(self, key: str, summary: Dict):
+        """
+        Store a run summary, then evict old entries beyond max_bytes.
+        
+        Args:
+            key: Key from run_key()
+            summary: JSON-serializable run summary (with an optional "events" trace)
+        """
+        data = gzip.compress(json.dumps(summary, separators=(",", ":")).encode(), compresslevel=6)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._bytes += len(data) - self._index.pop(key, 0)
+        self._index[key] = len(data)
+        while self._bytes > self.max_bytes and len(self._index) > 1:
+            oldest = next(iter(self._index))
+            self._drop(oldest)
+            self.evictions += 1
+    
+    def _drop(self, key: str):
+        """Forget an entry and delete its file."""
+        self._bytes -= self._index.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+    
+    def clear(self):
+        """Delete every entry."""
+        for key in list(self._index):
+            self._drop(key)
@@ -0,0 +1,259 @@
+"""Declarative scenario files compiled into reusable initial worlds.
+
+A scenario file (JSON, or TOML on Python 3.11+) lists the cast and the
+starting relationships:
+    
+    {
+      "name": "Hamlet",
+      "agents": [
+        {"archetype": "Hamlet"},
+        {"archetype": "Polonius", "name": "Polonius", "paranoia": 0.8},
+        {"archetype": "Horatio", "name": "Guard", "count": 20}
+      ],
+      "relationships": [
+        {"from": "Hamlet", "to": "Horatio", "trust": 0.9, "love": 0.8}
+      ]
+    }
+
+Agent entries may override name, aggression, loyalty, paranoia, goals,
+mood and suspicion_level; "count" creates numbered copies ("Guard 1" ...).
+Relationship entries set any of the five channels for one directed pair.
+
+A file is validated once and compiled into a CompiledScenario: flat arrays
+of traits, starting states and relationship values. The first world built
+from it expands the arrays into a template matrix; every later world is a
+plain copy of that template, with no per-pair setup calls.
+"""
+
+import json
+import os
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from .agents import ARCHETYPES, BaseAgent
+from .world.world_state import WorldState
+from .world.relationship_matrix import RelationshipMatrix, CHANNELS, DEFAULT_RELATIONSHIP
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+
+# Scenario bundled with the package
+DEFAULT_SCENARIO = os.path.join(os.path.dirname(__file__), "scenarios", "hamlet.json")
+
+TRAITS = ("aggression", "loyalty", "paranoia")
+STATE_FIELDS = ("mood", "suspicion_level")
+AGENT_KEYS = {"archetype", "name", "count", "goals"} | set(TRAITS) | set(STATE_FIELDS)
+
+# {absolute path: ((mtime_ns, size), CompiledScenario)}
+_cache: Dict[str, Tuple[Tuple[int, int], 'CompiledScenario']] = {}
+
+
+class ScenarioError(ValueError):
+    """Raised when a scenario file is malformed."""
+
+
+class CompiledScenario:
+    """A validated scenario stored as flat arrays, ready to be instantiated."""
+    
+    def __init__(
+        self,
+        name: str,
+        names: List[str],
+        archetypes: List[type],
+        goals: List[List[str]],
+        traits: array,
+        states: array,
+        relationships: array
+    ):
+        """
+        Initialize a compiled scenario.
+        
+        Args:
+            name: Scenario name
+            names: Agent names
+            archetypes: Agent class of each agent
+            goals: Goal list of each agent
+            traits: N x 3 array of aggression, loyalty, paranoia
+            states: N x 2 array of starting mood and suspicion level
+            relationships: N x N x 5 array of starting relationship values
+        """
+        self.name = name
+        self.names = names
+        self.archetypes = archetypes
+        self.goals = goals
+        self.traits = traits
+        self.states = states
+        self.relationships = relationships
+        # Matrix built from the arrays on first use; later worlds copy it
+        self._template: Optional[RelationshipMatrix] = None
+    
+    def create_agents(self) -> List[BaseAgent]:
+        """Create fresh agents with the scenario's traits and starting state."""
+        agents = []
+        for i, (name, cls) in enumerate(zip(self.names, self.archetypes)):
+            agent = cls()
+            agent.name = name
+            agent.aggression, agent.loyalty, agent.paranoia = self.traits[i * 3:i * 3 + 3]
+            agent.goals = list(self.goals[i])
+            agent.state.mood, agent.state.suspicion_level = self.states[i * 2:i * 2 + 2]
+            agents.append(agent)
+        return agents
+    
+    def instantiate(self) -> WorldState:
+        """
+        Create a new world in the scenario's initial state.
+        
+        Returns:
+            WorldState with fresh agents and starting relationships
+        """
+        if self._template is None:
+            self._template = RelationshipMatrix.from_dense(self.names, self.relationships)
+        return WorldState(self.create_agents(), relationship_matrix=self._template.copy())
+
+
+def parse_scenario(data: Dict, name: str = "scenario") -> CompiledScenario:
+    """
+    Validate parsed scenario data and compile it.
+    
+    Args:
+        data: Parsed JSON/TOML content
+        name: Fallback scenario name
+    
+    Returns:
+        The compiled scenario
+    
+    Raises:
+        ScenarioError: If the data does not describe a valid scenario
+    """
+    if not isinstance(data, dict):
+        raise ScenarioError("Scenario must be an object")
+    entries = data.get("agents")
+    if not isinstance(entries, list) or not entries:
+        raise ScenarioError("Scenario needs a non-empty 'agents' list")
+    
+    names, archetypes, goals = [], [], []
+    traits, states = array('d'), array('d')
+    for position, entry in enumerate(entries):
+        where = f"agents[{position}]"
+        if not isinstance(entry, dict):
+            raise ScenarioError(f"{where} must be an object")
+        unknown = set(entry) - AGENT_KEYS
+        if unknown:
+            raise ScenarioError(f"{where}: unknown keys {sorted(unknown)}")
+        cls = ARCHETYPES.get(entry.get("archetype"))
+        if cls is None:
+            raise ScenarioError(
+                f"{where}: archetype must be one of {sorted(ARCHETYPES)}"
+            )
+        count = entry.get("count", 1)
+        if not isinstance(count, int) or count < 1:
+            raise ScenarioError(f"{where}: count must be a positive integer")
+        prototype = cls()
+        base_name = entry.get("name", prototype.name)
+        if not isinstance(base_name, str) or not base_name:
+            raise ScenarioError(f"{where}: name must be a non-empty string")
+        agent_goals = entry.get("goals", prototype.goals)
+        if not isinstance(agent_goals, list) or not all(isinstance(g, str) for g in agent_goals):
+            raise ScenarioError(f"{where}: goals must be a list of strings")
+        
+        values = []
+        for key in TRAITS + STATE_FIELDS:
+            value = entry.get(key, getattr(prototype, key, None))
+            if value is None:
+                value = getattr(prototype.state, key)
+            values.append(_unit_value(value, f"{where}.{key}"))
+        
+        for copy in range(count):
+            names.append(base_name if count == 1 else f"{base_name} {copy + 1}")
+            archetypes.append(cls)
+            goals.append(list(agent_goals))
+            traits.extend(values[:3])
+            states.extend(values[3:])
+    
+    index = {}
+    for i, agent_name in enumerate(names):
+        if agent_name in index:
+            raise ScenarioError(f"Duplicate agent name: {agent_name}")
+        index[agent_name] = i
+    
+    n = len(names)
+    width = len(CHANNELS)
+    relationships = array('d', [DEFAULT_RELATIONSHIP[c] for c in CHANNELS]) * (n * n)
+    for position, entry in enumerate(data.get("relationships", [])):
+        where = f"relationships[{position}]"
+        if not isinstance(entry, dict):
+            raise ScenarioError(f"{where} must be an object")
+        source, target = entry.get("from"), entry.get("to")
+        if source not in index or target not in index:
+            raise ScenarioError(f"{where}: 'from' and 'to' must name scenario agents")
+        if source == target:
+            raise ScenarioError(f"{where}: an agent has no relationship with itself")
+        base = (index[source] * n + index[target]) * width
+        for key, value in entry.items():
+            if key in ("from", "to"):
+                continue
+            if key not in DEFAULT_RELATIONSHIP:
+                raise ScenarioError(f"{where}: unknown channel '{key}'")
+            relationships[base + CHANNELS.index(key)] = _unit_value(value, f"{where}.{key}")
+    
+    return CompiledScenario(
+        name=data.get("name", name),
+        names=names,
+        archetypes=archetypes,
+        goals=goals,
+        traits=traits,
+        states=states,
+        relationships=relationships,
+    )
+
+
+def _unit_value(value, where: str) -> float:
+    """Check that a value is a number in [0, 1]."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ScenarioError(f"{where} must be a number")
+    if not 0.0 <= value <= 1.0:
+        raise ScenarioError(f"{where} must be between 0 and 1")
+    return float(value)
+
+
+def load_scenario(path: Optional[str] = None) -> CompiledScenario:
+    """
+    Load and compile a scenario file, reusing the compiled result while the
+    file is unchanged.
+    
+    Args:
+        path: Path to a .json or .toml scenario (defaults to the bundled one)
+    
+    Returns:
+        The compiled scenario
+    
+    Raises:
+        ScenarioError: If the file cannot be parsed or is invalid
+    """
+    path = os.path.abspath(path or DEFAULT_SCENARIO)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    
+    try:
+        if path.endswith(".toml"):
+            if tomllib is None:
+                raise ScenarioError("TOML scenarios need Python 3.11 or newer")
+            with open(path, "rb") as f:
+                data = tomllib.load(f)
+        else:
+            with open(path) as f:
+                data = json.load(f)
+    except (ValueError, OSError) as e:
+        if isinstance(e, ScenarioError):
+            raise
+        raise ScenarioError(f"Could not read scenario {path}: {e}") from e
+    
+    compiled = parse_scenario(data, name=os.path.splitext(os.path.basename(path))[0])
+    _cache[path] = (signature, compiled)
+    return compiled
@@ -1,7 +1,29 @@
 """Simulation module for Hamlet simulation game."""
 
+from importlib import import_module
+
 from .simulation_loop import SimulationLoop
 from .decision_engine import DecisionEngine
 
-__all__ = ['SimulationLoop', 'DecisionEngine']
+__all__ = ['SimulationLoop', 'DecisionEngine', 'EnsembleEngine', 'WhatIf', 'RolloutPlanner',
+           'Checkpointer', 'CheckpointError', 'load_checkpoint', 'Scheduler', 'ScheduledRun',
+           'TurnPipeline']
+
+# Optional subsystems load on first use, keeping `import hamlet_sim.simulation` to the loop
+_LAZY = {
+    'EnsembleEngine': '.ensemble',
+    'WhatIf': '.branching',
+    'RolloutPlanner': '.planner',
+    'Checkpointer': '.checkpoint',
+    'CheckpointError': '.checkpoint',
+    'load_checkpoint': '.checkpoint',
+    'Scheduler': '.scheduler',
+    'ScheduledRun': '.scheduler',
+    'TurnPipeline': '.pipeline',
+}
+
 
+def __getattr__(name):
+    if name in _LAZY:
+        return getattr(import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,205 @@
+"""What-if experiments: many continuations of a forked world, with and without an intervention."""
+
+import random
+from concurrent.futures import Executor, Future
+from typing import Dict, Iterable, List, Optional, Sequence
+from ..world.world_state import WorldState
+from ..events.event_log import EventLog
+from .simulation_loop import SimulationLoop, SEQUENTIAL
+
+
+def play_branches(
+    world_state: WorldState,
+    seeds: Sequence[int],
+    turns: int,
+    kill: Iterable[str] = (),
+    turn_mode: str = SEQUENTIAL
+) -> List[Dict]:
+    """
+    Play one continuation per seed, each on its own fork of the world.
+    
+    Args:
+        world_state: World to branch from (left unchanged)
+        seeds: Seeds of the module RNG, one per branch
+        turns: Turns to play in each branch
+        kill: Names of agents who die at the branch point
+        turn_mode: Turn mode of the branches
+    
+    Returns:
+        Per-branch summaries: seed, turns played, survivors and the turn
+        of each death
+    """
+    kill = list(kill)
+    results = []
+    for seed in seeds:
+        random.seed(seed)
+        world = world_state.fork()
+        for name in kill:
+            agent = world.get_agent_by_name(name)
+            agent.state.health = 0.0
+            agent.state.is_alive = False
+            if world.locations is not None:
+                world.locations.remove(agent)
+        simulation = SimulationLoop(
+            world.agents, event_log=EventLog(log_file=None), verbose=False,
+            world_state=world, turn_mode=turn_mode
+        )
+        start = world.turn_number
+        alive = {agent.name for agent in world.get_living_agents()}
+        death_turns: Dict[str, int] = {}
+        while world.turn_number < start + turns and len(alive) >= 2:
+            simulation.step()
+            for agent in world.agents:
+                if agent.name in alive and not agent.state.is_alive:
+                    alive.discard(agent.name)
+                    death_turns[agent.name] = world.turn_number
+        results.append({
+            "seed": seed,
+            "turns": world.turn_number - start,
+            "survivors": [agent.name for agent in world.agents if agent.name in alive],
+            "death_turns": death_turns,
+        })
+    return results
+
+
+def summarize_branches(results: List[Dict], names: Sequence[str]) -> Dict:
+    """
+    Aggregate branch summaries into outcome distributions.
+    
+    Args:
+        results: Summaries returned by play_branches()
+        names: Agent names to report
+    
+    Returns:
+        Dict with "branches", "mean_turns", "mean_survivors" and
+        "survival_rate" ({name: share of branches the agent survived})
+    """
+    count = len(results) or 1
+    survived = {name: 0 for name in names}
+    for result in results:
+        for name in result["survivors"]:
+            if name in survived:
+                survived[name] += 1
+    return {
+        "branches": len(results),
+        "mean_turns": sum(r["turns"] for r in results) / count,
+        "mean_survivors": sum(len(r["survivors"]) for r in results) / count,
+        "survival_rate": {name: n / count for name, n in survived.items()},
+    }
+
+
+class WhatIf:
+    """
+    Compare continuations of the current world with and without an intervention.
+    
+    The world is forked copy-on-write when the experiment is created, so
+    the live simulation can keep playing while the branches run. Both lines
+    use the same seeds, so each intervention branch is paired with a
+    main-line branch that saw the same random numbers.
+    """
+    
+    def __init__(
+        self,
+        world_state: WorldState,
+        kill: Iterable[str],
+        branches: int = 100,
+        turns: int = 20,
+        seed: Optional[int] = None,
+        turn_mode: str = SEQUENTIAL
+    ):
+        """
+        Fork the world and prepare the experiment.
+        
+        Args:
+            world_state: Live world (fork it between turns)
+            kill: Names of agents who die at the branch point
+            branches: Continuations per line
+            turns: Turns per continuation
+            seed: Seed of the first branch (random if None)
+            turn_mode: Turn mode of the branches
+        
+        Raises:
+            ValueError: If an agent to kill is unknown or already dead
+        """
+        self.kill = list(kill)
+        for name in self.kill:
+            agent = world_state.get_agent_by_name(name)
+            if agent is None:
+                raise ValueError(f"Unknown agent: {name}")
+            if not agent.state.is_alive:
+                raise ValueError(f"{name} is already dead")
+        self.world_state = world_state.fork()
+        self.turn = self.world_state.turn_number
+        self.branches = branches
+        self.turns = turns
+        self.turn_mode = turn_mode
+        first = seed if seed is not None else random.randrange(2 ** 31)
+        self.seeds = [first + i for i in range(branches)]
+        self._futures: Dict[str, List[Future]] = {}
+    
+    def submit(self, executor: Executor, chunk_size: int = 10) -> 'WhatIf':
+        """
+        Queue both lines on an executor in chunks of branches.
+        
+        Args:
+            executor: Thread or process pool
+            chunk_size: Branches per task
+        
+        Returns:
+            self
+        """
+        chunks = [self.seeds[i:i + chunk_size] for i in range(0, len(self.seeds), chunk_size)]
+        for line, kill in (("main_line", []), ("what_if", self.kill)):
+            self._futures[line] = [
+                executor.submit(play_branches, self.world_state, chunk, self.turns, kill, self.turn_mode)
+                for chunk in chunks
+            ]
+        return self
+    
+    def progress(self) -> float:
+        """Share of submitted tasks that finished (0.0 before submit())."""
+        futures = [future for line in self._futures.values() for future in line]
+        if not futures:
+            return 0.0
+        return sum(future.done() for future in futures) / len(futures)
+    
+    def done(self) -> bool:
+        """Check whether every submitted task finished."""
+        return bool(self._futures) and self.progress() == 1.0
+    
+    def result(self) -> Dict:
+        """
+        Get the comparison, waiting for the branches (or playing them here
+        if the experiment was never submitted).
+        
+        Returns:
+            Dict with the branch point ("turn", "kill", "branches", "turns"),
+            the outcome distributions of "main_line" and "what_if" (see
+            summarize_branches()), and "survival_change" per agent
+        """
+        if self._futures:
+            lines = {
+                line: [result for future in futures for result in future.result()]
+                for line, futures in self._futures.items()
+            }
+        else:
+            lines = {
+                line: play_branches(self.world_state, self.seeds, self.turns, kill, self.turn_mode)
+                for line, kill in (("main_line", []), ("what_if", self.kill))
+            }
+        
+        names = [agent.name for agent in self.world_state.agents]
+        main_line = summarize_branches(lines["main_line"], names)
+        what_if = summarize_branches(lines["what_if"], names)
+        return {
+            "turn": self.turn,
+            "kill": self.kill,
+            "branches": self.branches,
+            "turns": self.turns,
+            "main_line": main_line,
+            "what_if": what_if,
+            "survival_change": {
+                name: what_if["survival_rate"][name] - main_line["survival_rate"][name]
+                for name in names
+            },
+        }
@@ -0,0 +1,648 @@
+"""Durable, incremental checkpoints of a running simulation.
+
+A checkpoint directory holds numbered files. A full checkpoint stores the
+whole world, and each delta after it only stores what changed since the
+previous checkpoint:
+
+- agent states that differ;
+- memories that stored something new;
+- relationship cells written since (from the matrix change tracker);
+- room placements.
+
+Every file also records the turn, the state of the simulation's RNG and
+the position in the event log (file generation and offset), so a resumed
+simulation continues exactly where the checkpointed one was. Files are
+written to a temporary name, synced and renamed, so a crash never leaves a
+partial checkpoint behind.
+Loading takes the newest full checkpoint and applies the deltas after it.
+
+File layout: the MAGIC bytes, then the format version (u16), kind (u8) and
+sequence number (u32), then the zlib-compressed body. Numbers are
+little-endian. Relationship values are stored as doubles, so a resumed
+world is bit-for-bit the checkpointed one.
+"""
+
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from ..agents import ARCHETYPES
+from ..agents.base_agent import BaseAgent
+from ..agents.memory import AgentMemory, Memory, KINDS
+from ..events.event_log import LogPosition
+from ..world.world_state import WorldState
+from ..world.relationship_matrix import RelationshipMatrix, CHANNELS
+from ..world.locations import LocationMap
+
+
+MAGIC = b"HAMLETCK"
+VERSION = 2
+
+# Checkpoint kinds, and their file suffixes
+FULL = 0
+DELTA = 1
+SUFFIXES = {FULL: ".full.ckpt", DELTA: ".delta.ckpt"}
+
+_HEADER = struct.Struct("<8sHBI")
+_KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+# Arrays are stored little-endian
+_SWAP = sys.byteorder == "big"
+
+
+class CheckpointError(Exception):
+    """Raised when a checkpoint cannot be read."""
+
+
+class Checkpoint(NamedTuple):
+    """A simulation restored by load_checkpoint()."""
+    world_state: WorldState
+    rng_state: tuple
+    # EventLog.tell() at the checkpoint (None if the log had no file)
+    log_position: Optional[LogPosition]
+    sequence: int
+
+
+class _Writer:
+    """Builds a checkpoint body."""
+    
+    def __init__(self):
+        self._parts: List[bytes] = []
+    
+    def pack(self, fmt: str, *values):
+        self._parts.append(struct.pack("<" + fmt, *values))
+    
+    def text(self, value: str):
+        data = value.encode()
+        self.pack("I", len(data))
+        self._parts.append(data)
+    
+    def texts(self, values: Sequence[str]):
+        self.pack("I", len(values))
+        for value in values:
+            self.text(value)
+    
+    def array(self, typecode: str, values):
+        if not isinstance(values, array) or _SWAP:
+            values = array(typecode, values)
+        if _SWAP:
+            values.byteswap()
+        self.pack("I", len(values))
+        self._parts.append(values.tobytes())
+    
+    def getvalue(self) -> bytes:
+        return b"".join(self._parts)
+
+
+class _Reader:
+    """Reads a checkpoint body written by _Writer."""
+    
+    def __init__(self, data: bytes):
+        self._data = memoryview(data)
+        self._position = 0
+    
+    def unpack(self, fmt: str) -> tuple:
+        fmt = "<" + fmt
+        values = struct.unpack_from(fmt, self._data, self._position)
+        self._position += struct.calcsize(fmt)
+        return values
+    
+    def text(self) -> str:
+        (size,) = self.unpack("I")
+        value = bytes(self._data[self._position:self._position + size]).decode()
+        self._position += size
+        return value
+    
+    def texts(self) -> List[str]:
+        (count,) = self.unpack("I")
+        return [self.text() for _ in range(count)]
+    
+    def array(self, typecode: str) -> array:
+        (count,) = self.unpack("I")
+        values = array(typecode)
+        end = self._position + count * values.itemsize
+        values.frombytes(self._data[self._position:end])
+        self._position = end
+        if _SWAP:
+            values.byteswap()
+        return values
+
+
+def _agent_row(agent: BaseAgent) -> Tuple[float, float, float, int]:
+    """An agent's state as stored: (mood, health, suspicion_level, flags)."""
+    state = agent.state
+    return (state.mood, state.health, state.suspicion_level,
+            int(state.is_alive) | int(state.is_hidden) << 1)
+
+
+def _write_states(writer: _Writer, rows: List[Tuple[int, Tuple]]):
+    """Agent states: [(agent index, _agent_row())]."""
+    writer.array('i', [index for index, _ in rows])
+    writer.array('d', [value for _, row in rows for value in row[:3]])
+    writer.array('B', [row[3] for _, row in rows])
+
+
+def _read_states(reader: _Reader, agents: List[BaseAgent]):
+    indices = reader.array('i')
+    values = reader.array('d')
+    flags = reader.array('B')
+    for position, index in enumerate(indices):
+        state = agents[index].state
+        state.mood, state.health, state.suspicion_level = values[position * 3:position * 3 + 3]
+        state.is_alive = bool(flags[position] & 1)
+        state.is_hidden = bool(flags[position] & 2)
+
+
+def _write_memories(writer: _Writer, memories: List[Tuple[int, AgentMemory]]):
+    """Agent memories: [(agent index, memory)], with their own name table."""
+    names: Dict[str, int] = {}
+    records = [(index, memory.capacity, memory.records()) for index, memory in memories]
+    for _, _, stored in records:
+        for record in stored:
+            names.setdefault(record.actor, len(names))
+            names.setdefault(record.subject, len(names))
+    writer.texts(list(names))
+    writer.array('i', [index for index, _, _ in records])
+    writer.array('i', [capacity for _, capacity, _ in records])
+    writer.array('i', [len(stored) for _, _, stored in records])
+    flat = [record for _, _, stored in records for record in stored]
+    writer.array('i', [record.turn for record in flat])
+    writer.array('B', [_KIND_CODES[record.kind] for record in flat])
+    writer.array('f', [record.importance for record in flat])
+    writer.array('i', [names[record.actor] for record in flat])
+    writer.array('i', [names[record.subject] for record in flat])
+
+
+def _read_memories(reader: _Reader, agents: List[BaseAgent]):
+    names = reader.texts()
+    indices = reader.array('i')
+    capacities = reader.array('i')
+    sizes = reader.array('i')
+    turns = reader.array('i')
+    kinds = reader.array('B')
+    importance = reader.array('f')
+    actors = reader.array('i')
+    subjects = reader.array('i')
+    start = 0
+    for index, capacity, size in zip(indices, capacities, sizes):
+        records = [
+            Memory(turns[i], KINDS[kinds[i]], names[actors[i]], names[subjects[i]], importance[i])
+            for i in range(start, start + size)
+        ]
+        agents[index].memory = AgentMemory.from_records(capacity, records)
+        start += size
+
+
+def _write_cells(writer: _Writer, cells: Iterable[Tuple[str, str, Sequence[float]]], positions: Dict[str, int]):
+    """Relationship cells: (name1, name2, values in CHANNELS order)."""
+    rows, columns, values = array('i'), array('i'), array('d')
+    for name1, name2, cell in cells:
+        rows.append(positions[name1])
+        columns.append(positions[name2])
+        values.extend(cell)
+    writer.array('i', rows)
+    writer.array('i', columns)
+    writer.array('d', values)
+
+
+def _read_cells(reader: _Reader, names: List[str]) -> Iterator[Tuple[str, str, Sequence[float]]]:
+    rows = reader.array('i')
+    columns = reader.array('i')
+    values = reader.array('d')
+    width = len(CHANNELS)
+    for i, (row, column) in enumerate(zip(rows, columns)):
+        yield names[row], names[column], values[i * width:(i + 1) * width]
+
+
+def _placements(locations: LocationMap, positions: Dict[str, int]) -> List[List[int]]:
+    """Agent indices in every room, in occupant order."""
+    return [[positions[name] for name in occupants] for occupants in locations._occupants.values()]
+
+
+def _write_placements(writer: _Writer, placements: List[List[int]]):
+    writer.array('i', [len(room) for room in placements])
+    writer.array('i', [index for room in placements for index in room])
+
+
+def _read_locations(
+    reader: _Reader,
+    rooms: Dict[str, Sequence[str]],
+    move_chance: float,
+    agents: List[BaseAgent]
+) -> LocationMap:
+    counts = reader.array('i')
+    indices = reader.array('i')
+    locations = LocationMap(rooms, move_chance)
+    start = 0
+    for room, count in zip(rooms, counts):
+        for index in indices[start:start + count]:
+            locations.place(agents[index], room)
+        start += count
+    return locations
+
+
+def _write_common(writer: _Writer, turn: int, rng_state: tuple, log_position: Optional[LogPosition]):
+    """Turn, RNG state and event log position."""
+    version, internal, gauss = rng_state
+    writer.pack("IB", turn, version)
+    writer.array('I', internal)
+    generation, offset = log_position if log_position is not None else (0, -1)
+    writer.pack("?dIq", gauss is not None, gauss or 0.0, generation, offset)
+
+
+def _read_common(reader: _Reader) -> Tuple[int, tuple, Optional[LogPosition]]:
+    turn, version = reader.unpack("IB")
+    internal = tuple(reader.array('I'))
+    has_gauss, gauss, generation, offset = reader.unpack("?dIq")
+    rng_state = (version, internal, gauss if has_gauss else None)
+    return turn, rng_state, (None if offset < 0 else LogPosition(generation, offset))
+
+
+class _Capture(NamedTuple):
+    """What the simulation thread hands to the writer thread."""
+    kind: int
+    sequence: int
+    turn: int
+    rng_state: tuple
+    log_position: Optional[LogPosition]
+    # Full checkpoints: a copy-on-write fork of the world
+    world: Optional[WorldState]
+    # Deltas: changed agent states, changed memories, written cells, placements
+    states: List[Tuple[int, Tuple]]
+    memories: List[Tuple[int, AgentMemory]]
+    cells: Dict[Tuple[str, str], Tuple[float, ...]]
+    placements: Optional[List[List[int]]]
+
+
+def _encode_full(capture: _Capture) -> bytes:
+    """Body of a full checkpoint."""
+    world = capture.world
+    agents = world.agents
+    positions = {agent.name: i for i, agent in enumerate(agents)}
+    writer = _Writer()
+    _write_common(writer, capture.turn, capture.rng_state, capture.log_position)
+    
+    writer.texts([type(agent).__name__ for agent in agents])
+    writer.texts([agent.name for agent in agents])
+    writer.array('d', [value for agent in agents
+                       for value in (agent.aggression, agent.loyalty, agent.paranoia)])
+    writer.array('i', [len(agent.goals) for agent in agents])
+    writer.texts([goal for agent in agents for goal in agent.goals])
+    
+    _write_states(writer, [(i, _agent_row(agent)) for i, agent in enumerate(agents)])
+    _write_memories(writer, list(enumerate(agent.memory for agent in agents)))
+    _write_cells(writer, world.relationship_matrix.iter_cells(), positions)
+    
+    locations = world.locations
+    writer.pack("?", locations is not None)
+    if locations is not None:
+        writer.pack("d", locations.move_chance)
+        writer.texts(list(locations.rooms))
+        writer.array('i', [len(adjacent) for adjacent in locations.rooms.values()])
+        writer.texts([room for adjacent in locations.rooms.values() for room in adjacent])
+        _write_placements(writer, _placements(locations, positions))
+    return writer.getvalue()
+
+
+def _encode_delta(capture: _Capture, positions: Dict[str, int]) -> bytes:
+    """Body of a delta checkpoint."""
+    writer = _Writer()
+    _write_common(writer, capture.turn, capture.rng_state, capture.log_position)
+    _write_states(writer, capture.states)
+    _write_memories(writer, capture.memories)
+    _write_cells(writer, ((name1, name2, values) for (name1, name2), values in capture.cells.items()), positions)
+    writer.pack("?", capture.placements is not None)
+    if capture.placements is not None:
+        _write_placements(writer, capture.placements)
+    return writer.getvalue()
+
+
+def _decode_full(reader: _Reader) -> Tuple[WorldState, tuple, Optional[int]]:
+    turn, rng_state, log_position = _read_common(reader)
+    classes = reader.texts()
+    names = reader.texts()
+    traits = reader.array('d')
+    goal_counts = reader.array('i')
+    goals = reader.texts()
+    agents = []
+    start = 0
+    for i, (class_name, name) in enumerate(zip(classes, names)):
+        cls = ARCHETYPES.get(class_name)
+        if cls is None:
+            raise CheckpointError(f"Unknown agent class: {class_name}")
+        agent = cls()
+        agent.name = name
+        agent.aggression, agent.loyalty, agent.paranoia = traits[i * 3:i * 3 + 3]
+        agent.goals = goals[start:start + goal_counts[i]]
+        start += goal_counts[i]
+        agents.append(agent)
+    
+    _read_states(reader, agents)
+    _read_memories(reader, agents)
+    world = WorldState(agents, RelationshipMatrix.from_cells(_read_cells(reader, names)))
+    world.turn_number = turn
+    
+    (has_locations,) = reader.unpack("?")
+    if has_locations:
+        (move_chance,) = reader.unpack("d")
+        rooms = reader.texts()
+        adjacent_counts = reader.array('i')
+        adjacent = reader.texts()
+        room_map = {}
+        start = 0
+        for room, count in zip(rooms, adjacent_counts):
+            room_map[room] = adjacent[start:start + count]
+            start += count
+        world.locations = _read_locations(reader, room_map, move_chance, agents)
+    return world, rng_state, log_position
+
+
+def _apply_delta(reader: _Reader, world: WorldState) -> Tuple[tuple, Optional[int]]:
+    turn, rng_state, log_position = _read_common(reader)
+    agents = world.agents
+    _read_states(reader, agents)
+    _read_memories(reader, agents)
+    world.relationship_matrix.set_cells({
+        (name1, name2): values
+        for name1, name2, values in _read_cells(reader, [agent.name for agent in agents])
+    })
+    world.turn_number = turn
+    (has_locations,) = reader.unpack("?")
+    if has_locations:
+        old = world.locations
+        world.locations = _read_locations(reader, old.rooms, old.move_chance, agents)
+    return rng_state, log_position
+
+
+def _read_file(path: str) -> Tuple[int, int, _Reader]:
+    """Read and check a checkpoint file: (kind, sequence, body reader)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < _HEADER.size:
+        raise CheckpointError(f"{path}: truncated")
+    magic, version, kind, sequence = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or kind not in SUFFIXES:
+        raise CheckpointError(f"{path}: not a version {VERSION} checkpoint")
+    try:
+        body = zlib.decompress(data[_HEADER.size:])
+    except zlib.error as e:
+        raise CheckpointError(f"{path}: {e}") from e
+    return kind, sequence, _Reader(body)
+
+
+def _list_files(directory: str) -> List[Tuple[int, int, str]]:
+    """Checkpoint files in a directory: [(sequence, kind, path)], oldest first."""
+    files = []
+    for name in os.listdir(directory):
+        for kind, suffix in SUFFIXES.items():
+            stem = name[:-len(suffix)]
+            if name.endswith(suffix) and stem.isdigit():
+                files.append((int(stem), kind, os.path.join(directory, name)))
+    files.sort()
+    return files
+
+
+def load_checkpoint(directory: str) -> Optional[Checkpoint]:
+    """
+    Restore the newest checkpoint in a directory.
+    
+    Loads the newest full checkpoint, then applies the consecutive deltas
+    after it. Agents get their archetype's default policy back.
+    
+    Args:
+        directory: Checkpoint directory
+    
+    Returns:
+        The restored simulation, or None if the directory holds no checkpoint
+    
+    Raises:
+        CheckpointError: If the newest full checkpoint is unreadable
+    """
+    if not os.path.isdir(directory):
+        return None
+    files = _list_files(directory)
+    fulls = [entry for entry in files if entry[1] == FULL]
+    if not fulls:
+        return None
+    sequence, _, path = fulls[-1]
+    _, _, reader = _read_file(path)
+    world, rng_state, log_position = _decode_full(reader)
+    for next_sequence, kind, path in files:
+        if next_sequence <= sequence or kind != DELTA:
+            continue
+        if next_sequence != sequence + 1:
+            break
+        rng_state, log_position = _apply_delta(_read_file(path)[2], world)
+        sequence = next_sequence
+    return Checkpoint(world, rng_state, log_position, sequence)
+
+
+class Checkpointer:
+    """
+    Event log sink that checkpoints the simulation every few turns.
+    
+    Attach it with EventLog.add_sink(). At the end of every `every`-th turn
+    the simulation thread only captures what the checkpoint needs:
+    
+    - a full checkpoint takes a copy-on-write fork of the world;
+    - a delta takes the changed agent states, the memories that changed
+      (shared copy-on-write) and the cells written since the last
+      checkpoint.
+    
+    A background thread then encodes, compresses and durably writes the
+    file. If the previous file is still being written, the checkpoint waits
+    for the next turn end, and changes keep accumulating until then.
+    """
+    
+    def __init__(
+        self,
+        directory: str,
+        every: int = 10,
+        full_every: int = 20,
+        event_log=None,
+        level: int = 1
+    ):
+        """
+        Initialize the checkpointer, continuing any checkpoints in the directory.
+        
+        Args:
+            directory: Checkpoint directory (created if missing)
+            every: Turns between checkpoints
+            full_every: Deltas written before the next full checkpoint
+            event_log: Event log whose file position is recorded (for
+                EventLog.truncate() on resume)
+            level: zlib compression level
+        """
+        self.directory = directory
+        self.every = every
+        self.full_every = full_every
+        self.event_log = event_log
+        self.level = level
+        os.makedirs(directory, exist_ok=True)
+        files = _list_files(directory)
+        self._sequence = files[-1][0] + 1 if files else 0
+        # The first checkpoint is always full
+        self._deltas = full_every
+        self._world: Optional[WorldState] = None
+        # RNG state that came with the last world seen
+        self._rng_state: Optional[tuple] = None
+        self._last_turn: Optional[int] = None
+        self._due = False
+        self._matrix = None
+        self._tracker = None
+        self._states: List[Tuple] = []
+        self._versions: List[int] = []
+        self._positions: Dict[str, int] = {}
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hamlet-checkpoint")
+        self._future: Optional[Future] = None
+        # Timings of the last checkpoint: capture on the simulation thread,
+        # and encoding plus writing on the background thread
+        self.last_kind: Optional[int] = None
+        self.last_capture_seconds = 0.0
+        self.last_write_seconds = 0.0
+        self.last_bytes = 0
+    
+    def write_event(self, event):
+        """Events are recorded by the event log itself."""
+    
+    def write_snapshot(self, world_state: WorldState, rng_state: Optional[tuple] = None):
+        """Checkpoint at the end of every `every`-th turn."""
+        self._world = world_state
+        self._rng_state = rng_state
+        turn = world_state.turn_number
+        if self._due or self._last_turn is None or turn - self._last_turn >= self.every:
+            self.checkpoint(world_state, rng_state=rng_state)
+    
+    def checkpoint(
+        self,
+        world_state: WorldState,
+        wait: bool = False,
+        rng_state: Optional[tuple] = None
+    ) -> bool:
+        """
+        Checkpoint the world now (between turns).
+        
+        Args:
+            world_state: World to checkpoint
+            wait: If True, wait for a write in progress, and for this one
+            rng_state: State of the RNG the simulation continues with (the
+                module RNG's if None)
+        
+        Returns:
+            True if a checkpoint was started, False if one is still being
+            written (it is retried at the next turn end)
+        
+        Raises:
+            OSError: If writing the previous checkpoint failed
+        """
+        if self._future is not None:
+            if not self._future.done() and not wait:
+                self._due = True
+                return False
+            self._future.result()
+        self._due = False
+        
+        start = time.perf_counter()
+        matrix = world_state.relationship_matrix
+        agents = world_state.agents
+        full = (
+            self._deltas >= self.full_every
+            or matrix is not self._matrix
+            or len(agents) != len(self._states)
+            or 2 * len(self._tracker) > matrix.cell_count()
+        )
+        if full and matrix is not self._matrix:
+            if self._matrix is not None:
+                self._matrix.untrack_changes(self._tracker)
+            self._matrix = matrix
+            self._tracker = matrix.track_changes()
+        self._positions = {agent.name: i for i, agent in enumerate(agents)}
+        
+        # What the next delta is compared with
+        rows = [_agent_row(agent) for agent in agents]
+        versions = [agent.memory.version for agent in agents]
+        states = [(i, row) for i, row in enumerate(rows) if full or row != self._states[i]]
+        memories = [
+            (i, agents[i].memory.fork())
+            for i, version in enumerate(versions) if not full and version != self._versions[i]
+        ]
+        self._states = rows
+        self._versions = versions
+        
+        log_position = self.event_log.tell() if self.event_log is not None else None
+        if rng_state is None:
+            rng_state = random.getstate()
+        if full:
+            capture = _Capture(FULL, self._sequence, world_state.turn_number, rng_state,
+                               log_position, world_state.fork(), [], [], {}, None)
+            self._deltas = 0
+        else:
+            locations = world_state.locations
+            capture = _Capture(
+                DELTA, self._sequence, world_state.turn_number, rng_state, log_position,
+                None, states, memories, matrix.get_cells(self._tracker),
+                _placements(locations, self._positions) if locations is not None else None
+            )
+            self._deltas += 1
+        self._tracker.clear()
+        self._sequence += 1
+        self._last_turn = world_state.turn_number
+        self.last_capture_seconds = time.perf_counter() - start
+        
+        self._future = self._pool.submit(self._write, capture, dict(self._positions))
+        if wait:
+            self._future.result()
+        return True
+    
+    def _write(self, capture: _Capture, positions: Dict[str, int]):
+        """Encode and durably write a checkpoint (background thread)."""
+        start = time.perf_counter()
+        if capture.kind == FULL:
+            body = _encode_full(capture)
+        else:
+            body = _encode_delta(capture, positions)
+        data = _HEADER.pack(MAGIC, VERSION, capture.kind, capture.sequence) + zlib.compress(body, self.level)
+        
+        path = os.path.join(self.directory, f"{capture.sequence:08d}{SUFFIXES[capture.kind]}")
+        partial = path + ".tmp"
+        with open(partial, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial, path)
+        self._sync_directory()
+        
+        if capture.kind == FULL:
+            # Everything before the new full checkpoint is obsolete
+            for sequence, _, old in _list_files(self.directory):
+                if sequence < capture.sequence:
+                    os.remove(old)
+        self.last_kind = capture.kind
+        self.last_bytes = len(data)
+        self.last_write_seconds = time.perf_counter() - start
+    
+    def _sync_directory(self):
+        """Make the rename durable (where directories can be synced)."""
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    def flush(self):
+        """Wait until the checkpoint being written is on disk."""
+        if self._future is not None:
+            self._future.result()
+    
+    def close(self):
+        """Checkpoint the last turn seen if it is not saved yet, then stop the writer."""
+        if self._world is not None and self._world.turn_number != self._last_turn:
+            self.checkpoint(self._world, wait=True, rng_state=self._rng_state)
+        self.flush()
+        self._pool.shutdown(wait=True)
@@ -1,23 +1,160 @@
 """Decision engine for processing agent actions and their consequences."""
 
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
 from ..agents.base_agent import BaseAgent, ActionType
 from ..world.world_state import WorldState
+from ..world.relationship_matrix import CHANNELS
+from ..agents.memory import AgentMemory
+from ..world.factions import ALLIANCE_THRESHOLD
 from ..events.event import Event
 import random
 
 
+# Direction of a relationship effect
+FORWARD = "forward"  # agent's feelings toward target
+REVERSE = "reverse"  # target's feelings toward agent
+
+# Relationship effects of each action: (direction, channel deltas, chance).
+# An effect with a chance only happens if its roll succeeds (e.g. a spy being
+# discovered); rolls are drawn in table order.
+ACTION_EFFECTS = {
+    # Talking increases trust slightly
+    ActionType.TALK_TO: [
+        (FORWARD, {"trust": 0.1, "love": 0.05}, None),
+        (REVERSE, {"trust": 0.05}, None),
+    ],
+    # Spying increases suspicion if discovered (30% chance of discovery)
+    ActionType.SPY_ON: [
+        (REVERSE, {"suspicion": 0.2, "trust": -0.1}, 0.3),
+        (FORWARD, {"suspicion": 0.1}, None),
+    ],
+    # Betrayal severely damages relationships
+    ActionType.BETRAY: [
+        (FORWARD, {"trust": -0.3, "love": -0.2}, None),
+        (REVERSE, {"trust": -0.4, "suspicion": 0.3, "fear": 0.2}, None),
+    ],
+    # Accusation increases suspicion and fear
+    ActionType.ACCUSE: [
+        (FORWARD, {"suspicion": 0.2}, None),
+        (REVERSE, {"suspicion": 0.15, "fear": 0.1, "trust": -0.1}, None),
+    ],
+    # Defense increases trust and love
+    ActionType.DEFEND: [
+        (FORWARD, {"trust": 0.15, "love": 0.1}, None),
+        (REVERSE, {"trust": 0.2, "love": 0.15}, None),
+    ],
+    # Attack severely damages relationships
+    ActionType.ATTACK: [
+        (FORWARD, {"suspicion": 0.3, "fear": 0.1}, None),
+        (REVERSE, {"suspicion": 0.3, "fear": 0.3, "trust": -0.3}, None),
+    ],
+    # Scheming increases suspicion (20% chance of discovery)
+    ActionType.SCHEME: [
+        (FORWARD, {"suspicion": 0.15}, None),
+        (REVERSE, {"suspicion": 0.1, "trust": -0.1}, 0.2),
+    ],
+}
+
+# Attacks may cause health damage
+INJURY_CHANCE = 0.3
+INJURY_DAMAGE = 0.2
+
+# What the target of an action remembers, and how much it matters. Spying
+# and scheming are only remembered when discovered (their chance effect hits).
+MEMORY_KINDS = {
+    ActionType.SPY_ON: ("spied_on_me", 0.5),
+    ActionType.SCHEME: ("schemed_against_me", 0.7),
+    ActionType.ATTACK: ("attacked_me", 1.0),
+    ActionType.BETRAY: ("betrayed_me", 0.9),
+    ActionType.ACCUSE: ("accused_me", 0.4),
+}
+
+# Importance of seeing an ally attacked
+ALLY_ATTACKED_IMPORTANCE = 0.8
+
+# Importance to a spy of being caught
+CAUGHT_SPYING_IMPORTANCE = 0.6
+
+# A spy learns its target's most important memory at this share of its importance
+HEARSAY_FACTOR = 0.8
+
+# ACTION_EFFECTS as modify_relationship() keyword arguments
+_EFFECT_KWARGS = {
+    action: [
+        (direction, {f"{key}_delta": value for key, value in deltas.items()}, chance)
+        for direction, deltas, chance in effects
+    ]
+    for action, effects in ACTION_EFFECTS.items()
+}
+
+# ACTION_EFFECTS as delta vectors in CHANNELS order
+_EFFECT_VECTORS = {
+    action: [
+        (direction, tuple(deltas.get(channel, 0.0) for channel in CHANNELS), chance)
+        for direction, deltas, chance in effects
+    ]
+    for action, effects in ACTION_EFFECTS.items()
+}
+
+
+def remember_action(
+    turn: int,
+    agent_name: str,
+    agent_memory: AgentMemory,
+    action: ActionType,
+    target_name: str,
+    target_memory: AgentMemory,
+    discovered: bool
+):
+    """
+    Record what the agent and the target of an action learn from it.
+    
+    Shared with EnsembleEngine so both engines remember alike; allies of
+    an attacked target are left to the caller.
+    
+    Args:
+        turn: Turn of the action
+        agent_name: Name of the acting agent
+        agent_memory: Its memory
+        action: The action
+        target_name: Name of the target
+        target_memory: Its memory
+        discovered: Whether the action's chance effect (discovery) happened
+    """
+    if action == ActionType.SPY_ON:
+        learned = target_memory.most_important()
+        if (learned is not None and learned.actor != agent_name
+                and not agent_memory.knows(learned.kind, learned.actor)):
+            agent_memory.remember(
+                learned.turn, learned.kind, learned.actor, learned.subject,
+                learned.importance * HEARSAY_FACTOR
+            )
+        if discovered:
+            agent_memory.remember(
+                turn, "caught_me_spying", target_name, agent_name, CAUGHT_SPYING_IMPORTANCE
+            )
+    
+    memory = MEMORY_KINDS.get(action)
+    if memory is not None and (discovered or action not in (ActionType.SPY_ON, ActionType.SCHEME)):
+        kind, importance = memory
+        target_memory.remember(turn, kind, agent_name, target_name, importance)
+
+
 class DecisionEngine:
     """Processes agent decisions and updates world state accordingly."""
     
-    def __init__(self, world_state: WorldState):
+    def __init__(self, world_state: WorldState, rng=random):
         """
         Initialize decision engine.
         
         Args:
             world_state: The world state to modify
+            rng: Source of the discovery and injury rolls (the random
+                module by default)
         """
         self.world_state = world_state
+        self.rng = rng
+        self._agents_by_name: Optional[Dict[str, BaseAgent]] = None
     
     def process_action(
         self,
@@ -40,7 +177,8 @@ class DecisionEngine:
         
         # Update relationships based on action
         if target:
-            self._update_relationships(agent, action, target)
+            discovered = self._update_relationships(agent, action, target)
+            self._remember(agent, action, target, discovered)
         
         # Handle special action consequences
         self._handle_action_consequences(agent, action, target)
@@ -84,51 +222,141 @@ class DecisionEngine:
         action: ActionType,
         target: BaseAgent
     ):
-        """Update relationships based on action type."""
-        matrix = self.world_state.relationship_matrix
-        
-        if action == ActionType.TALK_TO:
-            # Talking increases trust slightly
-            matrix.modify_relationship(agent, target, trust_delta=0.1, love_delta=0.05)
-            matrix.modify_relationship(target, agent, trust_delta=0.05)
+        """
+        Update relationships based on action type.
         
-        elif action == ActionType.SPY_ON:
-            # Spying increases suspicion if discovered
-            if random.random() < 0.3:  # 30% chance of discovery
-                matrix.modify_relationship(target, agent, suspicion_delta=0.2, trust_delta=-0.1)
-            matrix.modify_relationship(agent, target, suspicion_delta=0.1)
+        Returns:
+            True if a chance effect (e.g. discovery of a spy) happened
+        """
+        matrix = self.world_state.relationship_matrix
+        discovered = False
         
-        elif action == ActionType.BETRAY:
-            # Betrayal severely damages relationships
-            matrix.modify_relationship(agent, target, trust_delta=-0.3, love_delta=-0.2)
-            matrix.modify_relationship(target, agent, trust_delta=-0.4, suspicion_delta=0.3, fear_delta=0.2)
+        for direction, kwargs, chance in _EFFECT_KWARGS.get(action, ()):
+            if chance is not None:
+                if self.rng.random() >= chance:
+                    continue
+                discovered = True
+            if direction == FORWARD:
+                matrix.modify_relationship(agent, target, **kwargs)
+            else:
+                matrix.modify_relationship(target, agent, **kwargs)
         
-        elif action == ActionType.ACCUSE:
-            # Accusation increases suspicion and fear
-            matrix.modify_relationship(agent, target, suspicion_delta=0.2)
-            matrix.modify_relationship(target, agent, suspicion_delta=0.15, fear_delta=0.1, trust_delta=-0.1)
+        if action == ActionType.ATTACK:
+            self._roll_injury(target)
+        return discovered
+    
+    def _remember(
+        self,
+        agent: BaseAgent,
+        action: ActionType,
+        target: BaseAgent,
+        discovered: bool
+    ):
+        """Record what the target, its allies and a spy learn from an action."""
+        turn = self.world_state.turn_number
+        remember_action(
+            turn, agent.name, agent.memory, action, target.name, target.memory, discovered
+        )
+        if action == ActionType.ATTACK:
+            for ally in self._allies_of(target):
+                if ally is not agent:
+                    ally.memory.remember(
+                        turn, "attacked_ally", agent.name, target.name, ALLY_ATTACKED_IMPORTANCE
+                    )
+    
+    def _allies_of(self, target: BaseAgent) -> List[BaseAgent]:
+        """Living agents allied with the target (those in its room, if locations are on)."""
+        matrix = self.world_state.relationship_matrix
+        locations = self.world_state.locations
+        if locations is not None:
+            return [
+                other for other in locations.co_located(target)
+                if (matrix.get_value(other.name, target.name, "trust") or 0.0)
+                + (matrix.get_value(other.name, target.name, "love") or 0.0) > ALLIANCE_THRESHOLD
+            ]
+        if self._agents_by_name is None:
+            self._agents_by_name = {a.name: a for a in self.world_state.agents}
+        by_name = self._agents_by_name
+        allies = matrix.above_threshold(
+            target.name, "alliance", ALLIANCE_THRESHOLD, incoming=True,
+            include=lambda name: name in by_name and by_name[name].state.is_alive
+        )
+        return [by_name[name] for name, _ in allies]
+    
+    def _roll_injury(self, target: BaseAgent):
+        """Roll for an attack injuring its target (the dead leave the room map)."""
+        if self.rng.random() < INJURY_CHANCE:
+            target.state.health = max(0.0, target.state.health - INJURY_DAMAGE)
+            if target.state.health <= 0:
+                target.state.is_alive = False
+                if self.world_state.locations is not None:
+                    self.world_state.locations.remove(target)
+    
+    def process_actions(
+        self,
+        actions: List[Tuple[BaseAgent, ActionType, Optional[BaseAgent]]]
+    ) -> List[Event]:
+        """
+        Process a whole batch of actions, applying relationship effects at once.
         
-        elif action == ActionType.DEFEND:
-            # Defense increases trust and love
-            matrix.modify_relationship(agent, target, trust_delta=0.15, love_delta=0.1)
-            matrix.modify_relationship(target, agent, trust_delta=0.2, love_delta=0.15)
+        Actions are resolved in the given order. Discovery and injury rolls are
+        drawn per action exactly as in process_action(), and injuries land
+        immediately, so an action whose agent or target has died earlier in
+        the batch is skipped. Relationship deltas are summed per cell and
+        clamped once at the end; this matches per-action processing except
+        where a cell would have hit 0 or 1 part-way through the batch.
         
-        elif action == ActionType.ATTACK:
-            # Attack severely damages relationships and may cause harm
-            matrix.modify_relationship(agent, target, suspicion_delta=0.3, fear_delta=0.1)
-            matrix.modify_relationship(target, agent, suspicion_delta=0.3, fear_delta=0.3, trust_delta=-0.3)
-            # Attack may cause health damage
-            if random.random() < 0.3:  # 30% chance of injury
-                target.state.health = max(0.0, target.state.health - 0.2)
-                if target.state.health <= 0:
-                    target.state.is_alive = False
+        Args:
+            actions: (agent, action, target) triples to resolve
+            
+        Returns:
+            Events for the actions that were resolved
+        """
+        deltas: Dict[Tuple[str, str], List[float]] = {}
+        events = []
         
-        elif action == ActionType.SCHEME:
-            # Scheming increases suspicion
+        for agent, action, target in actions:
+            if not agent.state.is_alive:
+                continue
+            if target is not None and not target.state.is_alive:
+                continue
+            
+            description = self._generate_description(agent, action, target)
+            
             if target:
-                matrix.modify_relationship(agent, target, suspicion_delta=0.15)
-                if random.random() < 0.2:  # 20% chance of discovery
-                    matrix.modify_relationship(target, agent, suspicion_delta=0.1, trust_delta=-0.1)
+                discovered = False
+                for direction, vector, chance in _EFFECT_VECTORS.get(action, ()):
+                    if chance is not None:
+                        if self.rng.random() >= chance:
+                            continue
+                        discovered = True
+                    if direction == FORWARD:
+                        key = (agent.name, target.name)
+                    else:
+                        key = (target.name, agent.name)
+                    total = deltas.get(key)
+                    if total is None:
+                        deltas[key] = list(vector)
+                    else:
+                        for i, value in enumerate(vector):
+                            total[i] += value
+                
+                if action == ActionType.ATTACK:
+                    self._roll_injury(target)
+                self._remember(agent, action, target, discovered)
+            
+            self._handle_action_consequences(agent, action, target)
+            
+            events.append(Event(
+                turn=self.world_state.turn_number,
+                agent=agent,
+                action=action,
+                target=target,
+                description=description
+            ))
+        
+        self.world_state.relationship_matrix.apply_deltas(deltas)
+        return events
     
     def _handle_action_consequences(
         self,
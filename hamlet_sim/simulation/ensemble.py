@@ -0,0 +1,321 @@
+"""Lock-step ensemble engine running many independent worlds side by side."""
+
+import copy
+from array import array
+from typing import Dict, List, Optional
+from ..agents.base_agent import BaseAgent, ActionType
+from ..agents.compiled import CompiledPolicy
+from ..world.world_state import WorldState
+from ..world.relationship_matrix import CHANNELS, SCORES
+from ..world.factions import ALLIANCE_THRESHOLD
+from .decision_engine import (
+    ALLY_ATTACKED_IMPORTANCE, FORWARD, INJURY_CHANCE, INJURY_DAMAGE, _EFFECT_VECTORS,
+    remember_action,
+)
+import random
+
+
+NUM_CHANNELS = len(CHANNELS)
+TRUST = CHANNELS.index("trust")
+LOVE = CHANNELS.index("love")
+SUSPICION = CHANNELS.index("suspicion")
+
+ACTIONS = list(ActionType)
+ACTION_INDEX = {action: i for i, action in enumerate(ACTIONS)}
+
+ATTACK = ActionType.ATTACK
+HIDE = ActionType.HIDE
+
+
+class _AliveView:
+    """`state` of an agent proxy: whether the agent lives in the engine's current world."""
+    
+    __slots__ = ("_engine", "_index")
+    
+    def __init__(self, engine: 'EnsembleEngine', index: int):
+        self._engine = engine
+        self._index = index
+    
+    @property
+    def is_alive(self) -> bool:
+        engine = self._engine
+        return bool(engine.alive[engine.world * engine.num_agents + self._index])
+
+
+class _MatrixView:
+    """The reads policies make of a RelationshipMatrix, over the engine's current world."""
+    
+    def __init__(self, engine: 'EnsembleEngine'):
+        self._engine = engine
+    
+    def _cell(self, name1: str, name2: str) -> Optional[int]:
+        """Offset of a pair's first channel in the relationship tensor, or None."""
+        engine = self._engine
+        i = engine._index.get(name1)
+        j = engine._index.get(name2)
+        if i is None or j is None or i == j:
+            return None
+        n = engine.num_agents
+        return ((engine.world * n + i) * n + j) * NUM_CHANNELS
+    
+    def get_value(self, name1: str, name2: str, key: str) -> Optional[float]:
+        """Channel or combined score of a pair by names, or None if the pair is unknown."""
+        base = self._cell(name1, name2)
+        if base is None:
+            return None
+        rel = self._engine.relationships
+        return sum(rel[base + CHANNELS.index(channel)] for channel in SCORES.get(key, (key,)))
+    
+    def get_relationship(self, agent1: BaseAgent, agent2: BaseAgent) -> Dict[str, float]:
+        """Channel values of a pair."""
+        base = self._cell(agent1.name, agent2.name)
+        rel = self._engine.relationships
+        return {channel: rel[base + c] for c, channel in enumerate(CHANNELS)}
+    
+    def get_trust_level(self, agent1: BaseAgent, agent2: BaseAgent) -> float:
+        """Trust of agent1 toward agent2."""
+        return self._engine.relationships[self._cell(agent1.name, agent2.name) + TRUST]
+    
+    def get_suspicion_level(self, agent1: BaseAgent, agent2: BaseAgent) -> float:
+        """Suspicion of agent1 toward agent2."""
+        return self._engine.relationships[self._cell(agent1.name, agent2.name) + SUSPICION]
+
+
+class _WorldView:
+    """What the policies see of the engine's current world."""
+    
+    def __init__(self, engine: 'EnsembleEngine'):
+        self._engine = engine
+        self.relationship_matrix = _MatrixView(engine)
+    
+    @property
+    def turn_number(self) -> int:
+        return self._engine.turn_number
+
+
+class EnsembleEngine:
+    """
+    Simulates K independent copies of one world in lock step.
+    
+    All worlds share flat typed arrays: a K x N x N x 5 relationship tensor
+    and K x N health and alive arrays. Each world has its own RNG stream and
+    stops once fewer than two of its agents are alive or the turn limit is
+    reached. Action effects are those of DecisionEngine expressed over array
+    indices, and only each agent's memory is kept per world, as a
+    copy-on-write fork of the template's.
+    
+    Agents decide through their own policy, as in SimulationLoop: the
+    archetype's _make_decision(), or a CompiledPolicy (whose alias tables
+    are then compiled once for all K worlds). They run on one proxy per
+    agent and a view of the arrays that re-point at the world being
+    played, so world k of an ensemble seeded s plays exactly like
+    SimulationLoop after random.seed(s + k) (`benchmark.py ensemble`
+    checks this). Other policies need a full world and are rejected.
+    """
+    
+    def __init__(
+        self,
+        template: WorldState,
+        worlds: int = 100,
+        seed: Optional[int] = None,
+        max_turns: int = 50
+    ):
+        """
+        Initialize an ensemble.
+        
+        Args:
+            template: World whose agents and relationships every copy starts from
+            worlds: Number of independent worlds (K)
+            seed: Base seed; world k uses seed + k (random if None)
+            max_turns: Turn limit for every world
+        
+        Raises:
+            ValueError: If an agent has a policy other than CompiledPolicy
+        """
+        agents = template.agents
+        self.names = [agent.name for agent in agents]
+        self.num_worlds = worlds
+        self.num_agents = len(agents)
+        self.max_turns = max_turns
+        self.turn_number = 0
+        self._index = {name: i for i, name in enumerate(self.names)}
+        for agent in agents:
+            if agent.policy is not None and not isinstance(agent.policy, CompiledPolicy):
+                raise ValueError(
+                    f"{agent.name}'s {type(agent.policy).__name__} cannot run in an ensemble"
+                )
+        # World the proxies and the view currently show
+        self.world = 0
+        self._view = _WorldView(self)
+        # One proxy per agent: a shallow copy whose state reads the alive
+        # array, given the current world's memory before each decision
+        self._agents: List[BaseAgent] = []
+        for i, agent in enumerate(agents):
+            proxy = copy.copy(agent)
+            proxy.state = _AliveView(self, i)
+            self._agents.append(proxy)
+        
+        n = self.num_agents
+        row = array('d', [0.0] * (n * n * NUM_CHANNELS))
+        for i, agent in enumerate(agents):
+            for j, other in enumerate(agents):
+                if i == j:
+                    continue
+                rel = template.relationship_matrix.get_relationship(agent, other)
+                base = (i * n + j) * NUM_CHANNELS
+                for c, channel in enumerate(CHANNELS):
+                    row[base + c] = rel[channel]
+        self.relationships = row * worlds
+        
+        self.health = array('d', [agent.state.health for agent in agents] * worlds)
+        self.alive = bytearray([1 if agent.state.is_alive else 0 for agent in agents] * worlds)
+        self.active = bytearray([1] * worlds)
+        self.turns_run = array('l', [0] * worlds)
+        self.death_turn = array('l', [0] * (worlds * n))
+        self.memories = [agent.memory.fork() for _ in range(worlds) for agent in agents]
+        self.action_counts = array('q', [0] * (n * len(ACTIONS)))
+        
+        base_seed = seed if seed is not None else random.randrange(2 ** 32)
+        self._rngs = [random.Random(base_seed + k) for k in range(worlds)]
+        self._check_termination()
+    
+    def run(self, max_turns: Optional[int] = None) -> Dict:
+        """
+        Advance all worlds until every one of them has terminated.
+        
+        Returns:
+            Aggregate statistics (see get_statistics)
+        """
+        if max_turns is not None:
+            self.max_turns = max_turns
+        while any(self.active):
+            self.step()
+        return self.get_statistics()
+    
+    def step(self):
+        """Advance every active world by one turn."""
+        self.turn_number += 1
+        n = self.num_agents
+        alive = self.alive
+        agents = self._agents
+        view = self._view
+        index = self._index
+        for k in range(self.num_worlds):
+            if not self.active[k]:
+                continue
+            self.world = k
+            rng = self._rngs[k]
+            alive_base = k * n
+            order = [i for i in range(n) if alive[alive_base + i]]
+            rng.shuffle(order)
+            for i in order:
+                if not alive[alive_base + i]:
+                    continue
+                # Like SimulationLoop: the turn-start living agents in turn
+                # order, without those killed earlier in the turn
+                others = [agents[j] for j in order if j != i and alive[alive_base + j]]
+                agent = agents[i]
+                agent.memory = self.memories[alive_base + i]
+                # BaseAgent.decide_action() without its dead filter
+                if not others:
+                    action, target = HIDE, None
+                elif agent.policy is not None:
+                    action, target = agent.policy.decide(agent, view, others, rng)
+                else:
+                    action, target = agent._make_decision(view, others, rng)
+                self.action_counts[i * len(ACTIONS) + ACTION_INDEX[action]] += 1
+                if target is not None:
+                    self._apply(k, i, action, index[target.name], rng)
+            self.turns_run[k] = self.turn_number
+        self._check_termination()
+    
+    def _check_termination(self):
+        """Deactivate worlds with fewer than two living agents or out of turns."""
+        n = self.num_agents
+        for k in range(self.num_worlds):
+            if not self.active[k]:
+                continue
+            living = sum(self.alive[k * n:(k + 1) * n])
+            if living < 2 or self.turn_number >= self.max_turns:
+                self.active[k] = 0
+    
+    def _apply(self, k: int, agent: int, action: ActionType, target: int, rng: random.Random):
+        """Apply an action's effects, injury roll and memories in world k."""
+        n = self.num_agents
+        rel = self.relationships
+        world_base = k * n * n
+        discovered = False
+        for direction, vector, chance in _EFFECT_VECTORS.get(action, ()):
+            if chance is not None:
+                if rng.random() >= chance:
+                    continue
+                discovered = True
+            if direction == FORWARD:
+                base = (world_base + agent * n + target) * NUM_CHANNELS
+            else:
+                base = (world_base + target * n + agent) * NUM_CHANNELS
+            for c in range(NUM_CHANNELS):
+                delta = vector[c]
+                if delta:
+                    rel[base + c] = max(0.0, min(1.0, rel[base + c] + delta))
+        
+        if action == ATTACK and rng.random() < INJURY_CHANCE:
+            slot = k * n + target
+            self.health[slot] = max(0.0, self.health[slot] - INJURY_DAMAGE)
+            if self.health[slot] <= 0:
+                self.alive[slot] = 0
+                self.death_turn[slot] = self.turn_number
+        
+        memories = self.memories
+        turn = self.turn_number
+        remember_action(
+            turn, self.names[agent], memories[k * n + agent], action,
+            self.names[target], memories[k * n + target], discovered
+        )
+        if action == ATTACK:
+            # Living agents allied with the target (DecisionEngine._allies_of)
+            for ally in range(n):
+                if (ally != agent and ally != target and self.alive[k * n + ally]
+                        and self._value(k, ally, target, TRUST)
+                        + self._value(k, ally, target, LOVE) > ALLIANCE_THRESHOLD):
+                    memories[k * n + ally].remember(
+                        turn, "attacked_ally", self.names[agent], self.names[target],
+                        ALLY_ATTACKED_IMPORTANCE
+                    )
+    
+    def _value(self, k: int, i: int, j: int, channel: int) -> float:
+        """Relationship value of agent i toward agent j in world k."""
+        n = self.num_agents
+        return self.relationships[((k * n + i) * n + j) * NUM_CHANNELS + channel]
+    
+    def get_statistics(self) -> Dict:
+        """
+        Aggregate outcomes over all worlds.
+        
+        Returns:
+            Dict with survival rates, mean death turns, mean run length and
+            action mix per agent
+        """
+        n = self.num_agents
+        worlds = self.num_worlds
+        survival = {}
+        mean_death_turn = {}
+        action_mix = {}
+        for i, name in enumerate(self.names):
+            survivors = sum(self.alive[k * n + i] for k in range(worlds))
+            survival[name] = survivors / worlds
+            deaths = [self.death_turn[k * n + i] for k in range(worlds) if not self.alive[k * n + i]]
+            mean_death_turn[name] = sum(deaths) / len(deaths) if deaths else None
+            counts = self.action_counts[i * len(ACTIONS):(i + 1) * len(ACTIONS)]
+            total = sum(counts)
+            action_mix[name] = {
+                action.value: (count / total if total else 0.0)
+                for action, count in zip(ACTIONS, counts)
+            }
+        return {
+            "worlds": worlds,
+            "mean_turns": sum(self.turns_run) / worlds,
+            "survival_rate": survival,
+            "mean_death_turn": mean_death_turn,
+            "action_mix": action_mix,
+        }
@@ -0,0 +1,293 @@
+"""Turn pipelining: compute turns ahead on a fork, release them at playback pace."""
+
+import copy
+import random
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+from ..agents.base_agent import AgentState
+from ..agents.memory import AgentMemory
+from ..events.event import Event
+from ..events.event_log import EventLog
+from .simulation_loop import SimulationLoop
+
+
+class TurnResult(NamedTuple):
+    """One precomputed turn: what it changed, keyed by agent name."""
+    turn: int
+    # Events of the turn, naming the forked world's agents
+    events: List[Event]
+    states: Dict[str, AgentState]
+    # Memories that stored something new (copy-on-write forks)
+    memories: Dict[str, AgentMemory]
+    # Occupants of every room someone entered or left, in order
+    locations: Dict[str, List[str]]
+    cells: Dict[Tuple[str, str], Tuple[float, ...]]
+    # State of the fork's RNG after the turn
+    rng_state: tuple
+
+
+class TurnPipeline:
+    """
+    Plays a simulation back from turns computed ahead of time.
+    
+    A producer thread plays the simulation forward on a copy-on-write fork
+    of its world, up to `lookahead` turns ahead, and queues what each turn
+    changed. step() releases the oldest queued turn by applying its
+    changes, events and end-of-turn bookkeeping (relationship history,
+    event sinks) to the live simulation, so a viewer paced by turn_delay
+    sees turns at that pace however long individual turns take to compute.
+    
+    The pipeline gives the live simulation a random.Random of its own,
+    continuing from the state of its current RNG, and the fork draws from
+    a copy of it in the same order the live world would. A seeded run thus
+    releases the same turns as stepping the simulation directly, and the
+    module RNG (which other simulations may share) is never touched. Sinks
+    get the RNG state of each released turn, so a checkpoint resumes after
+    that turn rather than where the producer got to. Anything that changes
+    the live world other than step() (a manual step, a reset) must call
+    invalidate() first: it drops the queue and rewinds the simulation's RNG
+    to the last released turn.
+    
+    step() and the `world_state` property let a Scheduler drive a pipeline
+    in place of the simulation.
+    """
+    
+    def __init__(self, simulation: SimulationLoop, lookahead: int = 3):
+        """
+        Initialize the pipeline (the producer starts with the first step()).
+        
+        Args:
+            simulation: Live simulation to play back
+            lookahead: Maximum number of turns computed ahead
+        
+        Raises:
+            ValueError: If lookahead is less than 1
+        """
+        if lookahead < 1:
+            raise ValueError("lookahead must be at least 1")
+        self.simulation = simulation
+        if not isinstance(simulation.rng, random.Random):
+            rng = random.Random()
+            rng.setstate(simulation.rng.getstate())
+            simulation.rng = rng
+        self.lookahead = lookahead
+        self._cond = threading.Condition()
+        self._ready: Deque[TurnResult] = deque()
+        # True while step() applies a turn; the producer waits meanwhile
+        # instead of taking the GIL from it
+        self._applying = False
+        self._thread: Optional[threading.Thread] = None
+        # Bumped by invalidate() so a stale producer drops its turn
+        self._generation = 0
+        self._error: Optional[Exception] = None
+        # The simulation's RNG state after the last released turn
+        self._released_rng: Optional[tuple] = None
+        self._closed = False
+        self.turns_released = 0
+        self.turns_discarded = 0
+        # Releases that had to wait for the producer, and how long in total
+        self.stalls = 0
+        self.stall_seconds = 0.0
+    
+    @property
+    def world_state(self):
+        """The live world."""
+        return self.simulation.world_state
+    
+    def step(self) -> List[Event]:
+        """
+        Release the next turn into the live simulation, waiting for the
+        producer if it is not computed yet.
+        
+        Returns:
+            The turn's events (empty if the pipeline was invalidated while
+            waiting)
+        
+        Raises:
+            RuntimeError: If the pipeline is closed
+            Exception: Whatever the producer raised computing this turn
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Pipeline is closed")
+            if self._thread is None:
+                self._start()
+            thread = self._thread
+            if not self._ready:
+                self.stalls += 1
+                start = time.perf_counter()
+                while not self._ready and self._error is None and self._thread is thread:
+                    self._cond.wait()
+                self.stall_seconds += time.perf_counter() - start
+            if not self._ready:
+                if self._error is not None and self._thread is thread:
+                    raise self._error
+                return []
+            result = self._ready.popleft()
+            self._released_rng = result.rng_state
+            self.turns_released += 1
+            self._applying = True
+        try:
+            return self._apply(result)
+        finally:
+            with self._cond:
+                self._applying = False
+                self._cond.notify_all()
+    
+    def invalidate(self):
+        """
+        Drop every computed turn and stop the producer; the next step()
+        forks the live world again. Rewinds the simulation's RNG to where
+        the last released turn left it.
+        """
+        with self._cond:
+            thread = self._thread
+            if thread is None:
+                return
+            self._generation += 1
+            self.turns_discarded += len(self._ready)
+            self._ready.clear()
+            self._thread = None
+            self._error = None
+            self._cond.notify_all()
+        # The producer finishes the turn it is playing, then stops
+        thread.join()
+        self.simulation.rng.setstate(self._released_rng)
+    
+    def close(self):
+        """Invalidate the pipeline for good."""
+        self.invalidate()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+    
+    def status(self) -> Dict:
+        """Get a JSON-ready summary of the pipeline."""
+        with self._cond:
+            return {
+                'lookahead': self.lookahead,
+                'ready': len(self._ready),
+                'released': self.turns_released,
+                'discarded': self.turns_discarded,
+                'stalls': self.stalls,
+                'stall_seconds': self.stall_seconds,
+            }
+    
+    def _start(self):
+        """Fork the live world and start the producer (caller holds the lock)."""
+        live = self.simulation
+        world = live.world_state.fork()
+        self._released_rng = live.rng.getstate()
+        rng = random.Random()
+        rng.setstate(self._released_rng)
+        ahead = SimulationLoop(
+            world.agents, event_log=EventLog(log_file=None, max_events=1), verbose=False,
+            world_state=world, turn_mode=live.turn_mode, decision_workers=live.decision_workers,
+            rng=rng
+        )
+        self._thread = threading.Thread(
+            target=self._produce, args=(ahead, self._generation),
+            name="hamlet-lookahead", daemon=True
+        )
+        self._thread.start()
+    
+    def _produce(self, ahead: SimulationLoop, generation: int):
+        """Producer thread: play the fork forward and queue each turn's changes."""
+        world = ahead.world_state
+        tracker = world.relationship_matrix.track_changes()
+        versions = {agent.name: agent.memory.version for agent in world.agents}
+        rooms = {}
+        if world.locations is not None:
+            rooms = {agent.name: world.locations.location_of(agent) for agent in world.agents}
+        try:
+            while True:
+                with self._cond:
+                    while ((len(self._ready) >= self.lookahead or self._applying)
+                           and generation == self._generation):
+                        self._cond.wait()
+                    if generation != self._generation:
+                        return
+                
+                # Only agents alive at the start of a turn can change during it
+                acting = world.get_living_agents()
+                try:
+                    events = ahead.step()
+                except Exception as e:
+                    with self._cond:
+                        if generation == self._generation:
+                            self._error = e
+                            self._cond.notify_all()
+                    return
+                
+                memories = {}
+                changed_rooms = set()
+                for agent in acting:
+                    if agent.memory.version != versions[agent.name]:
+                        versions[agent.name] = agent.memory.version
+                        memories[agent.name] = agent.memory.fork()
+                    if world.locations is not None:
+                        room = world.locations.location_of(agent)
+                        if room != rooms[agent.name]:
+                            changed_rooms.update((rooms[agent.name], room))
+                            rooms[agent.name] = room
+                changed_rooms.discard(None)
+                result = TurnResult(
+                    turn=world.turn_number,
+                    events=events,
+                    states={agent.name: copy.copy(agent.state) for agent in acting},
+                    memories=memories,
+                    locations={room: world.locations.occupant_names(room) for room in changed_rooms},
+                    cells=world.relationship_matrix.get_cells(tracker),
+                    rng_state=ahead.rng.getstate()
+                )
+                tracker.clear()
+                
+                with self._cond:
+                    if generation != self._generation:
+                        return
+                    self._ready.append(result)
+                    self._cond.notify_all()
+        finally:
+            ahead.close()
+    
+    def _apply(self, result: TurnResult) -> List[Event]:
+        """Apply a computed turn to the live simulation, as SimulationLoop.step() would."""
+        simulation = self.simulation
+        world = simulation.world_state
+        history = simulation.relationship_history
+        if history is not None:
+            # Changes made between turns belong to the last turn
+            history.record_turn(world.turn_number)
+        world.turn_number = result.turn
+        
+        agents = {agent.name: agent for agent in world.agents}
+        for name, state in result.states.items():
+            # In place, so references to the live state stay valid
+            vars(agents[name].state).update(vars(state))
+        for name, memory in result.memories.items():
+            agents[name].memory = memory
+        for room, names in result.locations.items():
+            # Whole rooms, since occupant order decides candidate order
+            world.locations.set_occupants(room, [agents[name] for name in names])
+        world.relationship_matrix.set_cells(result.cells)
+        
+        events = [
+            Event(
+                turn=event.turn,
+                agent=agents[event.agent.name],
+                action=event.action,
+                target=agents[event.target.name] if event.target else None,
+                description=event.description,
+                timestamp=event.timestamp
+            )
+            for event in result.events
+        ]
+        for event in events:
+            simulation._log(event)
+        
+        if history is not None:
+            history.record_turn(world.turn_number)
+        simulation.event_log.end_turn(world, result.rng_state)
+        return events
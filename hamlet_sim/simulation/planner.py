@@ -0,0 +1,364 @@
+"""Lookahead decision policy that scores choices by rolling out short futures."""
+
+import math
+import pickle
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from ..agents.base_agent import ActionType, BaseAgent
+from ..world.world_state import WorldState
+from ..world.relationship_matrix import CHANNELS
+from ..events.event_log import EventLog
+from .decision_engine import DecisionEngine
+from .simulation_loop import SimulationLoop, SEQUENTIAL
+
+
+# Actions that need a target; HIDE is the only one without
+TARGETED = tuple(action for action in ActionType if action is not ActionType.HIDE)
+
+# Value of being alive at the end of a rollout, and of each point of health
+SURVIVAL_VALUE = 1.0
+HEALTH_VALUE = 0.5
+
+# Weight of how the living others regard the planner, per channel (mean over others)
+STANDING_WEIGHTS = {"trust": 0.2, "fear": 0.0, "suspicion": -0.3, "love": 0.1, "influence": 0.1}
+
+# Extra standing weights for goals that make being feared or influential pay
+GOAL_STANDING = {
+    "gain_power": {"fear": 0.1, "influence": 0.1},
+    "maintain_power": {"fear": 0.05, "influence": 0.1},
+    "avoid_conflict": {"fear": -0.1},
+}
+
+Candidate = Tuple[ActionType, Optional[str]]
+ValueFunction = Callable[[BaseAgent, WorldState], float]
+
+
+def standing_value(agent: BaseAgent, world_state: WorldState) -> float:
+    """
+    Default rollout value: survival and health, plus how the living others
+    regard the agent (weighted per channel and goal).
+    
+    Args:
+        agent: The planning agent, in the rolled-out world
+        world_state: The rolled-out world
+    
+    Returns:
+        Value of the outcome for the agent (higher is better)
+    """
+    if not agent.state.is_alive:
+        return 0.0
+    weights = dict(STANDING_WEIGHTS)
+    for goal in agent.goals:
+        for channel, weight in GOAL_STANDING.get(goal, {}).items():
+            weights[channel] += weight
+    others = [other for other in world_state.get_living_agents() if other is not agent]
+    standing = 0.0
+    if others:
+        matrix = world_state.relationship_matrix
+        for other in others:
+            rel = matrix.get_relationship(other, agent)
+            standing += sum(weights[channel] * rel[channel] for channel in CHANNELS)
+        standing /= len(others)
+    return SURVIVAL_VALUE + HEALTH_VALUE * agent.state.health + standing
+
+
+def rollout(
+    world_state: WorldState,
+    name: str,
+    candidate: Candidate,
+    seed: int,
+    depth: int,
+    turn_mode: str = SEQUENTIAL,
+    value: ValueFunction = standing_value
+) -> float:
+    """
+    Play one short future of a choice on a fork of the world.
+    
+    The choice is applied at once, then `depth` full turns are played with
+    every agent's own policy, drawing from an RNG seeded here.
+    
+    Args:
+        world_state: World to branch from (left unchanged; planners must be
+            detached from its agents)
+        name: Name of the planning agent
+        candidate: (action, target name or None) to evaluate
+        seed: Seed of this rollout's RNG
+        depth: Full turns played after the choice
+        turn_mode: Turn mode of the rollout
+        value: Scores the outcome for the planning agent
+    
+    Returns:
+        Value of the outcome
+    """
+    rng = random.Random(seed)
+    world = world_state.fork()
+    agent = world.get_agent_by_name(name)
+    action, target_name = candidate
+    target = world.get_agent_by_name(target_name) if target_name is not None else None
+    DecisionEngine(world, rng).process_action(agent, action, target)
+    simulation = SimulationLoop(
+        world.agents, event_log=EventLog(log_file=None), verbose=False,
+        world_state=world, turn_mode=turn_mode, rng=rng
+    )
+    for _ in range(depth):
+        if not agent.state.is_alive or len(world.get_living_agents()) < 2:
+            break
+        simulation.step()
+    return value(agent, world)
+
+
+# Root world of the decision a pool worker last saw: (decision id, world)
+_worker_root: Optional[Tuple[int, WorldState]] = None
+
+
+def _rollout_chunk(
+    decision: int,
+    payload: bytes,
+    name: str,
+    jobs: List[Tuple[Candidate, int]],
+    depth: int,
+    turn_mode: str,
+    value: ValueFunction
+) -> List[float]:
+    """Run rollouts in a pool worker, unpickling each decision's root world once."""
+    global _worker_root
+    if _worker_root is None or _worker_root[0] != decision:
+        _worker_root = (decision, pickle.loads(payload))
+    root = _worker_root[1]
+    return [rollout(root, name, candidate, seed, depth, turn_mode, value) for candidate, seed in jobs]
+
+
+class RolloutPlanner:
+    """
+    Decision policy that plans by Monte Carlo rollouts.
+    
+    Every (action, target) choice is a bandit arm: each rollout applies it
+    on a copy-on-write fork of the world, plays a few turns and scores the
+    result. Rollouts go to the arm with the highest UCB1 score until the
+    rollout or time budget is spent, and the arm with the best mean value is
+    played. The k-th rollout of every arm uses the same seed, so arms are
+    compared on the same futures.
+    
+    Attach it to one or a few agents with attach(); the other agents keep
+    their own policies, and inside rollouts planners play their agents'
+    hand-written policies. Rollouts run in this process or, with
+    `workers`, on a process pool. Throughput is tracked in
+    rollouts_per_second(), since plan quality depends on it.
+    """
+    
+    def __init__(
+        self,
+        rollouts: int = 200,
+        time_budget: Optional[float] = None,
+        depth: int = 3,
+        exploration: float = 0.5,
+        workers: int = 0,
+        turn_mode: str = SEQUENTIAL,
+        value: ValueFunction = standing_value,
+        max_targets: int = 8
+    ):
+        """
+        Initialize the planner.
+        
+        Args:
+            rollouts: Maximum rollouts per decision
+            time_budget: Optional maximum seconds per decision (at least one
+                rollout always runs)
+            depth: Full turns played in each rollout
+            exploration: UCB1 exploration constant
+            workers: Processes running rollouts (0 runs them in this process)
+            turn_mode: Turn mode of the rollouts (match the simulation's)
+            value: Scores a rollout's outcome for the planning agent; must
+                be picklable (e.g. a module-level function) when workers > 0
+            max_targets: Targets considered per decision: the agents the
+                planner has the strongest feelings about (trust, fear etc.
+                summed by magnitude), so large courts don't spread the
+                budget thinner than one rollout per choice
+        """
+        self.rollouts = rollouts
+        self.time_budget = time_budget
+        self.depth = depth
+        self.exploration = exploration
+        self.workers = workers
+        self.turn_mode = turn_mode
+        self.value = value
+        self.max_targets = max_targets
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._decisions = 0
+        # Totals over all decisions, for rollouts_per_second()
+        self.total_rollouts = 0
+        self.total_seconds = 0.0
+        # Mean value and rollout count per candidate of the last decision
+        self.last_values: Dict[Candidate, Tuple[float, int]] = {}
+    
+    def attach(self, agents: Sequence[BaseAgent]):
+        """Make this the decision policy of the given agents."""
+        for agent in agents:
+            agent.policy = self
+    
+    def close(self):
+        """Release the rollout worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+    
+    def rollouts_per_second(self) -> float:
+        """Rollout throughput over all decisions so far."""
+        return self.total_rollouts / self.total_seconds if self.total_seconds else 0.0
+    
+    def decide(
+        self,
+        agent: BaseAgent,
+        world_state: WorldState,
+        other_agents: List[BaseAgent],
+        rng=random
+    ) -> Tuple[ActionType, Optional[BaseAgent]]:
+        """
+        Decide one agent's action by planning.
+        
+        Consumes one draw of rng (the rollout seeds); rollouts draw from
+        RNGs of their own.
+        
+        Args:
+            agent: Deciding agent
+            world_state: Current state of the world
+            other_agents: Living agents it may target
+            rng: Source of the rollout seeds
+        
+        Returns:
+            Tuple of (action_type, target_agent)
+        """
+        targets = other_agents
+        if len(targets) > self.max_targets:
+            matrix = world_state.relationship_matrix
+            targets = sorted(
+                targets,
+                key=lambda other: -sum(map(abs, matrix.get_relationship(agent, other).values()))
+            )[:self.max_targets]
+        candidates: List[Candidate] = [(ActionType.HIDE, None)]
+        candidates += [(action, other.name) for action in TARGETED for other in targets]
+        base_seed = rng.getrandbits(32)
+        
+        # Root of every rollout: the world without planners, so rollouts don't recurse
+        root = world_state.fork()
+        for clone in root.agents:
+            if isinstance(clone.policy, RolloutPlanner):
+                clone.policy = None
+        
+        start = time.perf_counter()
+        deadline = start + self.time_budget if self.time_budget is not None else None
+        totals = [0.0] * len(candidates)
+        counts = [0] * len(candidates)
+        if self.workers > 0:
+            self._search_pool(root, agent.name, candidates, base_seed, totals, counts, deadline)
+        else:
+            for _ in range(self.rollouts):
+                i = self._select(totals, counts, counts)
+                totals[i] += rollout(root, agent.name, candidates[i], base_seed + counts[i],
+                                     self.depth, self.turn_mode, self.value)
+                counts[i] += 1
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+        
+        done = sum(counts)
+        self.total_rollouts += done
+        self.total_seconds += time.perf_counter() - start
+        self.last_values = {
+            candidate: (totals[i] / counts[i], counts[i])
+            for i, candidate in enumerate(candidates) if counts[i]
+        }
+        best = max(
+            (i for i in range(len(candidates)) if counts[i]),
+            key=lambda i: totals[i] / counts[i]
+        )
+        action, target_name = candidates[best]
+        by_name = {other.name: other for other in targets}
+        return (action, by_name.get(target_name))
+    
+    def decide_all(
+        self,
+        world_state: WorldState,
+        agents: List[BaseAgent],
+        candidates: Optional[List[List[BaseAgent]]] = None,
+        rng=random
+    ) -> List[Tuple[ActionType, Optional[BaseAgent]]]:
+        """
+        Decide for several agents, one after another.
+        
+        Args:
+            world_state: Current state of the world
+            agents: Deciding agents
+            candidates: Optional targets of each agent (all other living
+                agents if None)
+            rng: Source of the rollout seeds
+        
+        Returns:
+            One (action_type, target_agent) per agent
+        """
+        decisions = []
+        for i, agent in enumerate(agents):
+            others = candidates[i] if candidates is not None else [
+                other for other in agents if other is not agent
+            ]
+            others = [other for other in others if other.state.is_alive]
+            decisions.append(self.decide(agent, world_state, others, rng) if others else (ActionType.HIDE, None))
+        return decisions
+    
+    def _select(self, totals: List[float], counts: List[int], pending: List[int]) -> int:
+        """Arm with the highest UCB1 score; arms without any rollout come first."""
+        for i, n in enumerate(pending):
+            if n == 0:
+                return i
+        log_total = math.log(sum(pending))
+        return max(
+            range(len(totals)),
+            key=lambda i: (totals[i] / counts[i] if counts[i] else 0.0)
+            + self.exploration * math.sqrt(log_total / pending[i])
+        )
+    
+    def _search_pool(
+        self,
+        root: WorldState,
+        name: str,
+        candidates: List[Candidate],
+        base_seed: int,
+        totals: List[float],
+        counts: List[int],
+        deadline: Optional[float]
+    ):
+        """
+        Spend the budget on the worker pool in waves.
+        
+        Each wave assigns a few rollouts per worker by UCB1, counting the
+        rollouts already assigned as pending so a wave spreads over arms.
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._decisions += 1
+        payload = pickle.dumps(root)
+        per_task = 4
+        remaining = self.rollouts
+        while remaining > 0:
+            pending = list(counts)
+            tasks = []
+            for _ in range(self.workers):
+                jobs = []
+                for _ in range(min(per_task, remaining)):
+                    i = self._select(totals, counts, pending)
+                    jobs.append((i, base_seed + pending[i]))
+                    pending[i] += 1
+                    remaining -= 1
+                if jobs:
+                    tasks.append((jobs, self._pool.submit(
+                        _rollout_chunk, self._decisions, payload, name,
+                        [(candidates[i], seed) for i, seed in jobs],
+                        self.depth, self.turn_mode, self.value
+                    )))
+            for jobs, future in tasks:
+                for (i, _), result in zip(jobs, future.result()):
+                    totals[i] += result
+                    counts[i] += 1
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
@@ -0,0 +1,289 @@
+"""One scheduler thread that drives many auto-running simulations."""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+from .simulation_loop import SimulationLoop
+from .pipeline import TurnPipeline
+
+
+# Run states
+RUNNING = "running"
+PAUSED = "paused"
+STOPPED = "stopped"
+FINISHED = "finished"
+FAILED = "failed"
+
+# Half-life in seconds of the recent CPU use that orders due runs
+USAGE_HALF_LIFE = 1.0
+
+
+class ScheduledRun:
+    """An auto-running simulation driven by a Scheduler (see Scheduler.start())."""
+    
+    def __init__(
+        self,
+        run_id: int,
+        simulation: Union[SimulationLoop, TurnPipeline],
+        turn_delay: float,
+        max_turns: Optional[int],
+        lock: Optional[threading.Lock]
+    ):
+        self.id = run_id
+        self.simulation = simulation
+        self.turn_delay = turn_delay
+        self.max_turns = max_turns
+        # Held while a turn is played (e.g. shared with manual stepping)
+        self.lock = lock or threading.Lock()
+        self.state = RUNNING
+        self.turns_run = 0
+        self.cpu_seconds = 0.0
+        # Recent CPU use decayed by USAGE_HALF_LIFE, kept as
+        # log2(use at t) + t / USAGE_HALF_LIFE so it orders runs the same at any t
+        self._rank = -math.inf
+        self.error: Optional[str] = None
+        # Bumped on pause/stop so stale timer entries are skipped
+        self._generation = 0
+        self._in_flight = False
+    
+    @property
+    def active(self) -> bool:
+        """True while the run is running or paused."""
+        return self.state in (RUNNING, PAUSED)
+    
+    def charge(self, seconds: float, now: float):
+        """Add CPU time used by a turn that ended at `now`."""
+        self.cpu_seconds += seconds
+        usage = 2.0 ** (self._rank - now / USAGE_HALF_LIFE) + seconds
+        if usage > 0.0:
+            self._rank = math.log2(usage) + now / USAGE_HALF_LIFE
+    
+    def status(self) -> Dict:
+        """Get a JSON-ready summary of the run."""
+        return {
+            'id': self.id,
+            'state': self.state,
+            'turn': self.simulation.world_state.turn_number,
+            'turns_run': self.turns_run,
+            'max_turns': self.max_turns,
+            'turn_delay': self.turn_delay,
+            'cpu_seconds': self.cpu_seconds,
+            'error': self.error,
+        }
+
+
+class Scheduler:
+    """
+    Drives any number of auto-running simulations from one thread.
+    
+    Each run is due `turn_delay` seconds after its previous turn finished.
+    One dispatcher thread sleeps on a timer heap until the next run is due
+    and hands due turns to a small worker pool, so idle runs cost a heap
+    entry instead of a sleeping thread. A run never has more than one turn
+    in flight.
+    
+    Scheduling is fair: when more runs are due than workers are free, the
+    runs that have used the least CPU lately go first, so a fast-forwarding
+    run (turn_delay 0) only gets the time the others leave. Use decays with
+    a half-life of USAGE_HALF_LIFE, so one slow turn doesn't hold a run back
+    for long. With `cpu_limit`,
+    a token bucket holds turns back whenever the process has used more
+    than that many cores' worth of CPU per second, dispatch overhead
+    included.
+    """
+    
+    def __init__(self, workers: int = 2, cpu_limit: Optional[float] = None):
+        """
+        Initialize the scheduler (its threads start with the first run).
+        
+        Args:
+            workers: Threads playing turns
+            cpu_limit: Maximum CPU seconds per second for the process while
+                runs are due (e.g. 0.5 for half a core); unlimited if None
+        """
+        self.workers = workers
+        self.cpu_limit = cpu_limit
+        self._cond = threading.Condition()
+        self._runs: Dict[int, ScheduledRun] = {}
+        self._ids = itertools.count(1)
+        self._order = itertools.count()
+        # Runs waiting for their next turn: (due time, tie-break, run, generation)
+        self._timers: List = []
+        # Due runs waiting for a worker: (recent CPU use, tie-break, run, generation)
+        self._ready: List = []
+        self._busy = 0
+        # Token bucket in CPU seconds: refilled at cpu_limit per second,
+        # drained by the CPU time the process used
+        self._budget = 0.0
+        self._refilled = time.monotonic()
+        self._cpu_mark = time.process_time()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+    
+    def start(
+        self,
+        simulation: Union[SimulationLoop, TurnPipeline],
+        turn_delay: float = 0.5,
+        max_turns: Optional[int] = None,
+        lock: Optional[threading.Lock] = None
+    ) -> ScheduledRun:
+        """
+        Start auto-running a simulation; its first turn is due at once.
+        
+        Args:
+            simulation: Simulation to drive, or a TurnPipeline playing one
+                back from turns computed ahead
+            turn_delay: Seconds between the end of a turn and the next one
+            max_turns: Turns to play before the run finishes (unlimited if None)
+            lock: Lock held while a turn is played, e.g. to keep manual steps
+                from overlapping scheduled ones
+        
+        Returns:
+            The run, for pause(), resume(), stop() and status()
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is shut down")
+            run = ScheduledRun(next(self._ids), simulation, turn_delay, max_turns, lock)
+            self._runs[run.id] = run
+            self._schedule(run, time.monotonic())
+            if self._thread is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hamlet-run")
+                self._thread = threading.Thread(target=self._dispatch, name="hamlet-scheduler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return run
+    
+    def pause(self, run: ScheduledRun):
+        """Stop scheduling a run's turns until resume() (a turn in flight finishes)."""
+        with self._cond:
+            if run.state == RUNNING:
+                run.state = PAUSED
+                run._generation += 1
+    
+    def resume(self, run: ScheduledRun):
+        """Continue a paused run; its next turn is due at once."""
+        with self._cond:
+            if run.state == PAUSED:
+                run.state = RUNNING
+                if not run._in_flight:
+                    self._schedule(run, time.monotonic())
+                self._cond.notify()
+    
+    def stop(self, run: ScheduledRun):
+        """Stop a run for good and forget it."""
+        with self._cond:
+            if run.active:
+                run.state = STOPPED
+                run._generation += 1
+            self._runs.pop(run.id, None)
+    
+    def get_run(self, run_id: int) -> Optional[ScheduledRun]:
+        """Get a run by id (None once it stopped, finished or failed)."""
+        with self._cond:
+            return self._runs.get(run_id)
+    
+    def runs(self) -> List[ScheduledRun]:
+        """Get every run that is running or paused."""
+        with self._cond:
+            return list(self._runs.values())
+    
+    def shutdown(self):
+        """Stop every run and the scheduler's threads (a turn in flight finishes)."""
+        with self._cond:
+            self._closed = True
+            for run in self._runs.values():
+                run.state = STOPPED
+                run._generation += 1
+            self._runs.clear()
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._pool.shutdown(wait=True)
+    
+    def _schedule(self, run: ScheduledRun, due: float):
+        """Add a timer entry for a run's next turn (caller holds the lock)."""
+        heapq.heappush(self._timers, (due, next(self._order), run, run._generation))
+    
+    def _refill(self, now: float):
+        """Settle the CPU budget since the last refill (caller holds the lock)."""
+        if self.cpu_limit is not None:
+            cpu = time.process_time()
+            # A small burst allowance lets short turns go out back to back
+            self._budget = min(
+                self._budget + (now - self._refilled) * self.cpu_limit - (cpu - self._cpu_mark),
+                0.1 * self.cpu_limit
+            )
+            self._cpu_mark = cpu
+        self._refilled = now
+    
+    def _dispatch(self):
+        """Dispatcher thread: hand due turns to the pool, fairest first."""
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                self._refill(now)
+                # Due runs move to the ready queue, ordered by their recent CPU use
+                while self._timers and self._timers[0][0] <= now:
+                    _, order, run, generation = heapq.heappop(self._timers)
+                    heapq.heappush(self._ready, (run._rank, order, run, generation))
+                
+                wait = None
+                while self._ready and self._busy < self.workers:
+                    if self.cpu_limit is not None and self._budget < 0.0:
+                        wait = -self._budget / self.cpu_limit
+                        break
+                    _, _, run, generation = heapq.heappop(self._ready)
+                    if generation != run._generation or run.state != RUNNING:
+                        continue
+                    run._in_flight = True
+                    self._busy += 1
+                    self._pool.submit(self._play, run, generation)
+                
+                if self._timers and not self._ready:
+                    # Otherwise a finishing turn or the budget wakes us up
+                    delay = self._timers[0][0] - now
+                    wait = delay if wait is None else min(wait, delay)
+                self._cond.wait(wait)
+    
+    def _play(self, run: ScheduledRun, generation: int):
+        """Worker: play one turn of a run, then schedule its next one."""
+        # CPU time of this thread, so waiting for the GIL isn't charged to the run
+        start = time.thread_time()
+        played = False
+        error = None
+        try:
+            with run.lock:
+                # Skip the turn if the run was paused or stopped since dispatch
+                if generation == run._generation:
+                    run.simulation.step()
+                    played = True
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.thread_time() - start
+        
+        with self._cond:
+            now = time.monotonic()
+            self._busy -= 1
+            run._in_flight = False
+            run.charge(elapsed, now)
+            run.turns_run += played
+            living = len(run.simulation.world_state.get_living_agents())
+            if error is not None:
+                run.state = FAILED
+                run.error = error
+            elif run.state == RUNNING and (
+                living < 2 or (run.max_turns is not None and run.turns_run >= run.max_turns)
+            ):
+                run.state = FINISHED
+            if run.state == RUNNING:
+                # Also covers a resume() while this turn was in flight
+                self._schedule(run, now + run.turn_delay)
+            elif run.state != PAUSED:
+                self._runs.pop(run.id, None)
+            self._cond.notify()
@@ -0,0 +1,342 @@
+"""Sharded execution of one large world across worker processes."""
+
+import multiprocessing
+import pickle
+import random
+from typing import Dict, List, Optional, Set, Tuple
+from ..agents.base_agent import BaseAgent, ActionType
+from ..agents.memory import AgentMemory
+from ..world.world_state import WorldState
+from ..world.relationship_matrix import RelationshipMatrix
+from ..events.event_log import EventLog
+from ..events.event import Event
+from .decision_engine import DecisionEngine
+from .simulation_loop import RESOLUTION_ORDER
+
+
+# (agent_name, action value, target name or None)
+Decision = Tuple[str, str, Optional[str]]
+
+# Per-agent state shipped to replicas
+AGENT_FIELDS = ("mood", "health", "suspicion_level", "is_alive", "is_hidden")
+
+
+class ShardWorker:
+    """
+    Owns one shard (court) of agents and decides for them.
+    
+    The worker keeps a partial replica of the world: every agent's state,
+    but only the relationship rows of its own agents (plus the cells their
+    archetypes watch, see BaseAgent.watched_pairs) and only its own agents'
+    memories, kept in sync by the updates sent with every turn. It draws
+    its decisions from its own RNG stream.
+    """
+    
+    def __init__(
+        self,
+        agents_bytes: bytes,
+        agent_names: List[str],
+        cells: Dict[Tuple[str, str], Tuple[float, ...]],
+        seed: int
+    ):
+        """
+        Initialize a shard worker.
+        
+        Args:
+            agents_bytes: Pickled list of every agent
+            agent_names: Names of the agents this shard decides for
+            cells: Relationship cells this shard reads, in CHANNELS order
+            seed: Seed of this shard's RNG stream
+        """
+        agents = pickle.loads(agents_bytes)
+        matrix = RelationshipMatrix.from_cells(
+            (name1, name2, values) for (name1, name2), values in cells.items()
+        )
+        self.world_state = WorldState(agents, matrix)
+        self._agents = {agent.name: agent for agent in agents}
+        self._own = set(agent_names)
+        rng = random.Random(seed)
+        self._rng_state = rng.getstate()
+    
+    def run_turn(
+        self,
+        turn: int,
+        order: List[str],
+        cells: Dict[Tuple[str, str], Tuple[float, ...]],
+        agent_states: Dict[str, Tuple],
+        memories: Dict[str, AgentMemory]
+    ) -> List[Decision]:
+        """
+        Apply the coordinator's updates, then decide for this shard's agents.
+        
+        Args:
+            turn: Turn number being played
+            order: Names of the agents alive at turn start, in acting order
+            cells: Changed relationship cells this shard reads
+            agent_states: Agent states changed since the previous turn
+            memories: Changed memories of this shard's agents
+        
+        Returns:
+            Decisions of this shard's agents, in acting order
+        """
+        self.world_state.turn_number = turn
+        self.world_state.relationship_matrix.set_cells(cells)
+        for name, values in agent_states.items():
+            state = self._agents[name].state
+            for field, value in zip(AGENT_FIELDS, values):
+                setattr(state, field, value)
+        for name, memory in memories.items():
+            self._agents[name].memory = memory
+        
+        # Agent policies draw from the module RNG; swap in this shard's stream
+        outer_state = random.getstate()
+        random.setstate(self._rng_state)
+        try:
+            living = [self._agents[name] for name in order]
+            decisions = []
+            for agent in living:
+                if agent.name not in self._own:
+                    continue
+                other_agents = [a for a in living if a is not agent]
+                action, target = agent.decide_action(self.world_state, other_agents)
+                decisions.append((agent.name, action.value, target.name if target else None))
+        finally:
+            self._rng_state = random.getstate()
+            random.setstate(outer_state)
+        return decisions
+
+
+def _worker_main(conn, agents_bytes: bytes, agent_names: List[str], cells: Dict, seed: int):
+    """Serve run_turn requests for one shard until told to stop."""
+    worker = ShardWorker(agents_bytes, agent_names, cells, seed)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        conn.send(worker.run_turn(*message))
+    conn.close()
+
+
+class ShardedSimulation:
+    """
+    Runs one world with its population split into shards.
+    
+    Every turn is played in simultaneous-move fashion: each shard decides for
+    its own agents against the turn-start world, the coordinator gathers all
+    decisions, resolves them in RESOLUTION_ORDER through the batch
+    DecisionEngine API, and ships the changed agent states, plus the changed
+    relationship cells and memories the shard reads, back to every shard
+    with the next turn's request. Shards run as worker processes talking
+    over pipes, or in-process with exactly the same messages and RNG
+    streams, so a given seed plays out identically either way.
+    
+    A shard only holds the relationship rows of its own agents, so its
+    matrix shrinks with the number of shards; the coordinator keeps the
+    whole matrix and resolves actions serially. Not supported: locations
+    (every agent considers the whole court), relationship history, and
+    policies that read relationship cells outside their agent's row unless
+    the archetype lists them in watched_pairs.
+    """
+    
+    def __init__(
+        self,
+        agents: List[BaseAgent],
+        num_shards: Optional[int] = None,
+        processes: bool = True,
+        seed: Optional[int] = None,
+        event_log: Optional[EventLog] = None,
+        verbose: bool = False
+    ):
+        """
+        Initialize a sharded simulation.
+        
+        Args:
+            agents: List of agents in the simulation
+            num_shards: Number of shards (defaults to the CPU count)
+            processes: If True, run each shard in its own process
+            seed: Seed for the coordinator and shard RNG streams
+            event_log: Optional event log (creates one if None)
+            verbose: If True, print every event as it happens
+        """
+        self.world_state = WorldState(agents)
+        self.event_log = event_log or EventLog()
+        self.decision_engine = DecisionEngine(self.world_state)
+        self.num_shards = max(1, min(num_shards or multiprocessing.cpu_count(), len(agents)))
+        self.processes = processes
+        self.verbose = verbose
+        
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self._rng_state = random.Random(self.seed).getstate()
+        
+        # Contiguous blocks of agents form the courts owned by each shard
+        block = -(-len(agents) // self.num_shards)
+        self.shards = [
+            [agent.name for agent in agents[i:i + block]]
+            for i in range(0, len(agents), block)
+        ]
+        self.num_shards = len(self.shards)
+        
+        self._workers: List[ShardWorker] = []
+        self._pipes = []
+        self._processes = []
+        self._tracker = None
+        self._sent_states: Dict[str, Tuple] = {}
+        self._sent_memories: Dict[str, int] = {}
+        # Relationship cells each shard's replica started with
+        self.replica_cells: List[int] = []
+        # {agent name: shard index}, and per shard the cells it reads
+        # outside its own rows
+        self._shard_of = {name: i for i, names in enumerate(self.shards) for name in names}
+        self._watched: List[Set[Tuple[str, str]]] = [set() for _ in self.shards]
+        names = set(self._shard_of)
+        for agent in agents:
+            for pair in agent.watched_pairs:
+                if pair[0] in names and pair[1] in names:
+                    self._watched[self._shard_of[agent.name]].add(pair)
+    
+    def _reads(self, shard: int, pair: Tuple[str, str]) -> bool:
+        """Whether a shard's replica holds a relationship cell."""
+        return self._shard_of.get(pair[0]) == shard or pair in self._watched[shard]
+    
+    def _start(self):
+        """Snapshot the world into every shard and start the workers."""
+        matrix = self.world_state.relationship_matrix
+        agents_bytes = pickle.dumps(self.world_state.agents)
+        self._tracker = matrix.track_changes()
+        self._sent_states = {
+            agent.name: self._agent_state(agent) for agent in self.world_state.agents
+        }
+        self._sent_memories = {agent.name: agent.memory.version for agent in self.world_state.agents}
+        pairs = matrix.pairs()
+        for shard_id, names in enumerate(self.shards):
+            seed = self.seed * 1000 + shard_id + 1
+            cells = matrix.get_cells(pair for pair in pairs if self._reads(shard_id, pair))
+            self.replica_cells.append(len(cells))
+            if self.processes:
+                parent, child = multiprocessing.Pipe()
+                process = multiprocessing.Process(
+                    target=_worker_main,
+                    args=(child, agents_bytes, names, cells, seed),
+                    daemon=True
+                )
+                process.start()
+                child.close()
+                self._pipes.append(parent)
+                self._processes.append(process)
+            else:
+                self._workers.append(ShardWorker(agents_bytes, names, cells, seed))
+    
+    @staticmethod
+    def _agent_state(agent: BaseAgent) -> Tuple:
+        """Agent state as the tuple shipped to replicas."""
+        return tuple(getattr(agent.state, field) for field in AGENT_FIELDS)
+    
+    def _collect_updates(self) -> List[Tuple[Dict, Dict, Dict]]:
+        """
+        Gather each shard's updates since the last turn.
+        
+        Returns:
+            Per shard: (changed cells it reads, changed agent states, changed
+            memories of its agents)
+        """
+        updates = [({}, {}, {}) for _ in self.shards]
+        cells = self.world_state.relationship_matrix.get_cells(self._tracker)
+        self._tracker.clear()
+        for pair, values in cells.items():
+            shard = self._shard_of.get(pair[0])
+            if shard is not None:
+                updates[shard][0][pair] = values
+            for i, watched in enumerate(self._watched):
+                if pair in watched and i != shard:
+                    updates[i][0][pair] = values
+        
+        agent_states = {}
+        for agent in self.world_state.agents:
+            state = self._agent_state(agent)
+            if self._sent_states.get(agent.name) != state:
+                agent_states[agent.name] = state
+                self._sent_states[agent.name] = state
+            if agent.memory.version != self._sent_memories.get(agent.name):
+                self._sent_memories[agent.name] = agent.memory.version
+                updates[self._shard_of[agent.name]][2][agent.name] = agent.memory.fork()
+        for _, states, _ in updates:
+            states.update(agent_states)
+        return updates
+    
+    def step(self) -> List[Event]:
+        """
+        Execute one turn and return events.
+        
+        Returns:
+            List of events from this turn
+        """
+        if not self._workers and not self._pipes:
+            self._start()
+        
+        outer_state = random.getstate()
+        random.setstate(self._rng_state)
+        try:
+            self.world_state.advance_turn()
+            living = self.world_state.get_living_agents()
+            random.shuffle(living)
+            order = [agent.name for agent in living]
+            
+            # Decision phase: one request and one reply per shard
+            turn = self.world_state.turn_number
+            messages = [(turn, order) + update for update in self._collect_updates()]
+            if self.processes:
+                for conn, message in zip(self._pipes, messages):
+                    conn.send(message)
+                replies = [conn.recv() for conn in self._pipes]
+            else:
+                replies = [worker.run_turn(*message) for worker, message in zip(self._workers, messages)]
+            
+            # Resolution phase on the authoritative world
+            by_name = {agent.name: agent for agent in living}
+            position = {name: i for i, name in enumerate(order)}
+            decisions = [decision for reply in replies for decision in reply]
+            decisions.sort(key=lambda d: position[d[0]])
+            actions = [
+                (by_name[name], ActionType(action), by_name[target] if target else None)
+                for name, action, target in decisions
+            ]
+            actions.sort(key=lambda a: RESOLUTION_ORDER.get(a[1], len(RESOLUTION_ORDER)))
+            events = self.decision_engine.process_actions(actions)
+        finally:
+            self._rng_state = random.getstate()
+            random.setstate(outer_state)
+        
+        for event in events:
+            self.event_log.add_event(event)
+            if self.verbose:
+                print(event.to_string())
+        self.event_log.end_turn(self.world_state, self._rng_state)
+        return events
+    
+    def run(self, max_turns: int):
+        """Run until the turn limit or until fewer than two agents are alive."""
+        while self.world_state.turn_number < max_turns:
+            self.step()
+            if len(self.world_state.get_living_agents()) < 2:
+                break
+    
+    def close(self):
+        """Stop the shard workers."""
+        for conn in self._pipes:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+        for process in self._processes:
+            process.join(timeout=5)
+        if self._tracker is not None:
+            self.world_state.relationship_matrix.untrack_changes(self._tracker)
+        self._pipes, self._processes, self._workers = [], [], []
+        self._tracker = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
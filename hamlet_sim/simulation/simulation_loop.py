@@ -1,14 +1,36 @@
 """Main simulation loop for the Hamlet game."""
 
-from typing import List, Optional
-from ..agents.base_agent import BaseAgent
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from ..agents.base_agent import BaseAgent, ActionType
 from ..world.world_state import WorldState
+from ..world.relationship_history import RelationshipHistory
+from ..world.locations import LocationMap
 from ..events.event_log import EventLog
 from ..events.event import Event
 from .decision_engine import DecisionEngine
+import random
 import time
 
 
+# Turn modes
+SEQUENTIAL = "sequential"
+SIMULTANEOUS = "simultaneous"
+
+# Order in which simultaneous actions are resolved: quiet and protective
+# actions land before hostile ones, violence last. Ties keep the shuffled order.
+RESOLUTION_ORDER = {
+    ActionType.HIDE: 0,
+    ActionType.DEFEND: 1,
+    ActionType.TALK_TO: 2,
+    ActionType.SPY_ON: 3,
+    ActionType.SCHEME: 4,
+    ActionType.ACCUSE: 5,
+    ActionType.BETRAY: 6,
+    ActionType.ATTACK: 7,
+}
+
+
 class SimulationLoop:
     """Main simulation loop that runs the game."""
     
@@ -17,7 +39,14 @@ class SimulationLoop:
         agents: List[BaseAgent],
         event_log: Optional[EventLog] = None,
         auto_mode: bool = False,
-        turn_delay: float = 1.0
+        turn_delay: float = 1.0,
+        relationship_history: Optional[RelationshipHistory] = None,
+        turn_mode: str = SEQUENTIAL,
+        decision_workers: int = 0,
+        verbose: bool = True,
+        world_state: Optional[WorldState] = None,
+        locations: Optional[LocationMap] = None,
+        rng=None
     ):
         """
         Initialize simulation loop.
@@ -27,14 +56,53 @@ class SimulationLoop:
             event_log: Optional event log (creates one if None)
             auto_mode: If True, runs automatically without pauses
             turn_delay: Delay between turns in seconds (for auto mode)
+            relationship_history: Optional store that records relationship
+                changes every turn (disabled if None)
+            turn_mode: "sequential" (each agent sees earlier agents' actions)
+                or "simultaneous" (everyone decides on the turn-start world,
+                then all actions are resolved together)
+            decision_workers: Threads used for the simultaneous decision
+                phase (0 decides in the calling thread)
+            verbose: If True, print every event as it happens
+            world_state: Prebuilt world for these agents (e.g. from a
+                scenario); one is created if None
+            locations: Optional room map; when given, agents wander between
+                rooms every turn and only consider agents in their own room
+            rng: Source of every random draw of a turn, e.g. a
+                random.Random (the random module if None)
         """
-        self.world_state = WorldState(agents)
+        if turn_mode not in (SEQUENTIAL, SIMULTANEOUS):
+            raise ValueError(f"Unknown turn mode: {turn_mode}")
+        self.world_state = world_state or WorldState(agents)
+        if locations is not None:
+            self.world_state.locations = locations
         self.event_log = event_log or EventLog()
         self.auto_mode = auto_mode
         self.turn_delay = turn_delay
         self.decision_engine = DecisionEngine(self.world_state)
+        self.rng = rng if rng is not None else random
         self.is_running = False
         self.max_turns = 50  # TODO: Make configurable
+        self.relationship_history = relationship_history
+        if relationship_history is not None:
+            # A resumed world's current values date from its turn, not turn 0
+            relationship_history.attach(
+                self.world_state.relationship_matrix, self.world_state.turn_number
+            )
+        self.turn_mode = turn_mode
+        self.decision_workers = decision_workers
+        self.verbose = verbose
+        self._decision_pool: Optional[ThreadPoolExecutor] = None
+    
+    @property
+    def rng(self):
+        """Source of every random draw of a turn."""
+        return self._rng
+    
+    @rng.setter
+    def rng(self, rng):
+        self._rng = rng
+        self.decision_engine.rng = rng
     
     def run(self, max_turns: Optional[int] = None):
         """
@@ -68,37 +136,140 @@ class SimulationLoop:
     
     def _run_turn(self):
         """Execute one turn of the simulation."""
+        if self.relationship_history is not None:
+            # Changes made between turns (setup, interventions) belong to the last turn
+            self.relationship_history.record_turn(self.world_state.turn_number)
+        
         self.world_state.advance_turn()
         
         # Get all living agents
         living_agents = self.world_state.get_living_agents()
         
         # Shuffle for random order
-        import random
-        random.shuffle(living_agents)
+        self.rng.shuffle(living_agents)
+        
+        if self.world_state.locations is not None:
+            self.world_state.locations.wander(living_agents, self.rng)
+        
+        if self.turn_mode == SIMULTANEOUS:
+            turn_events = self._run_simultaneous(living_agents)
+        else:
+            turn_events = self._run_sequential(living_agents)
         
-        # Each agent decides and acts
+        if self.relationship_history is not None:
+            self.relationship_history.record_turn(self.world_state.turn_number)
+        self.event_log.end_turn(self.world_state, self.rng.getstate())
+        
+        return turn_events
+    
+    def _run_sequential(self, living_agents: List[BaseAgent]) -> List[Event]:
+        """Let agents decide and act one after another."""
         turn_events = []
         for agent in living_agents:
             if not agent.state.is_alive:
                 continue
             
-            # Get other agents (excluding self)
-            other_agents = [a for a in living_agents if a != agent]
-            
             # Agent decides action
-            action, target = agent.decide_action(self.world_state, other_agents)
+            action, target = agent.decide_action(
+                self.world_state, self._candidates(agent, living_agents), self.rng
+            )
             
             # Process action
-            event = self.decision_engine.process_action(agent, action, target)
-            turn_events.append(event)
-            self.event_log.add_event(event)
-            
-            # Print action
-            print(event.to_string())
+            turn_events.append(self._record(agent, action, target))
+        
+        return turn_events
+    
+    def _run_simultaneous(self, living_agents: List[BaseAgent]) -> List[Event]:
+        """
+        Let every agent decide on the turn-start world, then resolve all actions.
+        
+        Nothing is mutated during the decision phase, so every decision sees
+        the same frozen world. Actions are then resolved in RESOLUTION_ORDER;
+        an action is dropped if its agent or target died earlier in the turn.
+        Relationship effects are applied as one batch.
+        """
+        decisions = self._decide_all(living_agents)
+        
+        order = sorted(
+            range(len(decisions)),
+            key=lambda i: RESOLUTION_ORDER.get(decisions[i][1], len(RESOLUTION_ORDER))
+        )
+        
+        turn_events = self.decision_engine.process_actions(
+            [decisions[i] for i in order]
+        )
+        for event in turn_events:
+            self._log(event)
         
         return turn_events
     
+    def _decide_all(
+        self,
+        living_agents: List[BaseAgent]
+    ) -> List[Tuple[BaseAgent, ActionType, Optional[BaseAgent]]]:
+        """
+        Collect every living agent's decision without applying any of them.
+        
+        On decision_workers threads each agent decides with its own
+        random.Random, seeded from the turn's rng in turn order, so a seeded
+        run makes the same decisions however the threads interleave (and
+        whatever their number). Inline decisions draw from the turn's rng
+        directly, as seeding a stream per agent would cost more than most
+        decisions. The policies are pure Python and hold the GIL, so the
+        threads do not speed them up (`benchmark.py turn-modes`: about 250
+        turns/s of 50 agents with one worker against 385 inline); they only
+        pay off for policies that release it.
+        """
+        policy = living_agents[0].policy if living_agents else None
+        if policy is not None and all(agent.policy is policy for agent in living_agents):
+            # One shared policy (e.g. UtilityPolicy) decides for everyone at once
+            candidates = None
+            if self.world_state.locations is not None:
+                candidates = [self._candidates(agent, living_agents) for agent in living_agents]
+            decisions = policy.decide_all(self.world_state, living_agents, candidates, self.rng)
+            return [(agent,) + decision for agent, decision in zip(living_agents, decisions)]
+        
+        def decide(agent: BaseAgent, rng=self.rng):
+            other_agents = self._candidates(agent, living_agents)
+            action, target = agent.decide_action(self.world_state, other_agents, rng)
+            return (agent, action, target)
+        
+        if self.decision_workers > 0 and len(living_agents) > 1:
+            if self._decision_pool is None:
+                self._decision_pool = ThreadPoolExecutor(
+                    max_workers=self.decision_workers,
+                    thread_name_prefix="hamlet-decide"
+                )
+            streams = [random.Random(self.rng.getrandbits(64)) for _ in living_agents]
+            return list(self._decision_pool.map(decide, living_agents, streams))
+        
+        return [decide(agent) for agent in living_agents]
+    
+    def _candidates(self, agent: BaseAgent, living_agents: List[BaseAgent]) -> List[BaseAgent]:
+        """Agents `agent` may act on: its room's occupants, or everyone else alive."""
+        if self.world_state.locations is not None:
+            return self.world_state.locations.co_located(agent)
+        return [a for a in living_agents if a != agent]
+    
+    def _record(
+        self,
+        agent: BaseAgent,
+        action: ActionType,
+        target: Optional[BaseAgent]
+    ) -> Event:
+        """Apply an action, log it and return its event."""
+        event = self.decision_engine.process_action(agent, action, target)
+        self._log(event)
+        return event
+    
+    def _log(self, event: Event):
+        """Add an event to the log and print it."""
+        self.event_log.add_event(event)
+        
+        # Print action
+        if self.verbose:
+            print(event.to_string())
+    
     def step(self) -> List[Event]:
         """
         Execute one turn and return events.
@@ -112,6 +283,12 @@ class SimulationLoop:
         """Stop the simulation."""
         self.is_running = False
     
+    def close(self):
+        """Release the decision worker pool, if one was started."""
+        if self._decision_pool is not None:
+            self._decision_pool.shutdown(wait=True)
+            self._decision_pool = None
+    
     def get_summary(self) -> str:
         """Get a summary of the current state."""
         living = self.world_state.get_living_agents()
@@ -132,5 +309,10 @@ class SimulationLoop:
         for agent1, agent2 in conflicts:
             summary.append(f"  {agent1.name} <-> {agent2.name}")
         
+        factions = self.world_state.get_factions()
+        summary.append(f"\nFactions: {len(factions)}")
+        for faction in factions:
+            summary.append(f"  {faction['leader']}'s faction: {', '.join(faction['members'])}")
+        
         return "\n".join(summary)
 
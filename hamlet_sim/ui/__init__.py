@@ -1,7 +1,13 @@
 """UI module for Hamlet simulation game."""
 
 from .cli_ui import CLIUI
-from .web_ui import WebUI
 
 __all__ = ['CLIUI', 'WebUI']
 
+
+def __getattr__(name):
+    # The web UI needs Flask; only import it when it is actually asked for
+    if name == 'WebUI':
+        from .web_ui import WebUI
+        return WebUI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
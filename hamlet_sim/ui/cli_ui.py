@@ -90,6 +90,17 @@ class CLIUI:
         else:
             print("  No conflicts detected.")
     
+    def display_factions(self):
+        """Display factions (connected groups of allies)."""
+        factions = self.world_state.get_factions()
+        print(f"\n=== FACTIONS ({len(factions)}) ===")
+        if factions:
+            for faction in factions:
+                print(f"  {faction['leader']}'s faction ({faction['size']}): "
+                      f"{', '.join(faction['members'])}")
+        else:
+            print("  No factions detected.")
+    
     def display_recent_events(self, count: int = 10):
         """Display recent events."""
         events = self.event_log.get_recent_events(count)
@@ -97,6 +108,32 @@ class CLIUI:
         for event in events:
             print(f"  {event.to_string()}")
     
+    def display_stats(self, agent_name: Optional[str] = None):
+        """Display event statistics for one agent or the whole run."""
+        stats = self.event_log.stats
+        if agent_name:
+            print(f"\n=== STATISTICS: {agent_name} ===")
+            mix = stats.action_mix(agent_name)
+            if not mix:
+                print("  No actions recorded.")
+                return
+            print("  Actions:")
+            for action, count in sorted(mix.items(), key=lambda item: -item[1]):
+                print(f"    {action}: {count}")
+            targets = stats.by_agent_target.get(agent_name, {})
+            if targets:
+                print("  Targets:")
+                for target, count in sorted(targets.items(), key=lambda item: -item[1]):
+                    print(f"    {target}: {count}")
+        else:
+            print(f"\n=== STATISTICS ({stats.total} events) ===")
+            for name, mix in stats.by_agent_action.items():
+                actions = ", ".join(
+                    f"{action} {count}"
+                    for action, count in sorted(mix.items(), key=lambda item: -item[1])
+                )
+                print(f"  {name}: {actions}")
+    
     def display_turn_summary(self):
         """Display summary of current turn."""
         print(self.simulation.get_summary())
@@ -114,7 +151,9 @@ class CLIUI:
         print("6. Display conflicts")
         print("7. Display recent events")
         print("8. Display turn summary")
-        print("9. Quit")
+        print("9. Display statistics")
+        print("10. Display factions")
+        print("11. Quit")
         print()
     
     def run_interactive(self):
@@ -123,7 +162,7 @@ class CLIUI:
         
         while True:
             self.display_menu()
-            choice = input("Enter choice (1-9): ").strip()
+            choice = input("Enter choice (1-11): ").strip()
             
             if choice == "1":
                 turns = input("Enter number of turns (default 10): ").strip()
@@ -173,9 +212,19 @@ class CLIUI:
                 self.display_turn_summary()
             
             elif choice == "9":
+                agent_name = input("Enter agent name (or press Enter for all): ").strip()
+                if agent_name and not self.world_state.get_agent_by_name(agent_name):
+                    print(f"Agent '{agent_name}' not found.")
+                else:
+                    self.display_stats(agent_name or None)
+            
+            elif choice == "10":
+                self.display_factions()
+            
+            elif choice == "11":
                 print("\nExiting simulation. Goodbye!")
                 break
             
             else:
-                print("Invalid choice. Please enter 1-9.")
+                print("Invalid choice. Please enter 1-11.")
 
@@ -1,26 +1,52 @@
 """Web-based UI for the Hamlet simulation using Flask."""
 
-from flask import Flask, render_template, jsonify, request, send_from_directory
+from flask import Flask, Response, render_template, jsonify, request, send_from_directory
 from typing import List, Optional
-from ..agents.base_agent import BaseAgent
+from ..agents.base_agent import BaseAgent, ActionType
 from ..world.world_state import WorldState
+from ..world.relationship_matrix import CHANNELS
 from ..events.event_log import EventLog
 from ..simulation.simulation_loop import SimulationLoop
+from ..simulation.branching import WhatIf
+from ..simulation.scheduler import Scheduler, ScheduledRun, RUNNING
+from ..simulation.pipeline import TurnPipeline
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+import base64
+import gzip
+import json
 import threading
-import time
 import os
 
 
 class WebUI:
     """Web-based user interface for the simulation."""
     
-    def __init__(self, simulation: SimulationLoop, port: int = 8001):
+    # Limits of one what-if experiment, and how many finished ones are kept
+    MAX_FORK_BRANCHES = 1000
+    MAX_FORK_TURNS = 200
+    MAX_FORK_JOBS = 20
+    # Most turns an auto-run may compute ahead of playback
+    MAX_LOOKAHEAD = 50
+    
+    def __init__(
+        self,
+        simulation: SimulationLoop,
+        port: int = 8001,
+        scheduler: Optional[Scheduler] = None,
+        lookahead: int = 2
+    ):
         """
         Initialize web UI.
         
         Args:
             simulation: The simulation loop to control
             port: Port to run the web server on
+            scheduler: Scheduler that auto-runs the simulation, shared by
+                every UI serving a simulation (one is created if None)
+            lookahead: Turns an auto-run computes ahead of playback by
+                default, so slow turns don't stutter (0 computes each turn
+                when it is due)
         """
         self.simulation = simulation
         self.event_log = simulation.event_log
@@ -30,8 +56,22 @@ class WebUI:
                         template_folder='templates',
                         static_folder='static')
         self._setup_routes()
-        self._auto_run_thread = None
-        self._auto_running = False
+        self.scheduler = scheduler or Scheduler()
+        self.lookahead = lookahead
+        # Current auto-run, if any, and the pipeline it plays back from
+        self._run: Optional[ScheduledRun] = None
+        self._pipeline: Optional[TurnPipeline] = None
+        # Last compact relationship payload, reused while no cell has changed;
+        # Flask serves requests on several threads, so both are swapped under the lock
+        self._compact_cache = None
+        self._compact_tracker = None
+        self._compact_lock = threading.Lock()
+        # Held while a turn is played, so forks always see a world between turns
+        self._turn_lock = threading.Lock()
+        # What-if experiments by id (oldest dropped past MAX_FORK_JOBS), and
+        # the process pool their branches run on, started on first use
+        self._fork_jobs: 'OrderedDict[int, WhatIf]' = OrderedDict()
+        self._fork_pool: Optional[ProcessPoolExecutor] = None
     
     def _setup_routes(self):
         """Set up Flask routes."""
@@ -77,15 +117,122 @@ class WebUI:
             """Get relationship matrix."""
             relationships = {}
             living = self.world_state.get_living_agents()
+            living_names = {a.name for a in living}
             for agent in living:
                 rels = self.world_state.relationship_matrix.get_all_relationships(agent)
                 relationships[agent.name] = {
                     other_name: rel
                     for other_name, rel in rels.items()
-                    if other_name in [a.name for a in living]
+                    if other_name in living_names
                 }
             return jsonify(relationships)
         
+        @self.app.route('/api/relationships/compact')
+        def get_relationships_compact():
+            """
+            Get relationships as a name table plus one packed uint8 matrix per channel.
+            
+            Query args: channels (comma-separated, default all), all=1 to
+            include dead agents, gzip=0 to disable compression. Each channel
+            is base64 of len(names)^2 bytes, row-major (row = source agent),
+            value = round(v * 255). The response is gzip-encoded when the
+            client accepts it.
+            """
+            channels = request.args.get('channels', ','.join(CHANNELS)).split(',')
+            unknown = [c for c in channels if c not in CHANNELS]
+            if unknown:
+                return jsonify({'success': False, 'message': f'Unknown channel: {unknown[0]}'}), 400
+            if request.args.get('all', '0') == '1':
+                agents = self.world_state.agents
+            else:
+                agents = self.world_state.get_living_agents()
+            names = [a.name for a in agents]
+            compress = (request.args.get('gzip', '1') != '0'
+                        and 'gzip' in request.headers.get('Accept-Encoding', ''))
+            response = Response(
+                self._compact_relationships(names, channels, compress),
+                mimetype='application/json'
+            )
+            if compress:
+                response.headers['Content-Encoding'] = 'gzip'
+            response.headers['Vary'] = 'Accept-Encoding'
+            return response
+        
+        @self.app.route('/api/relationships/top')
+        def get_top_relationships():
+            """Get the k strongest relationships of one agent, or of the whole court."""
+            score = request.args.get('score', 'trust')
+            k = min(max(request.args.get('k', 10, type=int), 1), 1000)
+            name = request.args.get('agent')
+            try:
+                if name is None:
+                    pairs = self.world_state.get_strongest_pairs(score, k)
+                    return jsonify([
+                        {'agent': a1.name, 'other': a2.name, 'value': value}
+                        for a1, a2, value in pairs
+                    ])
+                agent = self.world_state.get_agent_by_name(name)
+                if not agent:
+                    return jsonify({'success': False, 'message': 'Unknown agent'}), 404
+                top = self.world_state.get_top_relationships(
+                    agent, score, k, incoming=request.args.get('incoming') == '1'
+                )
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            return jsonify([{'agent': other.name, 'value': value} for other, value in top])
+        
+        @self.app.route('/api/relationships/threshold')
+        def get_relationships_above():
+            """Get the agents whose relationship with one agent exceeds a threshold."""
+            agent = self.world_state.get_agent_by_name(request.args.get('agent', ''))
+            if not agent:
+                return jsonify({'success': False, 'message': 'Unknown agent'}), 404
+            try:
+                matches = self.world_state.get_relationships_above(
+                    agent,
+                    request.args.get('score', 'suspicion'),
+                    request.args.get('min', 0.5, type=float),
+                    incoming=request.args.get('incoming') == '1'
+                )
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            return jsonify([{'agent': other.name, 'value': value} for other, value in matches])
+        
+        @self.app.route('/api/neighborhood')
+        def get_neighborhood():
+            """Get one agent's closest allies and rivals."""
+            agent = self.world_state.get_agent_by_name(request.args.get('agent', ''))
+            if not agent:
+                return jsonify({'success': False, 'message': 'Unknown agent'}), 404
+            k = min(max(request.args.get('k', 5, type=int), 1), 100)
+            return jsonify({
+                group: [{'agent': other.name, 'value': value} for other, value in members]
+                for group, members in self.world_state.get_neighborhood(agent, k).items()
+            })
+        
+        @self.app.route('/api/history/relationship')
+        def get_relationship_history():
+            """Get a chart-ready time series for one relationship channel."""
+            history = self.simulation.relationship_history
+            if history is None:
+                return jsonify({'success': False, 'message': 'Relationship history is not enabled'}), 404
+            agent1 = request.args.get('agent1', '')
+            agent2 = request.args.get('agent2', '')
+            if not self.world_state.get_agent_by_name(agent1) or not self.world_state.get_agent_by_name(agent2):
+                return jsonify({'success': False, 'message': 'Unknown agent'}), 404
+            try:
+                series = history.get_series(
+                    agent1,
+                    agent2,
+                    request.args.get('channel', 'trust'),
+                    start=request.args.get('start', None, type=int),
+                    end=request.args.get('end', None, type=int),
+                    max_points=request.args.get('points', 500, type=int)
+                )
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            return jsonify(series)
+        
         @self.app.route('/api/alliances')
         def get_alliances():
             """Get current alliances."""
@@ -100,6 +247,20 @@ class WebUI:
                 for a1, a2 in alliances
             ])
         
+        @self.app.route('/api/locations')
+        def get_locations():
+            """Get the living agents in every room."""
+            locations = self.world_state.locations
+            if locations is None:
+                return jsonify({'success': False, 'message': 'Locations are not enabled'}), 404
+            return jsonify(locations.get_occupancy())
+        
+        @self.app.route('/api/factions')
+        def get_factions():
+            """Get factions (connected groups of allies), largest first."""
+            min_size = max(request.args.get('min_size', 2, type=int), 1)
+            return jsonify(self.world_state.get_factions(min_size))
+        
         @self.app.route('/api/conflicts')
         def get_conflicts():
             """Get current conflicts."""
@@ -130,10 +291,73 @@ class WebUI:
                 for e in events
             ])
         
+        @self.app.route('/api/events/query')
+        def query_events():
+            """Get one page of events filtered by agent, target, action and turn range."""
+            action = request.args.get('action')
+            if action is not None and action not in {a.value for a in ActionType}:
+                return jsonify({'success': False, 'message': f'Unknown action: {action}'}), 400
+            limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+            events, cursor = self.event_log.query(
+                agent=request.args.get('agent'),
+                target=request.args.get('target'),
+                action=action,
+                start_turn=request.args.get('from', None, type=int),
+                end_turn=request.args.get('to', None, type=int),
+                limit=limit,
+                cursor=request.args.get('cursor', None, type=int)
+            )
+            return jsonify({
+                'events': [
+                    {
+                        'turn': e.turn,
+                        'agent': e.agent.name,
+                        'action': e.action.value,
+                        'target': e.target.name if e.target else None,
+                        'description': e.description
+                    }
+                    for e in events
+                ],
+                'cursor': cursor
+            })
+        
+        @self.app.route('/api/stats')
+        def get_stats():
+            """
+            Get the aggregate event counters, one agent's count if an agent
+            is given, or per-turn totals for `turn` or a `from`/`to` range.
+            """
+            stats = self.event_log.stats
+            agent = request.args.get('agent')
+            turn = request.args.get('turn', None, type=int)
+            start = request.args.get('from', None, type=int)
+            end = request.args.get('to', None, type=int)
+            if turn is not None:
+                return jsonify({'turn': turn, 'totals': stats.turn_totals(turn)})
+            if start is not None or end is not None:
+                return jsonify({'by_turn': stats.turn_range(start, end)})
+            if agent is None:
+                return jsonify(stats.to_dict())
+            if not self.world_state.get_agent_by_name(agent):
+                return jsonify({'success': False, 'message': 'Unknown agent'}), 404
+            action = request.args.get('action')
+            target = request.args.get('target')
+            return jsonify({
+                'agent': agent,
+                'action': action,
+                'target': target,
+                'count': stats.count(agent, action, target),
+                'action_mix': stats.action_mix(agent)
+            })
+        
         @self.app.route('/api/step', methods=['POST'])
         def step():
             """Execute one turn."""
-            events = self.simulation.step()
+            with self._turn_lock:
+                # Turns computed ahead assumed nobody else would step
+                if self._pipeline is not None:
+                    self._pipeline.invalidate()
+                events = self.simulation.step()
             return jsonify({
                 'success': True,
                 'events': [
@@ -149,30 +373,97 @@ class WebUI:
                 'turn': self.world_state.turn_number
             })
         
+        @self.app.route('/api/fork', methods=['POST'])
+        def fork():
+            """Start a what-if experiment: branches with and without agents killed now."""
+            data = request.json or {}
+            kill = data.get('kill', [])
+            if isinstance(kill, str):
+                kill = [kill]
+            for name in kill:
+                if not self.world_state.get_agent_by_name(name):
+                    return jsonify({'success': False, 'message': f'Unknown agent: {name}'}), 404
+            branches = data.get('branches', 100)
+            turns = data.get('turns', 20)
+            seed = data.get('seed')
+            if not isinstance(branches, int) or not 1 <= branches <= self.MAX_FORK_BRANCHES:
+                return jsonify({'success': False, 'message': f'branches must be 1-{self.MAX_FORK_BRANCHES}'}), 400
+            if not isinstance(turns, int) or not 1 <= turns <= self.MAX_FORK_TURNS:
+                return jsonify({'success': False, 'message': f'turns must be 1-{self.MAX_FORK_TURNS}'}), 400
+            if seed is not None and not isinstance(seed, int):
+                return jsonify({'success': False, 'message': 'seed must be an integer'}), 400
+            
+            try:
+                with self._turn_lock:
+                    experiment = WhatIf(
+                        self.world_state, kill, branches=branches, turns=turns,
+                        seed=seed, turn_mode=self.simulation.turn_mode
+                    )
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            if self._fork_pool is None:
+                self._fork_pool = ProcessPoolExecutor()
+            experiment.submit(self._fork_pool)
+            
+            job_id = next(reversed(self._fork_jobs), 0) + 1
+            self._fork_jobs[job_id] = experiment
+            while len(self._fork_jobs) > self.MAX_FORK_JOBS:
+                self._fork_jobs.popitem(last=False)
+            return jsonify({'success': True, 'job': job_id, 'turn': experiment.turn}), 202
+        
+        @self.app.route('/api/fork/<int:job_id>')
+        def get_fork(job_id: int):
+            """Get a what-if experiment's progress, or its results once done."""
+            experiment = self._fork_jobs.get(job_id)
+            if experiment is None:
+                return jsonify({'success': False, 'message': 'Unknown job'}), 404
+            if not experiment.done():
+                return jsonify({'success': True, 'done': False, 'progress': experiment.progress()})
+            return jsonify({'success': True, 'done': True, 'result': experiment.result()})
+        
         @self.app.route('/api/run', methods=['POST'])
         def run():
             """Start auto-running simulation."""
             data = request.json or {}
             max_turns = data.get('max_turns', 10)
             turn_delay = data.get('turn_delay', 0.5)
+            lookahead = data.get('lookahead', self.lookahead)
+            if not isinstance(lookahead, int) or not 0 <= lookahead <= self.MAX_LOOKAHEAD:
+                return jsonify({'success': False, 'message': f'lookahead must be 0-{self.MAX_LOOKAHEAD}'}), 400
             
-            if not self._auto_running:
-                self._auto_running = True
+            if self._run is None or not self._run.active:
+                self._stop_run()
                 self.simulation.auto_mode = True
                 self.simulation.turn_delay = turn_delay
-                self._auto_run_thread = threading.Thread(
-                    target=self._auto_run,
-                    args=(max_turns,),
-                    daemon=True
+                if lookahead > 0:
+                    self._pipeline = TurnPipeline(self.simulation, lookahead)
+                self._run = self.scheduler.start(
+                    self._pipeline or self.simulation, turn_delay=turn_delay, max_turns=max_turns,
+                    lock=self._turn_lock
                 )
-                self._auto_run_thread.start()
             
             return jsonify({'success': True, 'message': 'Simulation started'})
         
+        @self.app.route('/api/pause', methods=['POST'])
+        def pause():
+            """Pause auto-running simulation."""
+            if self._run is None or not self._run.active:
+                return jsonify({'success': False, 'message': 'Simulation is not running'}), 400
+            self.scheduler.pause(self._run)
+            return jsonify({'success': True, 'message': 'Simulation paused'})
+        
+        @self.app.route('/api/resume', methods=['POST'])
+        def resume():
+            """Resume paused simulation."""
+            if self._run is None or not self._run.active:
+                return jsonify({'success': False, 'message': 'Simulation is not running'}), 400
+            self.scheduler.resume(self._run)
+            return jsonify({'success': True, 'message': 'Simulation resumed'})
+        
         @self.app.route('/api/stop', methods=['POST'])
         def stop():
             """Stop auto-running simulation."""
-            self._auto_running = False
+            self._stop_run()
             self.simulation.stop()
             return jsonify({'success': True, 'message': 'Simulation stopped'})
         
@@ -181,21 +472,55 @@ class WebUI:
             """Reset simulation (reload page to fully reset)."""
             # Note: Full reset would require recreating simulation
             # For now, just stop auto-run
-            self._auto_running = False
+            self._stop_run()
             self.simulation.stop()
             return jsonify({'success': True, 'message': 'Simulation stopped'})
     
-    def _auto_run(self, max_turns: int):
-        """Auto-run simulation in background thread."""
-        turns_run = 0
-        while self._auto_running and turns_run < max_turns:
-            if len(self.world_state.get_living_agents()) < 2:
-                self._auto_running = False
-                break
-            self.simulation.step()
-            turns_run += 1
-            time.sleep(self.simulation.turn_delay)
-        self._auto_running = False
+    def _stop_run(self):
+        """Stop the current auto-run, if any, and drop the turns it computed ahead."""
+        if self._run is not None:
+            self.scheduler.stop(self._run)
+            self._run = None
+        if self._pipeline is not None:
+            with self._turn_lock:
+                self._pipeline.close()
+            self._pipeline = None
+    
+    def _compact_relationships(self, names: List[str], channels: List[str], compress: bool) -> bytes:
+        """Encode the compact relationship payload, reusing it if nothing changed."""
+        matrix = self.world_state.relationship_matrix
+        key = (id(matrix), tuple(names), tuple(channels))
+        with self._compact_lock:
+            if self._compact_tracker is None or self._compact_tracker[0] is not matrix:
+                if self._compact_tracker is not None:
+                    self._compact_tracker[0].untrack_changes(self._compact_tracker[1])
+                self._compact_tracker = (matrix, matrix.track_changes())
+                self._compact_cache = None
+            tracker = self._compact_tracker[1]
+            if self._compact_cache is None or self._compact_cache[0] != key or tracker:
+                tracker.clear()
+                self._compact_cache = (key, self._encode_relationships(matrix, names, channels), None)
+            cached_key, body, compressed = self._compact_cache
+            if not compress:
+                return body
+            if compressed is None:
+                compressed = gzip.compress(body, compresslevel=5)
+                self._compact_cache = (cached_key, body, compressed)
+            return compressed
+    
+    @staticmethod
+    def _encode_relationships(matrix, names: List[str], channels: List[str]) -> bytes:
+        """Quantize channels and encode them as JSON with base64 arrays."""
+        packed = matrix.quantize(names, channels)
+        body = json.dumps({
+            'names': names,
+            'scale': 255,
+            'channels': {
+                channel: base64.b64encode(values).decode('ascii')
+                for channel, values in packed.items()
+            }
+        }, separators=(',', ':')).encode()
+        return body
     
     def _get_state_dict(self):
         """Get complete state as dictionary."""
@@ -204,7 +529,9 @@ class WebUI:
             'turn': self.world_state.turn_number,
             'living_count': len(living),
             'living_agents': [a.name for a in living],
-            'auto_running': self._auto_running
+            'auto_running': self._run is not None and self._run.state == RUNNING,
+            'run': self._run.status() if self._run is not None else None,
+            'lookahead': self._pipeline.status() if self._pipeline is not None else None
         }
     
     def run(self, debug: bool = False):
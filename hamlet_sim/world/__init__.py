@@ -2,6 +2,8 @@
 
 from .world_state import WorldState
 from .relationship_matrix import RelationshipMatrix
+from .relationship_history import RelationshipHistory
+from .locations import LocationMap
 
-__all__ = ['WorldState', 'RelationshipMatrix']
+__all__ = ['WorldState', 'RelationshipMatrix', 'RelationshipHistory', 'LocationMap']
 
@@ -0,0 +1,200 @@
+"""Faction detection over the alliance graph."""
+
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from ..agents.base_agent import BaseAgent
+
+
+# Same rule as WorldState.get_alliances(): trust + love above this value
+ALLIANCE_THRESHOLD = 1.2
+
+
+class FactionTracker:
+    """
+    Connected components of the alliance graph, maintained incrementally.
+    
+    Two living agents are linked when the alliance score (trust + love) of
+    each towards the other exceeds the threshold, so one-sided devotion does
+    not chain rival camps together; a faction is a connected group of linked
+    agents. The tracker builds the graph once,
+    then each update() only looks at the cells changed since the last one:
+    new links merge two factions by relabelling the smaller, and only the
+    factions that lost a link or a member are re-traversed to find splits.
+    """
+    
+    def __init__(self, world_state, threshold: float = ALLIANCE_THRESHOLD):
+        """
+        Initialize the tracker and build the graph.
+        
+        Args:
+            world_state: World whose agents and relationships are followed
+            threshold: Alliance score a link must exceed
+        """
+        self.world_state = world_state
+        self.threshold = threshold
+        self._matrix = world_state.relationship_matrix
+        self._tracker = self._matrix.track_changes()
+        self._order = {agent.name: i for i, agent in enumerate(world_state.agents)}
+        self._lock = threading.Lock()
+        
+        self._alive: Set[str] = {agent.name for agent in world_state.get_living_agents()}
+        self._adjacent: Dict[str, Set[str]] = {name: set() for name in self._alive}
+        for name1 in self._alive:
+            allies = self._matrix.above_threshold(
+                name1, "alliance", threshold,
+                include=lambda name2: name2 in self._alive and name1 < name2
+            )
+            for name2, _ in allies:
+                if self._linked(name1, name2):
+                    self._adjacent[name1].add(name2)
+                    self._adjacent[name2].add(name1)
+        
+        # Component labels and members
+        self._label: Dict[str, int] = {}
+        self._members: Dict[int, Set[str]] = {}
+        self._next_label = 0
+        self._label_components(self._alive)
+    
+    def close(self):
+        """Stop following relationship changes."""
+        self._matrix.untrack_changes(self._tracker)
+    
+    def _linked(self, name1: str, name2: str) -> bool:
+        """Check whether two agents should be linked."""
+        for a, b in ((name1, name2), (name2, name1)):
+            value = self._matrix.get_value(a, b, "alliance")
+            if value is None or value <= self.threshold:
+                return False
+        return True
+    
+    def _label_components(self, names: Iterable[str]):
+        """Give every component among `names` a fresh label, by BFS."""
+        pending = set(names)
+        while pending:
+            start = pending.pop()
+            label = self._next_label
+            self._next_label += 1
+            members = {start}
+            queue = deque([start])
+            while queue:
+                for neighbor in self._adjacent[queue.popleft()]:
+                    if neighbor not in members:
+                        members.add(neighbor)
+                        queue.append(neighbor)
+            pending -= members
+            for name in members:
+                self._label[name] = label
+            self._members[label] = members
+    
+    def update(self):
+        """Apply the relationship changes and deaths since the last update."""
+        with self._lock:
+            self._update()
+    
+    def _update(self):
+        """Apply pending changes; the caller holds the lock."""
+        changed: Set[Tuple[str, str]] = set()
+        while self._tracker:
+            # pop() is atomic, so a simulation thread may keep writing meanwhile
+            name1, name2 = self._tracker.pop()
+            changed.add((name1, name2) if name1 < name2 else (name2, name1))
+        
+        alive = {agent.name for agent in self.world_state.get_living_agents()}
+        dead = self._alive - alive
+        born = alive - self._alive
+        if not changed and not dead and not born:
+            return
+        
+        broken: Set[int] = set()
+        for name in dead:
+            label = self._label.pop(name)
+            self._members[label].discard(name)
+            broken.add(label)
+            for neighbor in self._adjacent.pop(name):
+                self._adjacent[neighbor].discard(name)
+        for name in born:
+            self._adjacent[name] = set()
+            self._label[name] = label = self._next_label
+            self._next_label += 1
+            self._members[label] = {name}
+            changed.update(
+                (name, other) if name < other else (other, name)
+                for other in alive if other != name
+            )
+        self._alive = alive
+        
+        added = []
+        for name1, name2 in changed:
+            if name1 not in alive or name2 not in alive:
+                continue
+            linked = self._linked(name1, name2)
+            if linked == (name2 in self._adjacent[name1]):
+                continue
+            if linked:
+                added.append((name1, name2))
+            else:
+                self._adjacent[name1].discard(name2)
+                self._adjacent[name2].discard(name1)
+                broken.add(self._label[name1])
+        
+        # Re-traverse only the factions that lost links or members
+        for label in broken:
+            members = self._members.pop(label)
+            self._label_components(members)
+        
+        for name1, name2 in added:
+            self._adjacent[name1].add(name2)
+            self._adjacent[name2].add(name1)
+            label1, label2 = self._label[name1], self._label[name2]
+            if label1 == label2:
+                continue
+            if len(self._members[label1]) < len(self._members[label2]):
+                label1, label2 = label2, label1
+            moved = self._members.pop(label2)
+            for name in moved:
+                self._label[name] = label1
+            self._members[label1] |= moved
+    
+    def _leader(self, members: Set[str]) -> str:
+        """The best-connected member (earliest agent on ties)."""
+        return min(members, key=lambda name: (-len(self._adjacent[name]), self._order.get(name, 0)))
+    
+    def get_factions(self, min_size: int = 2) -> List[Dict]:
+        """
+        Get the current factions, largest first.
+        
+        Args:
+            min_size: Smallest faction to report
+        
+        Returns:
+            List of dicts with "leader" (name of the best-connected member),
+            "members" (names in agent order) and "size"
+        """
+        factions = []
+        with self._lock:
+            self._update()
+            for members in self._members.values():
+                if len(members) < min_size:
+                    continue
+                factions.append({
+                    "leader": self._leader(members),
+                    "members": sorted(members, key=lambda name: self._order.get(name, 0)),
+                    "size": len(members),
+                })
+        factions.sort(key=lambda f: (-f["size"], self._order.get(f["leader"], 0)))
+        return factions
+    
+    def faction_of(self, agent: BaseAgent) -> Optional[List[str]]:
+        """
+        Get the names of an agent's faction members (including the agent).
+        
+        Returns:
+            Member names in agent order, or None if the agent is dead
+        """
+        with self._lock:
+            self._update()
+            label = self._label.get(agent.name)
+            if label is None:
+                return None
+            return sorted(self._members[label], key=lambda name: self._order.get(name, 0))
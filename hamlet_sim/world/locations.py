@@ -0,0 +1,201 @@
+"""Rooms of Elsinore and which agents occupy them."""
+
+import random
+from typing import Dict, List, Optional, Sequence
+from ..agents.base_agent import BaseAgent
+
+
+# Rooms of the castle and the rooms reachable from each
+ELSINORE = {
+    "Great Hall": ("Courtyard", "Chapel", "Queen's Closet", "Lobby"),
+    "Courtyard": ("Great Hall", "Battlements", "Graveyard"),
+    "Battlements": ("Courtyard",),
+    "Chapel": ("Great Hall", "Graveyard"),
+    "Queen's Closet": ("Great Hall", "Lobby"),
+    "Lobby": ("Great Hall", "Queen's Closet"),
+    "Graveyard": ("Courtyard", "Chapel"),
+}
+
+
+class LocationMap:
+    """
+    Locations of agents with a per-room occupancy index.
+    
+    Agents only interact with agents in the same room, so a decision looks
+    at its room's occupants instead of the whole population. Occupants are
+    kept in insertion-ordered dicts, which makes candidate order (and so a
+    seeded run) reproducible.
+    """
+    
+    def __init__(
+        self,
+        rooms: Optional[Dict[str, Sequence[str]]] = None,
+        move_chance: float = 0.2
+    ):
+        """
+        Initialize an empty map.
+        
+        Args:
+            rooms: {room: adjacent rooms} (defaults to ELSINORE)
+            move_chance: Chance that an agent walks to an adjacent room each turn
+        """
+        self.rooms = {room: tuple(adjacent) for room, adjacent in (rooms or ELSINORE).items()}
+        self.move_chance = move_chance
+        self._location: Dict[str, str] = {}
+        self._occupants: Dict[str, Dict[str, BaseAgent]] = {room: {} for room in self.rooms}
+    
+    @classmethod
+    def for_population(
+        cls,
+        agents: List[BaseAgent],
+        room_size: int = 20,
+        move_chance: float = 0.2
+    ) -> 'LocationMap':
+        """
+        Build a castle with enough rooms for about `room_size` agents each and
+        spread the living agents over it.
+        
+        Small casts get Elsinore itself; larger courts get numbered wings
+        ("Great Hall 2", ...), each a copy of Elsinore whose Courtyard also
+        leads to the next wing's, so every room stays reachable.
+        
+        Args:
+            agents: Agents to place
+            room_size: Target number of agents per room
+            move_chance: Chance that an agent walks each turn
+        
+        Returns:
+            LocationMap with every living agent placed
+        """
+        wings = max(1, -(-len(agents) // (room_size * len(ELSINORE))))
+        
+        def wing_name(room: str, wing: int) -> str:
+            return room if wing == 0 else f"{room} {wing + 1}"
+        
+        rooms = {}
+        for wing in range(wings):
+            for room, adjacent in ELSINORE.items():
+                rooms[wing_name(room, wing)] = [wing_name(other, wing) for other in adjacent]
+            if wing > 0:
+                rooms[wing_name("Courtyard", wing)].append(wing_name("Courtyard", wing - 1))
+                rooms[wing_name("Courtyard", wing - 1)].append(wing_name("Courtyard", wing))
+        
+        locations = cls(rooms, move_chance)
+        names = list(locations.rooms)
+        for i, agent in enumerate(agents):
+            if agent.state.is_alive:
+                locations.place(agent, names[i % len(names)])
+        return locations
+    
+    def fork(self, agents: List[BaseAgent]) -> 'LocationMap':
+        """
+        Copy the map for a forked world.
+        
+        Args:
+            agents: The forked world's agents, matched to this map's by name
+        
+        Returns:
+            LocationMap with the same rooms and placements
+        """
+        clone = LocationMap({}, self.move_chance)
+        clone.rooms = self.rooms
+        by_name = {agent.name: agent for agent in agents}
+        clone._location = dict(self._location)
+        clone._occupants = {
+            room: {name: by_name[name] for name in occupants}
+            for room, occupants in self._occupants.items()
+        }
+        return clone
+    
+    def place(self, agent: BaseAgent, room: str):
+        """
+        Put an agent in a room, removing it from its previous one.
+        
+        Raises:
+            ValueError: If the room does not exist
+        """
+        if room not in self.rooms:
+            raise ValueError(f"Unknown room: {room}")
+        previous = self._location.get(agent.name)
+        if previous is not None:
+            del self._occupants[previous][agent.name]
+        self._location[agent.name] = room
+        self._occupants[room][agent.name] = agent
+    
+    def remove(self, agent: BaseAgent):
+        """Take an agent off the map."""
+        room = self._location.pop(agent.name, None)
+        if room is not None:
+            del self._occupants[room][agent.name]
+    
+    def location_of(self, agent: BaseAgent) -> Optional[str]:
+        """Get the room an agent is in, or None if it is not on the map."""
+        return self._location.get(agent.name)
+    
+    def occupants(self, room: str) -> List[BaseAgent]:
+        """Get the living agents in a room."""
+        return [agent for agent in self._occupants[room].values() if agent.state.is_alive]
+    
+    def occupant_names(self, room: str) -> List[str]:
+        """Get the names of every agent placed in a room, in arrival order."""
+        return list(self._occupants[room])
+    
+    def set_occupants(self, room: str, agents: List[BaseAgent]):
+        """
+        Replace a room's occupants, keeping the given order (which decides
+        candidate order), e.g. to replay a turn computed on a fork.
+        
+        Agents are taken out of their previous rooms.
+        
+        Raises:
+            ValueError: If the room does not exist
+        """
+        if room not in self.rooms:
+            raise ValueError(f"Unknown room: {room}")
+        for name in self._occupants[room]:
+            del self._location[name]
+        for agent in agents:
+            previous = self._location.get(agent.name)
+            if previous is not None:
+                self._occupants[previous].pop(agent.name, None)
+            self._location[agent.name] = room
+        self._occupants[room] = {agent.name: agent for agent in agents}
+    
+    def co_located(self, agent: BaseAgent) -> List[BaseAgent]:
+        """
+        Get the other living agents in the same room.
+        
+        Agents that are not on the map see nobody.
+        """
+        room = self._location.get(agent.name)
+        if room is None:
+            return []
+        return [
+            other for other in self._occupants[room].values()
+            if other is not agent and other.state.is_alive
+        ]
+    
+    def wander(self, agents: List[BaseAgent], rng=random):
+        """
+        Let each living agent walk to a random adjacent room with move_chance.
+        
+        Dead agents are taken off the map (DecisionEngine already removes
+        agents when they die; this catches deaths made elsewhere).
+        
+        Args:
+            agents: Agents to move, in turn order
+            rng: Source of the random draws (the simulation's)
+        """
+        for agent in agents:
+            if not agent.state.is_alive:
+                self.remove(agent)
+                continue
+            room = self._location.get(agent.name)
+            if room is None or not self.rooms[room]:
+                continue
+            if rng.random() < self.move_chance:
+                self.place(agent, rng.choice(self.rooms[room]))
+    
+    def get_occupancy(self) -> Dict[str, List[str]]:
+        """Get the names of the living agents in every room."""
+        return {room: [agent.name for agent in self.occupants(room)] for room in self.rooms}
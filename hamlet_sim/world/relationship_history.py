@@ -0,0 +1,183 @@
+"""Compact time-series store for relationship values."""
+
+from array import array
+from bisect import bisect_right
+from typing import Dict, Optional, Tuple
+from .relationship_matrix import RelationshipMatrix, CHANNELS, DEFAULT_RELATIONSHIP
+
+
+# Changes smaller than this are not worth a new point (values are stored as float32)
+EPSILON = 1e-6
+
+
+class RelationshipHistory:
+    """
+    Records how relationship values evolve over turns.
+    
+    Only cells that changed are appended, one (turn, value) point per pair and
+    channel, into typed arrays. Memory therefore grows with the number of
+    changes rather than with turns x agents^2. A series is a step function:
+    its value holds until the next recorded point, and before the first point
+    it is the channel default.
+    """
+    
+    def __init__(self):
+        """Initialize an empty history."""
+        # {(agent1_name, agent2_name, channel): (turns, values)}
+        self._series: Dict[Tuple[str, str, str], Tuple[array, array]] = {}
+        self._matrix: Optional[RelationshipMatrix] = None
+        self._tracker = None
+        self.last_turn = 0
+    
+    def attach(self, matrix: RelationshipMatrix, turn: int = 0):
+        """
+        Start recording changes made to a relationship matrix.
+        
+        Cells that already differ from the defaults are recorded at `turn`.
+        
+        Args:
+            matrix: Relationship matrix to follow
+            turn: Turn to stamp the current values with
+        """
+        if self._matrix is not None:
+            self._matrix.untrack_changes(self._tracker)
+        self._matrix = matrix
+        self._tracker = matrix.track_changes()
+        self._tracker.update(matrix.pairs())
+        self.record_turn(turn)
+    
+    def record_turn(self, turn: int):
+        """
+        Append the values of every cell changed since the last call.
+        
+        Args:
+            turn: Turn number to stamp the new values with
+        """
+        if self._matrix is None:
+            return
+        self.last_turn = max(self.last_turn, turn)
+        if not self._tracker:
+            return
+        
+        cells = self._matrix.get_cells(self._tracker)
+        for (name1, name2), cell in cells.items():
+            for channel, value in zip(CHANNELS, cell):
+                key = (name1, name2, channel)
+                series = self._series.get(key)
+                if series is None:
+                    if abs(value - DEFAULT_RELATIONSHIP[channel]) <= EPSILON:
+                        continue
+                    series = (array('I'), array('f'))
+                    self._series[key] = series
+                turns, values = series
+                if values and abs(values[-1] - value) <= EPSILON:
+                    continue
+                if turns and turns[-1] == turn:
+                    # Several writes in one turn collapse into the last one
+                    values[-1] = value
+                else:
+                    turns.append(turn)
+                    values.append(value)
+        self._tracker.clear()
+    
+    def get_series(
+        self,
+        agent1_name: str,
+        agent2_name: str,
+        channel: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        max_points: int = 500
+    ) -> Dict:
+        """
+        Get a chart-ready series for one directed pair and channel.
+        
+        If the range holds more change points than `max_points`, it is split
+        into equal turn buckets and each bucket reports the min, max and
+        closing value. Cost is proportional to the points in range plus the
+        number of buckets.
+        
+        Args:
+            agent1_name: Name of the agent holding the feeling
+            agent2_name: Name of the agent it is about
+            channel: One of trust, fear, suspicion, love, influence
+            start: First turn of the range (defaults to 0)
+            end: Last turn of the range (defaults to the last recorded turn)
+            max_points: Maximum number of points to return
+        
+        Returns:
+            Dict with turns and values, plus min/max when downsampled
+        """
+        if channel not in DEFAULT_RELATIONSHIP:
+            raise ValueError(f"Unknown relationship channel: {channel}")
+        start = 0 if start is None else max(0, start)
+        end = self.last_turn if end is None else end
+        end = max(start, end)
+        max_points = max(1, max_points)
+        
+        turns, values = self._series.get(
+            (agent1_name, agent2_name, channel), (array('I'), array('f'))
+        )
+        lo = bisect_right(turns, start)
+        hi = bisect_right(turns, end)
+        current = values[lo - 1] if lo > 0 else DEFAULT_RELATIONSHIP[channel]
+        
+        result = {
+            "agent1": agent1_name,
+            "agent2": agent2_name,
+            "channel": channel,
+            "start": start,
+            "end": end,
+        }
+        
+        if hi - lo + 1 <= max_points:
+            result["downsampled"] = False
+            result["turns"] = [start] + list(turns[lo:hi])
+            result["values"] = [round(current, 6)] + [round(v, 6) for v in values[lo:hi]]
+            return result
+        
+        bucket_size = -(-(end - start + 1) // max_points)
+        bucket_turns, mins, maxs, closes = [], [], [], []
+        i = lo
+        for bucket_start in range(start, end + 1, bucket_size):
+            bucket_end = min(end, bucket_start + bucket_size - 1)
+            low = high = current
+            stop = bisect_right(turns, bucket_end, i, hi)
+            for j in range(i, stop):
+                current = values[j]
+                if current < low:
+                    low = current
+                elif current > high:
+                    high = current
+            i = stop
+            bucket_turns.append(bucket_start)
+            mins.append(round(low, 6))
+            maxs.append(round(high, 6))
+            closes.append(round(current, 6))
+        
+        result["downsampled"] = True
+        result["bucket_size"] = bucket_size
+        result["turns"] = bucket_turns
+        result["values"] = closes
+        result["min"] = mins
+        result["max"] = maxs
+        return result
+    
+    def value_at(self, agent1_name: str, agent2_name: str, channel: str, turn: int) -> float:
+        """Get the value a channel had at the end of a given turn."""
+        turns, values = self._series.get(
+            (agent1_name, agent2_name, channel), (array('I'), array('f'))
+        )
+        index = bisect_right(turns, turn)
+        return values[index - 1] if index > 0 else DEFAULT_RELATIONSHIP[channel]
+    
+    def point_count(self) -> int:
+        """Total number of stored change points."""
+        return sum(len(turns) for turns, _ in self._series.values())
+    
+    def memory_bytes(self) -> int:
+        """Approximate bytes used by the stored arrays."""
+        return sum(
+            turns.itemsize * len(turns) + values.itemsize * len(values)
+            for turns, values in self._series.values()
+        )
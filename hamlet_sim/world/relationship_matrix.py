@@ -1,9 +1,47 @@
 """Relationship matrix to track relationships between agents."""
 
-from typing import Dict, Optional
+import heapq
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 from ..agents.base_agent import BaseAgent
 
 
+# Relationship channels, in storage order
+CHANNELS = ("trust", "fear", "suspicion", "love", "influence")
+
+# Value of every channel for a pair that has not been touched yet
+DEFAULT_RELATIONSHIP = {
+    "trust": 0.5,
+    "fear": 0.0,
+    "suspicion": 0.0,
+    "love": 0.0,
+    "influence": 0.0,
+}
+
+# Combined scores usable wherever a channel name is accepted; they match the
+# alliance (trust + love) and conflict (suspicion + fear) rules of WorldState
+SCORES = {
+    "alliance": ("trust", "love"),
+    "conflict": ("suspicion", "fear"),
+}
+
+
+def score_value(rel: Dict[str, float], score: str) -> float:
+    """Value of a channel or combined score for one relationship."""
+    channels = SCORES.get(score)
+    if channels is None:
+        return rel[score]
+    return sum(rel[channel] for channel in channels)
+
+
+def check_score(score: str):
+    """Raise ValueError unless `score` is a channel or a combined score."""
+    if score not in DEFAULT_RELATIONSHIP and score not in SCORES:
+        raise ValueError(
+            f"Unknown score '{score}' (expected one of {list(CHANNELS) + list(SCORES)})"
+        )
+
+
 class RelationshipMatrix:
     """Tracks relationships between all agents."""
     
@@ -11,6 +49,178 @@ class RelationshipMatrix:
         """Initialize an empty relationship matrix."""
         # Nested dict: {agent1_name: {agent2_name: relationship_data}}
         self._matrix: Dict[str, Dict[str, Dict[str, float]]] = {}
+        # Change trackers: each is a set of (agent1_name, agent2_name) pairs
+        # modified since its owner last drained it
+        self._trackers: List[Set[Tuple[str, str]]] = []
+        # {score: _TopPairsIndex}, built on the first top_pairs() call
+        self._top_indexes: Dict[str, '_TopPairsIndex'] = {}
+        # Copy-on-write state (see fork()): rows shared with a fork, and for
+        # rows copied since, the cells this matrix owns (the rest are shared)
+        self._shared: Set[str] = set()
+        self._owned: Dict[str, Set[str]] = {}
+    
+    @classmethod
+    def from_dense(cls, names: Sequence[str], values: Sequence[float]) -> 'RelationshipMatrix':
+        """
+        Build a matrix for all pairs at once from a dense value array.
+        
+        Args:
+            names: Agent names, in matrix order
+            values: len(names)^2 x len(CHANNELS) values, row-major in CHANNELS
+                order (cells on the diagonal are ignored)
+            
+        Returns:
+            A new RelationshipMatrix
+        """
+        matrix = cls()
+        width = len(CHANNELS)
+        n = len(names)
+        for i, name1 in enumerate(names):
+            row_base = i * n * width
+            matrix._matrix[name1] = {
+                name2: dict(zip(CHANNELS, values[row_base + j * width:row_base + (j + 1) * width]))
+                for j, name2 in enumerate(names)
+                if j != i
+            }
+        return matrix
+    
+    @classmethod
+    def from_cells(cls, cells: Iterable[Tuple[str, str, Sequence[float]]]) -> 'RelationshipMatrix':
+        """
+        Build a matrix from explicit cells (e.g. read back from a checkpoint).
+        
+        Args:
+            cells: (agent1_name, agent2_name, values in CHANNELS order); rows
+                and cells keep this order
+            
+        Returns:
+            A new RelationshipMatrix
+        """
+        matrix = cls()
+        rows = matrix._matrix
+        for name1, name2, values in cells:
+            row = rows.get(name1)
+            if row is None:
+                row = rows[name1] = {}
+            row[name2] = dict(zip(CHANNELS, values))
+        return matrix
+    
+    def copy(self) -> 'RelationshipMatrix':
+        """Return an independent copy of the matrix (without change trackers)."""
+        matrix = RelationshipMatrix()
+        matrix._matrix = {
+            name1: {name2: rel.copy() for name2, rel in row.items()}
+            for name1, row in self._matrix.items()
+        }
+        return matrix
+    
+    def fork(self) -> 'RelationshipMatrix':
+        """
+        Return a copy-on-write copy of the matrix (without change trackers).
+        
+        Both matrices keep sharing rows and cells until one of them writes:
+        the first write to a row copies its table of cell references, and
+        the first write to a cell copies that cell. Forking costs one pointer
+        per agent, and each side only allocates the rows and cells it
+        modifies. Fork while no other thread is writing (e.g. between turns).
+        """
+        matrix = RelationshipMatrix()
+        matrix._matrix = dict(self._matrix)
+        matrix._shared = set(self._matrix)
+        # Cells owned so far become shared with the fork too
+        self._shared = set(self._matrix)
+        self._owned = {}
+        return matrix
+    
+    def _own_row(self, name: str) -> Dict[str, Dict[str, float]]:
+        """
+        Get a row for adding or replacing cells, copying its table of cell
+        references first if it is shared with a fork.
+        """
+        row = self._matrix[name]
+        if name in self._shared:
+            self._shared.discard(name)
+            row = self._matrix[name] = dict(row)
+            self._owned[name] = set()
+        return row
+    
+    def _own_cell(self, name1: str, name2: str) -> Dict[str, float]:
+        """Get a cell for writing, copying it first if it is shared with a fork."""
+        if not self._shared and not self._owned:
+            return self._matrix[name1][name2]
+        row = self._own_row(name1)
+        owned = self._owned.get(name1)
+        if owned is not None and name2 not in owned:
+            owned.add(name2)
+            if len(owned) == len(row):
+                # Every cell is private again
+                del self._owned[name1]
+            row[name2] = row[name2].copy()
+        return row[name2]
+    
+    def _replace_cell(self, name1: str, name2: str, rel: Dict[str, float]):
+        """Store a new cell object, which the matrix owns."""
+        row = self._own_row(name1) if name1 in self._matrix else self._matrix.setdefault(name1, {})
+        row[name2] = rel
+        owned = self._owned.get(name1)
+        if owned is not None:
+            owned.add(name2)
+            if len(owned) == len(row):
+                del self._owned[name1]
+    
+    def quantize(self, names: Sequence[str], channels: Sequence[str] = CHANNELS) -> Dict[str, bytearray]:
+        """
+        Pack channels into dense uint8 arrays for compact transfer.
+        
+        Args:
+            names: Agent names, in matrix order
+            channels: Channels to pack
+        
+        Returns:
+            {channel: bytearray of len(names)^2 values, row-major}; a value
+            v is stored as round(v * 255), the diagonal as 0
+        """
+        n = len(names)
+        packed = {channel: bytearray(n * n) for channel in channels}
+        for i, name1 in enumerate(names):
+            row = self._matrix.get(name1, {})
+            rels = [row.get(name2, DEFAULT_RELATIONSHIP) for name2 in names]
+            for channel in channels:
+                values = packed[channel]
+                values[i * n:(i + 1) * n] = bytes(int(rel[channel] * 255 + 0.5) for rel in rels)
+                values[i * n + i] = 0
+        return packed
+    
+    def track_changes(self) -> Set[Tuple[str, str]]:
+        """
+        Start tracking modified cells.
+        
+        Returns:
+            A set that receives every (agent1_name, agent2_name) pair written
+            from now on. The caller owns it and clears it after reading.
+        """
+        tracker: Set[Tuple[str, str]] = set()
+        self._trackers.append(tracker)
+        return tracker
+    
+    def untrack_changes(self, tracker: Set[Tuple[str, str]]):
+        """Stop feeding a tracker returned by track_changes()."""
+        self._trackers = [t for t in self._trackers if t is not tracker]
+    
+    def __getstate__(self):
+        """Pickle without change trackers; they belong to the local process."""
+        state = self.__dict__.copy()
+        state["_trackers"] = []
+        state["_top_indexes"] = {}
+        # Unpickled rows are private copies
+        state["_shared"] = set()
+        state["_owned"] = {}
+        return state
+    
+    def _mark_changed(self, name1: str, name2: str):
+        """Record a write to a cell in every active tracker."""
+        for tracker in self._trackers:
+            tracker.add((name1, name2))
     
     def initialize_agent(self, agent: BaseAgent):
         """Initialize relationship entries for a new agent."""
@@ -40,7 +250,9 @@ class RelationshipMatrix:
     ):
         """Set a specific relationship value."""
         self._ensure_exists(agent1, agent2)
-        self._matrix[agent1.name][agent2.name][key] = max(0.0, min(1.0, value))
+        self._own_cell(agent1.name, agent2.name)[key] = max(0.0, min(1.0, value))
+        if self._trackers:
+            self._mark_changed(agent1.name, agent2.name)
     
     def modify_relationship(
         self,
@@ -65,13 +277,89 @@ class RelationshipMatrix:
             influence_delta: Change in influence score
         """
         self._ensure_exists(agent1, agent2)
-        rel = self._matrix[agent1.name][agent2.name]
+        rel = self._own_cell(agent1.name, agent2.name)
         
         rel["trust"] = max(0.0, min(1.0, rel["trust"] + trust_delta))
         rel["fear"] = max(0.0, min(1.0, rel["fear"] + fear_delta))
         rel["suspicion"] = max(0.0, min(1.0, rel["suspicion"] + suspicion_delta))
         rel["love"] = max(0.0, min(1.0, rel["love"] + love_delta))
         rel["influence"] = max(0.0, min(1.0, rel["influence"] + influence_delta))
+        if self._trackers:
+            self._mark_changed(agent1.name, agent2.name)
+    
+    def apply_deltas(self, deltas: Dict[Tuple[str, str], Sequence[float]]):
+        """
+        Add accumulated deltas to many cells, clamping each cell once.
+        
+        Args:
+            deltas: {(agent1_name, agent2_name): deltas in CHANNELS order}
+        """
+        for (name1, name2), delta in deltas.items():
+            if name2 in self._matrix.get(name1, ()):
+                rel = self._own_cell(name1, name2)
+            else:
+                rel = dict(DEFAULT_RELATIONSHIP)
+                self._replace_cell(name1, name2, rel)
+            for channel, value in zip(CHANNELS, delta):
+                if value:
+                    rel[channel] = max(0.0, min(1.0, rel[channel] + value))
+            if self._trackers:
+                self._mark_changed(name1, name2)
+    
+    def pairs(self) -> List[Tuple[str, str]]:
+        """Get every stored (agent1_name, agent2_name) pair, row by row."""
+        return [(name1, name2) for name1, row in self._matrix.items() for name2 in row]
+    
+    def cell_count(self) -> int:
+        """Number of stored cells."""
+        return sum(len(row) for row in self._matrix.values())
+    
+    def iter_cells(self) -> Iterator[Tuple[str, str, Tuple[float, ...]]]:
+        """
+        Iterate over every stored cell, row by row.
+        
+        Yields:
+            (agent1_name, agent2_name, values in CHANNELS order)
+        """
+        for name1, row in self._matrix.items():
+            for name2, rel in row.items():
+                yield name1, name2, tuple(rel[channel] for channel in CHANNELS)
+    
+    def get_cells(
+        self,
+        pairs,
+        default: Optional[Tuple[float, ...]] = None
+    ) -> Dict[Tuple[str, str], Tuple[float, ...]]:
+        """
+        Get the values of several cells in CHANNELS order, keyed by name pair.
+        
+        Args:
+            pairs: (agent1_name, agent2_name) pairs
+            default: Values of pairs without a stored cell (KeyError if None)
+        """
+        cells = {}
+        for name1, name2 in pairs:
+            if default is None:
+                rel = self._matrix[name1][name2]
+            else:
+                rel = self._matrix.get(name1, {}).get(name2)
+                if rel is None:
+                    cells[(name1, name2)] = default
+                    continue
+            cells[(name1, name2)] = tuple(rel[channel] for channel in CHANNELS)
+        return cells
+    
+    def set_cells(self, cells: Dict[Tuple[str, str], Sequence[float]]):
+        """
+        Overwrite several cells at once.
+        
+        Args:
+            cells: {(agent1_name, agent2_name): values in CHANNELS order}
+        """
+        for (name1, name2), values in cells.items():
+            self._replace_cell(name1, name2, dict(zip(CHANNELS, values)))
+            if self._trackers:
+                self._mark_changed(name1, name2)
     
     def _ensure_exists(self, agent1: BaseAgent, agent2: BaseAgent):
         """Ensure relationship entries exist for both agents."""
@@ -81,22 +369,14 @@ class RelationshipMatrix:
         
         # Initialize relationship if it doesn't exist
         if agent2.name not in self._matrix[agent1.name]:
-            self._matrix[agent1.name][agent2.name] = {
-                "trust": 0.5,
-                "fear": 0.0,
-                "suspicion": 0.0,
-                "love": 0.0,
-                "influence": 0.0,
-            }
+            self._replace_cell(agent1.name, agent2.name, dict(DEFAULT_RELATIONSHIP))
+            if self._trackers:
+                self._mark_changed(agent1.name, agent2.name)
         
         if agent1.name not in self._matrix[agent2.name]:
-            self._matrix[agent2.name][agent1.name] = {
-                "trust": 0.5,
-                "fear": 0.0,
-                "suspicion": 0.0,
-                "love": 0.0,
-                "influence": 0.0,
-            }
+            self._replace_cell(agent2.name, agent1.name, dict(DEFAULT_RELATIONSHIP))
+            if self._trackers:
+                self._mark_changed(agent2.name, agent1.name)
     
     def get_all_relationships(self, agent: BaseAgent) -> Dict[str, Dict[str, float]]:
         """Get all relationships for a given agent."""
@@ -107,6 +387,110 @@ class RelationshipMatrix:
             for other_name, rel in self._matrix[agent.name].items()
         }
     
+    def get_value(self, name1: str, name2: str, key: str) -> Optional[float]:
+        """
+        Get a channel or combined score by agent names, or None if the pair
+        is unknown.
+        """
+        rel = self._matrix.get(name1, {}).get(name2)
+        return score_value(rel, key) if rel is not None else None
+    
+    def top_related(
+        self,
+        name: str,
+        score: str,
+        k: int,
+        incoming: bool = False,
+        include: Optional[Callable[[str], bool]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Highest-scoring relationships of one agent, by partial selection.
+        
+        Args:
+            name: Agent name
+            score: Channel name or combined score ("alliance", "conflict")
+            k: Number of results
+            incoming: If True, rank how others feel about the agent instead
+            include: Optional filter on the other agent's name
+        
+        Returns:
+            Up to k (other_name, value) pairs, highest first
+        """
+        check_score(score)
+        candidates = (
+            (other, score_value(rel, score))
+            for other, rel in self._iter_neighbors(name, incoming)
+            if include is None or include(other)
+        )
+        return heapq.nlargest(k, candidates, key=lambda item: item[1])
+    
+    def above_threshold(
+        self,
+        name: str,
+        score: str,
+        threshold: float,
+        incoming: bool = False,
+        include: Optional[Callable[[str], bool]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Relationships of one agent whose score exceeds a threshold.
+        
+        Args:
+            name: Agent name
+            score: Channel name or combined score
+            threshold: Exclusive lower bound
+            incoming: If True, filter how others feel about the agent instead
+            include: Optional filter on the other agent's name
+        
+        Returns:
+            (other_name, value) pairs, highest first
+        """
+        check_score(score)
+        matches = []
+        for other, rel in self._iter_neighbors(name, incoming):
+            value = score_value(rel, score)
+            if value > threshold and (include is None or include(other)):
+                matches.append((other, value))
+        matches.sort(key=lambda item: -item[1])
+        return matches
+    
+    def _iter_neighbors(self, name: str, incoming: bool):
+        """Iterate (other_name, relationship) over an agent's row or column."""
+        if not incoming:
+            return iter(self._matrix.get(name, {}).items())
+        return (
+            (other, row[name])
+            for other, row in self._matrix.items()
+            if name in row
+        )
+    
+    def top_pairs(
+        self,
+        score: str,
+        k: int,
+        include: Optional[Callable[[str, str], bool]] = None
+    ) -> List[Tuple[str, str, float]]:
+        """
+        Highest-scoring directed pairs of the whole matrix.
+        
+        The first call for a score builds a heap over every cell; later calls
+        only push the cells changed since, so a query costs O((k + stale
+        entries) log n) rather than a full scan.
+        
+        Args:
+            score: Channel name or combined score
+            k: Number of results
+            include: Optional filter on (agent1_name, agent2_name)
+        
+        Returns:
+            Up to k (agent1_name, agent2_name, value) triples, highest first
+        """
+        check_score(score)
+        index = self._top_indexes.get(score)
+        if index is None:
+            index = self._top_indexes[score] = _TopPairsIndex(self, score)
+        return index.top(k, include)
+    
     def get_trust_level(self, agent1: BaseAgent, agent2: BaseAgent) -> float:
         """Get trust level between two agents."""
         self._ensure_exists(agent1, agent2)
@@ -117,3 +501,78 @@ class RelationshipMatrix:
         self._ensure_exists(agent1, agent2)
         return self._matrix[agent1.name][agent2.name]["suspicion"]
 
+
+class _TopPairsIndex:
+    """
+    Lazily maintained max-heap of one score over every cell.
+    
+    Changed cells are pushed again with their new value instead of being
+    updated in place; entries whose value no longer matches the latest one
+    are discarded when they reach the top. The heap is rebuilt once stale
+    entries outnumber live ones.
+    """
+    
+    def __init__(self, matrix: RelationshipMatrix, score: str):
+        """
+        Build the index with one pass over the matrix.
+        
+        Args:
+            matrix: Matrix to index
+            score: Channel name or combined score
+        """
+        self._matrix = matrix
+        self._score = score
+        self._tracker = matrix.track_changes()
+        self._lock = threading.Lock()
+        self._latest: Dict[Tuple[str, str], float] = {
+            (name1, name2): score_value(rel, score)
+            for name1, row in matrix._matrix.items()
+            for name2, rel in row.items()
+        }
+        self._rebuild()
+    
+    def _rebuild(self):
+        """Recreate the heap from the latest values only."""
+        self._heap = [(-value, name1, name2) for (name1, name2), value in self._latest.items()]
+        heapq.heapify(self._heap)
+    
+    def _refresh(self):
+        """Push the cells changed since the last query."""
+        rows = self._matrix._matrix
+        while self._tracker:
+            # pop() is atomic, so a simulation thread may keep writing meanwhile
+            name1, name2 = self._tracker.pop()
+            rel = rows.get(name1, {}).get(name2)
+            if rel is None:
+                continue
+            value = score_value(rel, self._score)
+            if self._latest.get((name1, name2)) != value:
+                self._latest[(name1, name2)] = value
+                heapq.heappush(self._heap, (-value, name1, name2))
+        if len(self._heap) > 2 * len(self._latest) + 64:
+            self._rebuild()
+    
+    def top(
+        self,
+        k: int,
+        include: Optional[Callable[[str, str], bool]] = None
+    ) -> List[Tuple[str, str, float]]:
+        """Up to k highest (agent1_name, agent2_name, value) triples passing `include`."""
+        with self._lock:
+            self._refresh()
+            heap = self._heap
+            kept = []
+            seen = set()
+            results = []
+            while heap and len(results) < k:
+                entry = heapq.heappop(heap)
+                pair = (entry[1], entry[2])
+                if self._latest.get(pair) != -entry[0] or pair in seen:
+                    continue  # superseded by a newer value
+                seen.add(pair)
+                kept.append(entry)
+                if include is None or include(*pair):
+                    results.append((entry[1], entry[2], -entry[0]))
+            for entry in kept:
+                heapq.heappush(heap, entry)
+            return results
@@ -1,6 +1,6 @@
 """World state management for the simulation."""
 
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from .relationship_matrix import RelationshipMatrix
 from ..agents.base_agent import BaseAgent
 
@@ -8,16 +8,31 @@ from ..agents.base_agent import BaseAgent
 class WorldState:
     """Manages the overall state of the simulation world."""
     
-    def __init__(self, agents: List[BaseAgent]):
+    def __init__(
+        self,
+        agents: List[BaseAgent],
+        relationship_matrix: Optional[RelationshipMatrix] = None
+    ):
         """
         Initialize world state with agents.
         
         Args:
             agents: List of all agents in the simulation
+            relationship_matrix: Prebuilt matrix covering every pair of agents
+                (a fresh one is created if None)
         """
         self.agents = agents
-        self.relationship_matrix = RelationshipMatrix()
         self.turn_number = 0
+        # Faction tracker, created by the first get_factions() call
+        self._factions = None
+        # Optional LocationMap; when set, agents only interact within a room
+        self.locations = None
+        
+        if relationship_matrix is not None:
+            self.relationship_matrix = relationship_matrix
+            return
+        
+        self.relationship_matrix = RelationshipMatrix()
         
         # Initialize relationships for all agents
         for agent in agents:
@@ -27,6 +42,30 @@ class WorldState:
                 if agent != other_agent:
                     self.relationship_matrix._ensure_exists(agent, other_agent)
     
+    def __getstate__(self):
+        """Pickle without the faction tracker; it is rebuilt on demand."""
+        state = self.__dict__.copy()
+        state["_factions"] = None
+        return state
+    
+    def fork(self) -> 'WorldState':
+        """
+        Cheaply copy the world, e.g. to play what-if branches.
+        
+        Agents are forked (see BaseAgent.fork()) and the relationship matrix
+        is shared copy-on-write, so a fork only allocates the agent states
+        and the relationship rows it changes. Fork between turns.
+        
+        Returns:
+            Independent WorldState at the same turn
+        """
+        agents = [agent.fork() for agent in self.agents]
+        world = WorldState(agents, self.relationship_matrix.fork())
+        world.turn_number = self.turn_number
+        if self.locations is not None:
+            world.locations = self.locations.fork(agents)
+        return world
+    
     def get_living_agents(self) -> List[BaseAgent]:
         """Get all agents that are currently alive."""
         return [agent for agent in self.agents if agent.state.is_alive]
@@ -79,4 +118,119 @@ class WorldState:
                     conflicts.append((agent1, agent2))
         
         return conflicts
-
+    
+    def _living_by_name(self) -> Dict[str, BaseAgent]:
+        """Map names to living agents."""
+        return {agent.name: agent for agent in self.agents if agent.state.is_alive}
+    
+    def get_top_relationships(
+        self,
+        agent: BaseAgent,
+        score: str = "trust",
+        k: int = 10,
+        incoming: bool = False
+    ) -> List[Tuple[BaseAgent, float]]:
+        """
+        Get an agent's k strongest relationships with living agents.
+        
+        Args:
+            agent: Agent whose relationships are ranked
+            score: Channel name or combined score ("alliance", "conflict")
+            k: Number of results
+            incoming: If True, rank how others feel about the agent
+        
+        Returns:
+            List of (other agent, value), highest first
+        """
+        living = self._living_by_name()
+        top = self.relationship_matrix.top_related(
+            agent.name, score, k, incoming, include=living.__contains__
+        )
+        return [(living[name], value) for name, value in top]
+    
+    def get_relationships_above(
+        self,
+        agent: BaseAgent,
+        score: str,
+        threshold: float,
+        incoming: bool = False
+    ) -> List[Tuple[BaseAgent, float]]:
+        """
+        Get the living agents whose relationship with an agent exceeds a threshold.
+        
+        Args:
+            agent: Agent whose row (or column, if incoming) is filtered
+            score: Channel name or combined score
+            threshold: Exclusive lower bound
+            incoming: If True, filter how others feel about the agent, e.g.
+                everyone whose suspicion of Claudius is above 0.7
+        
+        Returns:
+            List of (other agent, value), highest first
+        """
+        living = self._living_by_name()
+        matches = self.relationship_matrix.above_threshold(
+            agent.name, score, threshold, incoming, include=living.__contains__
+        )
+        return [(living[name], value) for name, value in matches]
+    
+    def get_strongest_pairs(
+        self,
+        score: str = "conflict",
+        k: int = 20
+    ) -> List[Tuple[BaseAgent, BaseAgent, float]]:
+        """
+        Get the k highest-scoring directed relationships between living agents.
+        
+        Args:
+            score: Channel name or combined score
+            k: Number of results
+        
+        Returns:
+            List of (agent, other agent, value), highest first
+        """
+        living = self._living_by_name()
+        top = self.relationship_matrix.top_pairs(
+            score, k, include=lambda name1, name2: name1 in living and name2 in living
+        )
+        return [(living[name1], living[name2], value) for name1, name2, value in top]
+    
+    def get_neighborhood(self, agent: BaseAgent, k: int = 5) -> Dict[str, List[Tuple[BaseAgent, float]]]:
+        """
+        Get an agent's closest allies and rivals, in both directions.
+        
+        Args:
+            agent: Agent at the centre
+            k: Number of agents in each list
+        
+        Returns:
+            Dict with "allies" and "rivals" (ranked by the agent's own alliance
+            and conflict scores) and "trusted_by" and "feared_by" (ranked by
+            the others' trust of and fear of the agent)
+        """
+        return {
+            "allies": self.get_top_relationships(agent, "alliance", k),
+            "rivals": self.get_top_relationships(agent, "conflict", k),
+            "trusted_by": self.get_top_relationships(agent, "trust", k, incoming=True),
+            "feared_by": self.get_top_relationships(agent, "fear", k, incoming=True),
+        }
+    
+    def get_factions(self, min_size: int = 2) -> List[Dict]:
+        """
+        Detect factions: connected groups in the alliance (trust + love) graph.
+        
+        The first call builds the graph; later calls only apply the
+        relationship changes and deaths since the previous one.
+        
+        Args:
+            min_size: Smallest faction to report
+        
+        Returns:
+            List of dicts with "leader", "members" (names) and "size", largest first
+        """
+        if self._factions is None or self._factions._matrix is not self.relationship_matrix:
+            from .factions import FactionTracker
+            if self._factions is not None:
+                self._factions.close()
+            self._factions = FactionTracker(self)
+        return self._factions.get_factions(min_size)
@@ -1,7 +1,10 @@
 """Main entry point - runs the Hamlet simulation game."""
 
+import sys
 from hamlet_sim.main import main
 
 if __name__ == "__main__":
-    main()
-
+    # Optional arguments: path to a scenario file, and --locations to
+    # spread the agents over the rooms of Elsinore
+    args = [arg for arg in sys.argv[1:] if arg != "--locations"]
+    main(scenario=args[0] if args else None, locations="--locations" in sys.argv[1:])
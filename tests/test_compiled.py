@@ -0,0 +1,100 @@
+"""Tests that compiled policies sample the hand-written archetype policies."""
+
+import math
+import os
+import random
+
+import pytest
+
+from hamlet_sim.agents.compiled import CompiledPolicy
+from hamlet_sim.events import EventLog
+from hamlet_sim.main import create_agents, initialize_relationships
+from hamlet_sim.simulation import SimulationLoop
+
+SAMPLES = 10000
+
+# Smallest accepted chi-square p-value (the draws are seeded, so a pass is stable)
+MIN_P = 0.001
+
+
+def chi_square_p(counts, probabilities, samples: int) -> float:
+    """Approximate p-value of counts against a distribution (Wilson-Hilferty)."""
+    statistic = sum(
+        (counts.get(outcome, 0) - samples * p) ** 2 / (samples * p)
+        for outcome, p in probabilities.items()
+    )
+    dof = max(1, len(probabilities) - 1)
+    z = ((statistic / dof) ** (1 / 3) - (1 - 2 / (9 * dof))) / math.sqrt(2 / (9 * dof))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def make_world(turns: int):
+    """A standard-cast world played for a few turns."""
+    random.seed(7)
+    simulation = SimulationLoop(create_agents(), event_log=EventLog(os.devnull), verbose=False)
+    initialize_relationships(simulation.world_state)
+    for _ in range(turns):
+        simulation.step()
+    return simulation.world_state
+
+
+def plant_memories(world_state):
+    """Give each character with a memory rule the memory that triggers it."""
+    for agent, kind, actor in (("Hamlet", "attacked_me", "Claudius"),
+                               ("Claudius", "spied_on_me", "Hamlet"),
+                               ("Polonius", "caught_me_spying", "Hamlet"),
+                               ("Horatio", "attacked_ally", "Claudius")):
+        world_state.get_agent_by_name(agent).memory.remember(0, kind, actor, agent, 1.0)
+
+
+def make_state(state: str):
+    """World of a named test state."""
+    world_state = make_world(5 if state == "later" else 0)
+    if state == "memories":
+        plant_memories(world_state)
+    elif state == "dead":
+        # Dead characters stay in the candidate lists
+        for name in ("Claudius", "Polonius"):
+            world_state.get_agent_by_name(name).state.is_alive = False
+    return world_state
+
+
+@pytest.mark.parametrize("state", ["start", "later", "memories", "dead"])
+def test_decide_matches_hand_written(state):
+    policy = CompiledPolicy()
+    # Tables compiled before the state changed must not serve it
+    start = make_world(0)
+    for agent in start.get_living_agents():
+        policy.distribution(agent, start, [other for other in start.agents if other is not agent])
+    world_state = make_state(state)
+    rng = random.Random(1)
+    for agent in world_state.get_living_agents():
+        others = [other for other in world_state.agents if other is not agent]
+        exact = policy.distribution(agent, world_state, others)
+        for decide in (agent._make_decision, lambda w, o, rng: policy.decide(agent, w, o, rng)):
+            counts = {}
+            for _ in range(SAMPLES):
+                decision = decide(world_state, others, rng)
+                counts[decision] = counts.get(decision, 0) + 1
+            assert set(counts) <= set(exact), agent.name
+            assert chi_square_p(counts, exact, SAMPLES) > MIN_P, agent.name
+
+
+def test_decide_all_matches_decide():
+    policy = CompiledPolicy()
+    world_state = make_world(0)
+    policy.decide_all(world_state, world_state.get_living_agents())
+    plant_memories(world_state)
+    agents = world_state.get_living_agents()
+    rng = random.Random(2)
+    counts = [{} for _ in agents]
+    for _ in range(SAMPLES):
+        for per_agent, decision in zip(counts, policy.decide_all(world_state, agents, rng=rng)):
+            per_agent[decision] = per_agent.get(decision, 0) + 1
+    for agent, per_agent in zip(agents, counts):
+        # Compiled afresh, so in the current state only
+        exact = CompiledPolicy().distribution(
+            agent, world_state, [other for other in agents if other is not agent]
+        )
+        assert set(per_agent) <= set(exact), agent.name
+        assert chi_square_p(per_agent, exact, SAMPLES) > MIN_P, agent.name
@@ -0,0 +1,57 @@
+"""Tests that EnsembleEngine worlds play like SimulationLoop worlds."""
+
+import os
+import random
+
+import pytest
+
+from hamlet_sim.agents import UtilityPolicy
+from hamlet_sim.agents.compiled import CompiledPolicy
+from hamlet_sim.events import EventLog
+from hamlet_sim.main import create_agents, initialize_relationships
+from hamlet_sim.simulation import EnsembleEngine, SimulationLoop
+from hamlet_sim.world.relationship_matrix import CHANNELS
+
+WORLDS = 20
+TURNS = 30
+SEED = 5
+
+
+def standard_world(policy=None):
+    """A quiet standard-cast simulation, its agents using `policy` if given."""
+    simulation = SimulationLoop(create_agents(), event_log=EventLog(os.devnull), verbose=False)
+    initialize_relationships(simulation.world_state)
+    if policy is not None:
+        policy.attach(simulation.world_state.agents)
+    return simulation
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_worlds_match_simulation_loop(compiled):
+    template = standard_world(CompiledPolicy() if compiled else None).world_state
+    ensemble = EnsembleEngine(template, worlds=WORLDS, seed=SEED, max_turns=TURNS)
+    ensemble.run()
+    
+    policy = CompiledPolicy() if compiled else None
+    n = ensemble.num_agents
+    cells = n * n * len(CHANNELS)
+    for k in range(WORLDS):
+        random.seed(SEED + k)
+        simulation = standard_world(policy)
+        world_state = simulation.world_state
+        while world_state.turn_number < TURNS and len(world_state.get_living_agents()) >= 2:
+            simulation.step()
+        agents = world_state.agents
+        relationships = [
+            world_state.relationship_matrix.get_relationship(agent, other)[channel]
+            if agent is not other else 0.0
+            for agent in agents for other in agents for channel in CHANNELS
+        ]
+        assert [agent.state.health for agent in agents] == list(ensemble.health[k * n:(k + 1) * n])
+        assert relationships == list(ensemble.relationships[k * cells:(k + 1) * cells])
+
+
+def test_rejects_other_policies():
+    template = standard_world(UtilityPolicy()).world_state
+    with pytest.raises(ValueError):
+        EnsembleEngine(template, worlds=2)
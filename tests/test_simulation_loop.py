@@ -0,0 +1,47 @@
+"""Tests of SimulationLoop turn modes."""
+
+import os
+import random
+import time
+
+from hamlet_sim.events import EventLog
+from hamlet_sim.main import create_agents, initialize_relationships
+from hamlet_sim.simulation import SimulationLoop
+
+
+def pause_before_deciding(agent, delay: float):
+    """Make an agent sleep (releasing the GIL) before each decision."""
+    decide = agent._make_decision
+    
+    def _make_decision(world_state, other_agents, rng=random):
+        time.sleep(delay)
+        return decide(world_state, other_agents, rng)
+    agent._make_decision = _make_decision
+
+
+def play(workers: int, seed: int = 3, turns: int = 10):
+    """Health and relationship cells after a seeded simultaneous run."""
+    agents = create_agents()
+    for i, agent in enumerate(agents):
+        # Earlier agents finish later, so threads draw out of turn order
+        pause_before_deciding(agent, 0.001 * (len(agents) - i))
+    simulation = SimulationLoop(
+        agents, event_log=EventLog(os.devnull), verbose=False,
+        turn_mode="simultaneous", decision_workers=workers, rng=random.Random(seed)
+    )
+    world_state = simulation.world_state
+    initialize_relationships(world_state)
+    for _ in range(turns):
+        simulation.step()
+    simulation.close()
+    return (
+        [agent.state.health for agent in world_state.agents],
+        sorted(world_state.relationship_matrix.iter_cells()),
+    )
+
+
+def test_seeded_worker_runs_are_reproducible():
+    first = play(workers=2)
+    assert play(workers=2) == first
+    assert play(workers=1) == first
+    assert play(workers=4) == first
@@ -0,0 +1,62 @@
+"""Tests of the utility policy against the hand-written archetype policies."""
+
+import os
+import random
+
+from hamlet_sim.agents import UtilityPolicy
+from hamlet_sim.agents.base_agent import ActionType
+from hamlet_sim.events import EventLog
+from hamlet_sim.main import create_agents, initialize_relationships
+from hamlet_sim.simulation import SimulationLoop
+
+# Largest accepted difference between a character's share of an action
+# under the archetype policy and under the utility policy
+SHARE_TOLERANCE = 0.05
+
+
+def action_shares(policy, worlds: int = 150, turns: int = 30, seed: int = 42):
+    """{agent name: {action value: share of its actions}} over standard-cast worlds."""
+    random.seed(seed)
+    counts = {}
+    for _ in range(worlds):
+        simulation = SimulationLoop(create_agents(), event_log=EventLog(os.devnull), verbose=False)
+        initialize_relationships(simulation.world_state)
+        if policy is not None:
+            policy.attach(simulation.world_state.agents)
+        while simulation.world_state.turn_number < turns:
+            for event in simulation.step():
+                per_agent = counts.setdefault(event.agent.name, {})
+                per_agent[event.action.value] = per_agent.get(event.action.value, 0) + 1
+            if len(simulation.world_state.get_living_agents()) < 2:
+                break
+    return {
+        name: {action: n / sum(per_agent.values()) for action, n in per_agent.items()}
+        for name, per_agent in counts.items()
+    }
+
+
+def test_profiles_keep_archetype_mix():
+    archetype = action_shares(None)
+    utility = action_shares(UtilityPolicy())
+    off = [
+        (name, action, share, utility[name].get(action, 0.0))
+        for name, shares in archetype.items()
+        for action, share in shares.items()
+        if abs(share - utility[name].get(action, 0.0)) > SHARE_TOLERANCE
+    ]
+    assert not off
+
+
+def test_memory_terms_follow_archetype_rules():
+    simulation = SimulationLoop(create_agents(), event_log=EventLog(os.devnull), verbose=False)
+    world_state = simulation.world_state
+    initialize_relationships(world_state)
+    policy = UtilityPolicy()
+    hamlet = world_state.get_agent_by_name("Hamlet")
+    others = [agent for agent in world_state.get_living_agents() if agent is not hamlet]
+    before = policy.action_probabilities(hamlet, world_state, others)
+    # Provoked, Hamlet accuses Claudius rather than spying on him
+    hamlet.memory.remember(0, "attacked_me", "Claudius", "Hamlet", 1.0)
+    after = policy.action_probabilities(hamlet, world_state, others)
+    assert after[ActionType.ACCUSE.value] > before[ActionType.ACCUSE.value]
+    assert after[ActionType.SPY_ON.value] < before[ActionType.SPY_ON.value]
@@ -4,12 +4,20 @@ import sys
 from hamlet_sim.main import main
 
 if __name__ == "__main__":
+    # --locations spreads the agents over the rooms of Elsinore, and
+    # --history records relationship values every turn for the charts
+    flags = {"--locations", "--history"}
+    args = [arg for arg in sys.argv[1:] if arg not in flags]
+    
     port = 8001
-    if len(sys.argv) > 1:
+    if len(args) > 0:
         try:
-            port = int(sys.argv[1])
+            port = int(args[0])
         except ValueError:
-            print(f"Invalid port: {sys.argv[1]}. Using default port 8001.")
+            print(f"Invalid port: {args[0]}. Using default port 8001.")
+    
+    scenario = args[1] if len(args) > 1 else None
     
-    main(web_mode=True, port=port)
+    main(web_mode=True, port=port, record_history="--history" in sys.argv[1:], scenario=scenario,
+         keep_log=True, checkpoint_dir="checkpoints", locations="--locations" in sys.argv[1:])
 